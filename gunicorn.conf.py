@@ -0,0 +1,36 @@
+"""
+Gunicorn configuration for production: ``gunicorn -c gunicorn.conf.py``.
+
+Runs the ASGI application on uvicorn workers by default; set
+GUNICORN_WORKER_CLASS=gthread to serve the WSGI application with threads
+instead. Every value can be tuned through the environment.
+"""
+import multiprocessing
+import os
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'uvicorn_worker.UvicornWorker')
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+if 'uvicorn' in worker_class.lower():
+    wsgi_app = 'mini_twitter.asgi:application'
+else:
+    wsgi_app = 'mini_twitter.wsgi:application'
+
+raw_env = [
+    f"DJANGO_SETTINGS_MODULE={os.getenv('DJANGO_SETTINGS_MODULE', 'mini_twitter.settings_production')}",
+]
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers periodically so slow leaks never build up.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+
+accesslog = '-'
+errorlog = '-'
@@ -2,6 +2,10 @@
 ASGI config for mini_twitter project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Served by uvicorn (see docker-compose.yml); under ASGI the feed, post and
+user detail reads use the async views unless ASYNC_READ_VIEWS=False, and
+SERVING_ASGI tells the production settings not to keep database connections
+open between requests.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -9,8 +13,15 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mini_twitter.settings')
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
+os.environ['SERVING_ASGI'] = 'True'
 
 application = get_asgi_application()
+
+if settings.DEBUG:
+    application = ASGIStaticFilesHandler(application)
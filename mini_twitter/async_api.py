@@ -0,0 +1,87 @@
+"""
+Plumbing for the async (ASGI) read views.
+
+DRF's APIView is synchronous, so the async endpoints are plain Django
+coroutine views wrapped by ``async_api_view``: it authenticates the JWT like
+CachedJWTAuthentication without blocking the event loop on a cache hit,
+exposes the request as a DRF ``Request`` (query_params, build_absolute_uri),
+applies the DRF view's throttles and turns returned data and APIExceptions
+into JSON responses the same way DRF would.
+"""
+import functools
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.http.response import HttpResponseBase
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework_simplejwt.settings import api_settings
+
+from mini_twitter import renderers, throttling
+from users.authentication import CachedJWTAuthentication
+
+
+async def authenticate(request):
+    """Async counterpart of CachedJWTAuthentication.authenticate()."""
+    auth = CachedJWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        raise exceptions.NotAuthenticated()
+
+    return await auth.aget_user(auth.get_validated_token(raw_token))
+
+
+def json_response(data, status=200):
+    return HttpResponse(renderers.dumps(data), status=status, content_type='application/json')
+
+
+def error_response(exc):
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {'detail': exc.detail}
+    response = json_response(data, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = f'{api_settings.AUTH_HEADER_TYPES[0]} realm="api"'
+    if getattr(exc, 'wait', None):
+        response['Retry-After'] = '%d' % exc.wait
+    return response
+
+
+def async_api_view(view):
+    """Authenticated, GET-only async JSON endpoint."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return error_response(exceptions.MethodNotAllowed(request.method))
+
+        request = Request(request)
+        try:
+            request.user = await authenticate(request)
+            # read_view() gives the wrapper the class of the DRF view it replaces.
+            await throttling.acheck_throttles(request, getattr(wrapper, 'cls', None))
+            data = await view(request, *args, **kwargs)
+        except Http404:
+            return error_response(exceptions.NotFound())
+        except exceptions.APIException as exc:
+            return error_response(exc)
+
+        if isinstance(data, HttpResponseBase):
+            return data
+        return json_response(data)
+    return wrapper
+
+
+def read_view(sync_view, async_view):
+    """
+    URL callback for a read endpoint: ``async_view`` when ASYNC_READ_VIEWS is
+    on, ``sync_view`` otherwise. The async view borrows the DRF view's
+    attributes so drf-spectacular keeps documenting the endpoint.
+    """
+    if not settings.ASYNC_READ_VIEWS:
+        return sync_view
+    for attr in ('cls', 'initkwargs', 'actions'):
+        if hasattr(sync_view, attr):
+            setattr(async_view, attr, getattr(sync_view, attr))
+    return async_view
@@ -0,0 +1,125 @@
+"""
+Native asyncio access to the default cache.
+
+django_redis only ships a synchronous client, and Django's ``cache.aget()``
+just runs it in a thread. When the cache is django_redis these helpers talk
+to the same Redis server through ``redis.asyncio`` and reuse django_redis'
+own key and value encoding, so entries are shared with the synchronous code.
+With any other backend they fall back to ``cache.aget()`` / ``aget_many()``
+/ ``aset()`` / ``aadd()`` / ``adelete()``.
+
+Calls share the circuit breaker of the synchronous ResilientCache layer and
+raise CacheUnavailable while it is open.
+"""
+import asyncio
+import weakref
+
+import redis.asyncio
+from django.conf import settings
+from django.core.cache import cache
+
+from mini_twitter.redis_client import get_redis
+from mini_twitter.resilient_cache import CACHE_ERRORS, CacheUnavailable, breaker_for
+
+
+# redis.asyncio connections are bound to the event loop that opened them.
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis():
+    """asyncio Redis client for the running loop, or None when the cache is not Redis."""
+    if get_redis() is None:
+        return None
+
+    loop = asyncio.get_running_loop()
+    conn = _clients.get(loop)
+    if conn is None:
+        conn = _clients[loop] = _connect(settings.CACHES['default'])
+    return conn
+
+
+def _connect(cache_settings):
+    """Mirror django_redis' connection pool settings on an asyncio client."""
+    location = cache_settings['LOCATION']
+    if isinstance(location, (list, tuple)):
+        location = location[0]
+    options = cache_settings.get('OPTIONS', {})
+    pool_class = redis.asyncio.ConnectionPool
+    if options.get('CONNECTION_POOL_CLASS') == 'redis.BlockingConnectionPool':
+        pool_class = redis.asyncio.BlockingConnectionPool
+    pool_kwargs = {
+        'socket_connect_timeout': options.get('SOCKET_CONNECT_TIMEOUT'),
+        'socket_timeout': options.get('SOCKET_TIMEOUT'),
+        **options.get('CONNECTION_POOL_KWARGS', {}),
+    }
+    pool = pool_class.from_url(location, **pool_kwargs)
+    return redis.asyncio.Redis(connection_pool=pool)
+
+
+async def _call(method, *args, **kwargs):
+    breaker = breaker_for()
+    if not breaker.allow():
+        raise CacheUnavailable('default')
+    try:
+        result = await method(*args, **kwargs)
+    except CACHE_ERRORS:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return result
+
+
+async def get(key, default=None):
+    conn = get_async_redis()
+    if conn is None:
+        return await cache.aget(key, default)
+
+    value = await _call(conn.get, cache.client.make_key(key))
+    if value is None:
+        return default
+    return cache.client.decode(value)
+
+
+async def get_many(keys):
+    """``{key: value}`` for the ``keys`` found."""
+    conn = get_async_redis()
+    if conn is None:
+        return await cache.aget_many(keys)
+
+    values = await _call(conn.mget, [cache.client.make_key(key) for key in keys])
+    return {key: cache.client.decode(value) for key, value in zip(keys, values) if value is not None}
+
+
+def _milliseconds(timeout):
+    # redis-py only accepts whole seconds for ``ex``; timeouts such as
+    # STAMPEDE_LOCK_TIMEOUT are floats, so expiries are set with ``px``.
+    if timeout is None:
+        return None
+    return max(1, int(timeout * 1000))
+
+
+async def set(key, value, timeout):
+    conn = get_async_redis()
+    if conn is None:
+        return await cache.aset(key, value, timeout=timeout)
+
+    await _call(conn.set, cache.client.make_key(key), cache.client.encode(value),
+                px=_milliseconds(timeout))
+
+
+async def add(key, value, timeout):
+    """Store ``value`` only if ``key`` is missing; returns True if it was stored."""
+    conn = get_async_redis()
+    if conn is None:
+        return await cache.aadd(key, value, timeout=timeout)
+
+    return bool(await _call(conn.set, cache.client.make_key(key), cache.client.encode(value),
+                            px=_milliseconds(timeout), nx=True))
+
+
+async def delete(key):
+    conn = get_async_redis()
+    if conn is None:
+        return await cache.adelete(key)
+
+    await _call(conn.delete, cache.client.make_key(key))
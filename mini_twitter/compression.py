@@ -0,0 +1,76 @@
+"""
+Negotiated response compression.
+
+CompressionMiddleware is Django's GZipMiddleware with two changes: responses
+shorter than COMPRESSION_MIN_SIZE bytes are sent as they are (compressing a
+few hundred bytes costs more CPU than it saves on the wire), and clients that
+accept ``br`` get Brotli when the brotli package is installed. Brotli at
+BROTLI_QUALITY 4-5 compresses JSON feed pages noticeably tighter than gzip
+at a similar speed. Streaming responses (the NDJSON export) stay with gzip.
+
+Accept-Encoding q-values are honoured: ``br;q=0`` or ``gzip;q=0`` rule an
+encoding out, and the higher q wins, Brotli on a tie.
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def accepted_encodings(header):
+    """``{coding: q}`` for an Accept-Encoding header."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def negotiate(header, offered):
+    """Coding of ``offered`` (in order of preference) to use for an Accept-Encoding header, or None."""
+    accepted = accepted_encodings(header)
+    wildcard = accepted.get('*', 0.0)
+    quality = {coding: accepted.get(coding, wildcard) for coding in offered}
+    best = max(offered, key=quality.get)
+    return best if quality[best] > 0 else None
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        offered = ('gzip',) if brotli is None or response.streaming else ('br', 'gzip')
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), offered)
+        if encoding is None:
+            return response
+        if encoding == 'gzip':
+            return super().process_response(request, response)
+
+        compressed = brotli.compress(response.content, quality=settings.BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        # As GZipMiddleware does: the encoded body no longer matches a strong ETag.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
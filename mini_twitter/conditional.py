@@ -0,0 +1,62 @@
+"""
+HTTP conditional requests (ETag / Last-Modified) for the cached reads.
+
+The validators are derived from version data the cache layer keeps anyway:
+the version an ObjectCache representation was built under (post details,
+profiles) and the feed generation of a user. Both are time_ns stamps that
+change on every write affecting the representation and are never reused,
+so one is both an ETag and a Last-Modified date. Answering a request whose
+If-None-Match / If-Modified-Since still matches with 304 Not Modified then
+costs the cache lookup the request would have made anyway: no serializer,
+no query.
+
+Responses with validators are marked ``Cache-Control: private, no-cache``:
+they depend on the reader, and clients must revalidate before reusing them.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def validators(version, *parts):
+    """
+    ``(etag, last_modified)`` for a representation built at ``version`` and
+    identified by ``parts``, or None when there is no version to go by.
+    """
+    if not version:
+        return None
+    digest = hashlib.md5(':'.join(str(part) for part in (version, *parts)).encode()).hexdigest()
+    return quote_etag(digest), version // 1_000_000_000
+
+
+def respond(request, current, build):
+    """
+    304 Not Modified when the client's copy matches the ``current``
+    validators, otherwise the response returned by ``build()``.
+    """
+    if current is None:
+        return build()
+    return with_validators(not_modified(request, current) or build(), current)
+
+
+async def arespond(request, current, build):
+    """respond() for the async views, where ``build()`` is a coroutine function."""
+    if current is None:
+        return await build()
+    return with_validators(not_modified(request, current) or await build(), current)
+
+
+def not_modified(request, current):
+    etag, last_modified = current
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def with_validators(response, current):
+    if response.status_code in (200, 304):
+        etag, last_modified = current
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+    return response
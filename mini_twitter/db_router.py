@@ -0,0 +1,146 @@
+"""
+Primary/replica database routing.
+
+Writes always go to ``default``. During a request, reads go to one of the
+aliases in DATABASE_REPLICAS unless the request has to see its own writes:
+
+- once a request has written, the rest of it reads from the primary;
+- after the response, ReplicaStickinessMiddleware pins the authenticated
+  user to the primary for DB_REPLICA_STICKY_SECONDS, so follow-up reads
+  (the feed right after creating a post or following someone) never hit a
+  replica that is still catching up;
+- whatever is built inside ``primary_reads()`` (feed and post list pages,
+  the object cache, Redis timelines) reads from the primary: a copy built
+  from a lagging replica right after an invalidation would be cached under
+  the new generation or version and served long after the replica caught up.
+
+Code running outside a request (management commands, job workers, the
+shell) always uses the primary.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.functional import SimpleLazyObject, empty
+
+from mini_twitter.resilient_cache import CACHE_ERRORS
+
+
+PRIMARY = 'default'
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+_primary_reads = contextvars.ContextVar('db_primary_reads', default=False)
+
+
+@contextmanager
+def primary_reads():
+    """Route the reads made inside the block to the primary."""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+def pin_key(user_id):
+    return f'db_primary_pin_user_{user_id}'
+
+
+def _user_id(request):
+    """Id of the authenticated user, without forcing a lazy request.user."""
+    user = getattr(request, 'user', None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+class RoutingState:
+    def __init__(self, request):
+        self.request = request
+        self.wrote = False
+        self.pinned = None
+
+    def reads_from_primary(self):
+        if self.wrote:
+            return True
+        if self.pinned is None:
+            user_id = _user_id(self.request)
+            if user_id is None:
+                return False
+            try:
+                self.pinned = bool(cache.get(pin_key(user_id)))
+            except CACHE_ERRORS:
+                self.pinned = False
+        return self.pinned
+
+    def finish(self):
+        user_id = _user_id(self.request)
+        if not self.wrote or user_id is None:
+            return
+        try:
+            cache.set(pin_key(user_id), 1, timeout=settings.DB_REPLICA_STICKY_SECONDS)
+        except CACHE_ERRORS:
+            pass
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not settings.DATABASE_REPLICAS or _primary_reads.get():
+            return PRIMARY
+        if state.reads_from_primary():
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+@sync_and_async_middleware
+def ReplicaStickinessMiddleware(get_response):
+    """Track writes per request and pin the writer to the primary afterwards."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not settings.DATABASE_REPLICAS:
+                return await get_response(request)
+            state = RoutingState(request)
+            token = _state.set(state)
+            try:
+                response = await get_response(request)
+                await sync_to_async(state.finish)()
+            finally:
+                _state.reset(token)
+            return response
+    else:
+        def middleware(request):
+            if not settings.DATABASE_REPLICAS:
+                return get_response(request)
+            state = RoutingState(request)
+            token = _state.set(state)
+            try:
+                response = get_response(request)
+                state.finish()
+            finally:
+                _state.reset(token)
+            return response
+    return middleware
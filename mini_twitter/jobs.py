@@ -0,0 +1,216 @@
+"""
+Background jobs for write side effects.
+
+Handlers are registered by name with ``@job('name')`` and receive a list of
+payloads, so a worker can process many queued events of the same kind in a
+single call. ``dispatch(name, **payload)`` runs the handler inline, and once
+more when the current transaction commits, unless JOBS_ASYNC is enabled and
+the cache is Redis; then the event is appended to a Redis list once the
+current transaction commits, and ``manage.py run_workers`` consumes it.
+
+Workers claim a batch by moving it atomically into their own processing list
+and delete that list only once the batch is handled. Worker names are unique
+per host, process and thread, and each worker keeps a heartbeat key alive
+while it runs; a starting worker puts back in the queue the batches of
+workers whose heartbeat has expired, i.e. that crashed. A worker that loses
+Redis or the database logs the error, backs off and requeues its own batch
+once it is reconnected. Failed events are retried up to JOBS_MAX_ATTEMPTS
+times, then moved to a dead-letter list.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+from collections import defaultdict
+
+import redis
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from mini_twitter.redis_client import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = 'jobs_queue'
+DEAD_LETTER_KEY = 'jobs_dead'
+
+# Longest wait, in seconds, before a worker retries after Redis or the
+# database failed.
+MAX_BACKOFF = 30
+
+HANDLERS = {}
+
+CLAIM_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    redis.call('RPUSH', KEYS[2], unpack(items))
+end
+return items
+"""
+
+
+def job(name):
+    def register(handler):
+        HANDLERS[name] = handler
+        return handler
+    return register
+
+
+def get_queue():
+    """Redis client for the job queue, or None when jobs run inline."""
+    if not settings.JOBS_ASYNC:
+        return None
+    return get_redis()
+
+
+def dispatch(name, **payload):
+    conn = get_queue()
+    if conn is None:
+        HANDLERS[name]([payload])
+        # A reader may rebuild a page or a timeline from the data as it was
+        # before the write commits; running again after COMMIT drops it.
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: HANDLERS[name]([payload]))
+        return
+
+    message = json.dumps({'name': name, 'payload': payload, 'attempts': 0})
+
+    def enqueue():
+        try:
+            conn.rpush(QUEUE_KEY, message)
+        except redis.exceptions.RedisError:
+            logger.warning('Job queue unavailable, running %s inline', name)
+            HANDLERS[name]([payload])
+
+    transaction.on_commit(enqueue)
+
+
+def processing_key(worker_name):
+    return f'jobs_processing_{worker_name}'
+
+
+def heartbeat_key(worker_name):
+    return f'jobs_heartbeat_{worker_name}'
+
+
+def worker_name(index):
+    return f'{socket.gethostname()}-{os.getpid()}-{index}'
+
+
+class Worker:
+    def __init__(self, conn, name, batch_size=None, max_attempts=None):
+        self.conn = conn
+        self.name = name
+        self.batch_size = batch_size or settings.JOBS_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.JOBS_MAX_ATTEMPTS
+        self.claim = conn.register_script(CLAIM_SCRIPT)
+
+    def beat(self):
+        self.conn.set(heartbeat_key(self.name), 1, ex=settings.JOBS_HEARTBEAT_TIMEOUT)
+
+    def keep_alive(self, done):
+        # In its own thread, so a long batch doesn't make the worker look
+        # dead; it stops with the worker loop, whatever ends it.
+        while not done.wait(settings.JOBS_HEARTBEAT_TIMEOUT / 3):
+            try:
+                self.beat()
+            except redis.exceptions.RedisError:
+                logger.warning('Could not refresh the heartbeat of job worker %s', self.name)
+        try:
+            self.conn.delete(heartbeat_key(self.name))
+        except redis.exceptions.RedisError:
+            pass
+
+    def recover(self):
+        """Requeue the batches left behind by workers that are no longer alive."""
+        prefix = processing_key('')
+        for key in self.conn.scan_iter(match=processing_key('*')):
+            owner = key.decode() if isinstance(key, bytes) else key
+            owner = owner[len(prefix):]
+            if owner != self.name and self.conn.exists(heartbeat_key(owner)):
+                continue
+            while self.conn.lmove(key, QUEUE_KEY, 'RIGHT', 'LEFT'):
+                pass
+
+    def run_once(self):
+        """Process one batch; returns the number of events claimed."""
+        messages = self.claim(keys=[QUEUE_KEY, processing_key(self.name)], args=[self.batch_size])
+        if not messages:
+            return 0
+
+        grouped = defaultdict(list)
+        for message in messages:
+            event = json.loads(message)
+            grouped[event['name']].append(event)
+
+        for name, events in grouped.items():
+            try:
+                HANDLERS[name]([event['payload'] for event in events])
+            except Exception:
+                logger.exception('Job %s failed for %d events', name, len(events))
+                self.retry(events)
+
+        self.conn.delete(processing_key(self.name))
+        return len(messages)
+
+    def retry(self, events):
+        pipe = self.conn.pipeline()
+        for event in events:
+            event['attempts'] += 1
+            key = QUEUE_KEY if event['attempts'] < self.max_attempts else DEAD_LETTER_KEY
+            pipe.rpush(key, json.dumps(event))
+        pipe.execute()
+
+    def run_forever(self, poll_interval, stop_event):
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self.keep_alive, args=(done,),
+                                     name=f'{self.name}-heartbeat', daemon=True)
+        heartbeat.start()
+        try:
+            self.loop(poll_interval, stop_event)
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def loop(self, poll_interval, stop_event):
+        recovered = False
+        failures = 0
+        while not stop_event.is_set():
+            try:
+                if not recovered:
+                    self.beat()
+                    # Also puts back this worker's own batch after a failure.
+                    self.recover()
+                    recovered = True
+                close_old_connections()
+                claimed = self.run_once()
+            except Exception:
+                failures += 1
+                recovered = False
+                logger.exception('Job worker %s failed, retrying', self.name)
+                stop_event.wait(min(poll_interval * 2 ** failures, MAX_BACKOFF))
+                continue
+            failures = 0
+            if not claimed:
+                stop_event.wait(poll_interval)
+
+
+def run_pool(conn, workers, poll_interval, stop_event=None):
+    """Run ``workers`` threads until ``stop_event`` is set."""
+    stop_event = stop_event or threading.Event()
+    threads = [
+        threading.Thread(
+            target=Worker(conn, worker_name(i)).run_forever,
+            args=(poll_interval, stop_event),
+            name=f'jobs-worker-{i}',
+            daemon=True,
+        )
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
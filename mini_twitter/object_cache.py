@@ -0,0 +1,276 @@
+"""
+Two-tier read-through cache for serialized objects (post details, profiles,
+the authentication state of users).
+
+Every worker keeps the hottest representations in a bounded in-process LRU
+(OBJECT_CACHE_LOCAL_MAX_ENTRIES entries, each kept at most
+OBJECT_CACHE_LOCAL_TIMEOUT seconds) in front of the shared cache, so a viral
+post is read from Redis once per worker instead of once per request.
+
+Shared entries are version-stamped: each object has a version key holding the
+time of its last invalidation, and its cached representation is stored
+together with the version it was built under. Both are fetched in one
+round trip and a representation whose version is not the current one is a
+miss. A reader that loaded the old row just before a write therefore can't
+put it back in place of the new one. The same versions serve as HTTP
+validators (mini_twitter/conditional.py), so local copies keep the version
+they were built under too.
+
+``invalidate()`` bumps the version (again after COMMIT when called inside a
+transaction) and publishes the ids on EVICTION_CHANNEL. Each worker runs an
+EvictionListener thread subscribed to that channel which drops its local
+copies; while the listener is not subscribed the local tier is bypassed.
+
+Counters (local_hits, shared_hits, misses, hit_ratio) are reported by
+``resilient_cache.metrics()`` next to the other caches.
+"""
+import logging
+import os
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from mini_twitter import async_cache
+from mini_twitter.db_router import primary_reads
+from mini_twitter.redis_client import get_redis
+from mini_twitter.resilient_cache import CACHE_ERRORS, CacheUnavailable, LocalLRU, ResilientCache
+
+
+logger = logging.getLogger(__name__)
+
+EVICTION_CHANNEL = 'object_cache_evictions'
+RECONNECT_DELAY = 1.0
+
+_object_caches = {}
+
+
+class ObjectCache(ResilientCache):
+    def __init__(self, name, alias='default', timeout=None):
+        super().__init__(name, alias)
+        # Lifetime of the shared entries, OBJECT_CACHE_TIMEOUT by default.
+        self.timeout = timeout
+        self.local = LocalLRU(settings.OBJECT_CACHE_LOCAL_MAX_ENTRIES)
+        # Bumped by every eviction: a value read before an eviction is not
+        # copied into the local tier after it.
+        self.epoch = 0
+        _object_caches[name] = self
+
+    def version_key(self, pk):
+        return f'{self.name}_version_{pk}'
+
+    def data_key(self, pk):
+        return f'{self.name}_{pk}'
+
+    def local_copy(self, pk):
+        if not local_copies_enabled():
+            return None
+        stamped = self.local.get(pk)
+        if stamped is not None:
+            self.stats['local_hits'] += 1
+        return stamped
+
+    def fetch(self, pk, load):
+        """Representation of object ``pk``, built by ``load()`` on a miss."""
+        return self.fetch_stamped(pk, load)[1]
+
+    def fetch_stamped(self, pk, load):
+        """
+        ``(version, representation)`` of object ``pk``. The version is the
+        one the representation was built under (a time_ns stamp, usable as an
+        HTTP validator), or None when the shared cache is unavailable.
+        """
+        epoch = self.epoch
+        stamped = self.local_copy(pk)
+        if stamped is not None:
+            return stamped
+
+        version_key, data_key = self.version_key(pk), self.data_key(pk)
+        timeout = self.timeout or settings.OBJECT_CACHE_TIMEOUT
+        try:
+            found = self._call('get_many', [version_key, data_key])
+        except CacheUnavailable:
+            found = None
+
+        version = None
+        if found is not None:
+            version = found.get(version_key)
+            stamped = found.get(data_key)
+            if version is not None and stamped is not None and stamped[0] == version:
+                self.stats['shared_hits'] += 1
+                self.keep_local(pk, stamped, epoch)
+                return stamped
+            if version is None:
+                # Never invalidated (or the key was evicted): start a version
+                # now rather than reuse one a client may still hold.
+                version = self.start_version(version_key, timeout)
+
+        self.stats['misses'] += 1
+        with primary_reads():
+            stamped = (version, load())
+        if version is not None:
+            try:
+                self._call('set', data_key, stamped, timeout=timeout)
+            except CacheUnavailable:
+                pass
+        self.keep_local(pk, stamped, epoch)
+        return stamped
+
+    def versions(self, pks):
+        """
+        Current versions of ``pks`` (None for objects never invalidated).
+        Raises CacheUnavailable when the shared cache is down.
+        """
+        keys = [self.version_key(pk) for pk in pks]
+        found = self._call('get_many', keys) if keys else {}
+        return [found.get(key) for key in keys]
+
+    async def aversions(self, pks):
+        keys = [self.version_key(pk) for pk in pks]
+        found = await async_cache.get_many(keys) if keys else {}
+        return [found.get(key) for key in keys]
+
+    def start_version(self, version_key, timeout):
+        version = time.time_ns()
+        try:
+            if self._call('add', version_key, version, timeout=timeout):
+                return version
+            return self._call('get', version_key)
+        except CacheUnavailable:
+            return None
+
+    async def afetch(self, pk, load):
+        """fetch() for async views; only the local tier is read on the event loop."""
+        return (await self.afetch_stamped(pk, load))[1]
+
+    async def afetch_stamped(self, pk, load):
+        stamped = self.local_copy(pk)
+        if stamped is not None:
+            return stamped
+        return await sync_to_async(self.fetch_stamped)(pk, load)
+
+    def keep_local(self, pk, stamped, epoch):
+        if self.epoch == epoch and local_copies_enabled():
+            self.local.set(pk, stamped, settings.OBJECT_CACHE_LOCAL_TIMEOUT)
+
+    def evict_local(self, pks):
+        self.epoch += 1
+        for pk in pks:
+            self.local.delete(pk)
+
+    def invalidate(self, *pks):
+        """Make the cached representations of ``pks`` stale on every worker."""
+        if not pks:
+            return
+        self._invalidate(pks)
+        # A reader may cache the old row again before the write commits; the
+        # second bump after COMMIT makes that copy unreachable too.
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._invalidate(pks))
+
+    def _invalidate(self, pks):
+        self.evict_local(pks)
+        version = time.time_ns()
+        try:
+            self._call('set_many', {self.version_key(pk): version for pk in pks}, timeout=None)
+        except CacheUnavailable:
+            pass
+        publish(self.name, pks)
+
+    def snapshot(self):
+        stats = dict(self.stats)
+        served = stats.get('local_hits', 0) + stats.get('shared_hits', 0)
+        requests = served + stats.get('misses', 0)
+        stats['hit_ratio'] = round(served / requests, 4) if requests else None
+        stats['local_entries'] = len(self.local)
+        return stats
+
+
+def publish(name, pks):
+    conn = get_redis()
+    if conn is None:
+        return
+    try:
+        conn.publish(EVICTION_CHANNEL, f"{name}:{','.join(str(pk) for pk in pks)}")
+    except CACHE_ERRORS:
+        logger.warning('Could not publish object cache evictions for %s', name)
+
+
+def evict(message):
+    name, _, pks = message.partition(':')
+    object_cache = _object_caches.get(name)
+    if object_cache is not None:
+        object_cache.evict_local([int(pk) for pk in pks.split(',') if pk])
+
+
+def clear_local():
+    for object_cache in _object_caches.values():
+        object_cache.evict_local(())
+        object_cache.local.clear()
+
+
+class EvictionListener(threading.Thread):
+    """Applies the evictions published by the other workers to this one."""
+
+    def __init__(self, conn):
+        super().__init__(name='object-cache-evictions', daemon=True)
+        self.conn = conn
+        self.pid = os.getpid()
+        self.subscribed = False
+
+    def run(self):
+        while True:
+            try:
+                self.listen()
+            except CACHE_ERRORS:
+                logger.warning('Object cache eviction channel lost, retrying in %ss', RECONNECT_DELAY)
+            # Evictions may have been missed while disconnected.
+            self.subscribed = False
+            clear_local()
+            time.sleep(RECONNECT_DELAY)
+
+    def listen(self):
+        pubsub = self.conn.pubsub()
+        try:
+            pubsub.subscribe(EVICTION_CHANNEL)
+            while True:
+                message = pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                if message['type'] == 'subscribe':
+                    clear_local()
+                    self.subscribed = True
+                elif message['type'] == 'message':
+                    evict(message['data'].decode())
+        finally:
+            pubsub.close()
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def local_copies_enabled():
+    """
+    Whether the local tier may be used: always without Redis (a single
+    process), otherwise only while this worker is subscribed to evictions.
+    """
+    global _listener
+    conn = get_redis()
+    if conn is None:
+        return True
+
+    listener = _listener
+    if listener is None or listener.pid != os.getpid():
+        with _listener_lock:
+            if _listener is None or _listener.pid != os.getpid():
+                _listener = EvictionListener(conn)
+                _listener.start()
+            listener = _listener
+    return listener.subscribed
+
+
+post_details = ObjectCache('post_detail')
+profiles = ObjectCache('user_profile')
@@ -0,0 +1,10 @@
+from django_redis import get_redis_connection
+
+
+def get_redis(alias='default'):
+    """Return the raw Redis client behind a cache alias, or None when the
+    configured backend is not django_redis (e.g. LocMemCache in tests)."""
+    try:
+        return get_redis_connection(alias)
+    except NotImplementedError:
+        return None
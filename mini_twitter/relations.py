@@ -0,0 +1,123 @@
+"""
+Single round-trip writes on many-to-many relations.
+
+``manager.add(obj)`` first reads the relation to find missing rows and then
+inserts them, so two concurrent requests adding the same row race each other
+and one of them fails on the unique constraint. These helpers issue one
+``INSERT ... ON CONFLICT DO NOTHING`` or one filtered ``DELETE`` and report
+whether a row actually changed. m2m_changed is sent only in that case, so the
+counter and cache listeners keep working exactly once per real change.
+"""
+from django.db import connections, router, transaction
+from django.db.models.signals import m2m_changed
+
+
+def _columns(manager):
+    opts = manager.through._meta
+    return (
+        opts.get_field(manager.source_field_name).column,
+        opts.get_field(manager.target_field_name).column,
+    )
+
+
+def _send(manager, action, pk_set, using):
+    m2m_changed.send(
+        sender=manager.through,
+        action=action,
+        instance=manager.instance,
+        reverse=manager.reverse,
+        model=manager.model,
+        pk_set=pk_set,
+        using=using,
+    )
+
+
+def add_relation(manager, obj):
+    """Insert one relation row; return True if it did not exist yet."""
+    through = manager.through
+    using = router.db_for_write(through, instance=manager.instance)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    source, target = _columns(manager)
+
+    sql = (
+        f'INSERT INTO {quote(through._meta.db_table)} ({quote(source)}, {quote(target)}) '
+        f'VALUES (%s, %s) ON CONFLICT DO NOTHING RETURNING {quote(through._meta.pk.column)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [manager.instance.pk, obj.pk])
+        inserted = cursor.fetchone() is not None
+
+    if inserted:
+        _send(manager, 'post_add', {obj.pk}, using)
+    return inserted
+
+
+def remove_relation(manager, obj):
+    """Delete one relation row; return True if it existed."""
+    through = manager.through
+    using = router.db_for_write(through, instance=manager.instance)
+    deleted, _ = through._default_manager.using(using).filter(**{
+        manager.source_field_name: manager.instance.pk,
+        manager.target_field_name: obj.pk,
+    }).delete()
+
+    if deleted:
+        _send(manager, 'post_remove', {obj.pk}, using)
+    return bool(deleted)
+
+
+
+def add_relations(manager, objs):
+    """
+    Bulk version of add_relation: one multi-row ``INSERT ... ON CONFLICT DO
+    NOTHING RETURNING``, so only the rows this call inserted are reported,
+    even when concurrent requests add the same ones. Returns the pks actually
+    added.
+    """
+    through = manager.through
+    using = router.db_for_write(through, instance=manager.instance)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    source, target = _columns(manager)
+    pks = sorted({obj.pk for obj in objs})
+    if not pks:
+        return set()
+
+    values = ', '.join(['(%s, %s)'] * len(pks))
+    sql = (
+        f'INSERT INTO {quote(through._meta.db_table)} ({quote(source)}, {quote(target)}) '
+        f'VALUES {values} ON CONFLICT DO NOTHING RETURNING {quote(target)}'
+    )
+    params = [value for pk in pks for value in (manager.instance.pk, pk)]
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            added = {row[0] for row in cursor.fetchall()}
+        if added:
+            _send(manager, 'post_add', added, using)
+    return added
+
+
+def remove_relations(manager, objs):
+    """
+    Bulk version of remove_relation: the existing rows are locked and deleted
+    with one filtered DELETE. Returns the pks actually removed.
+    """
+    through = manager.through
+    using = router.db_for_write(through, instance=manager.instance)
+    source = manager.source_field_name
+    target = manager.target_field_name
+    pks = {obj.pk for obj in objs}
+    if not pks:
+        return set()
+
+    with transaction.atomic(using=using):
+        rows = through._default_manager.using(using).filter(
+            **{source: manager.instance.pk, f'{target}__in': pks}
+        )
+        removed = set(rows.select_for_update().values_list(f'{target}_id', flat=True))
+        if removed:
+            rows.filter(**{f'{target}__in': removed}).delete()
+            _send(manager, 'post_remove', removed, using)
+    return removed
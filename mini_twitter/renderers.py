@@ -0,0 +1,68 @@
+"""
+JSON rendering through orjson.
+
+FastJSONRenderer replaces DRF's JSONRenderer (DEFAULT_RENDERER_CLASSES) and
+``dumps()`` is used for the async views and the NDJSON export. With
+JSON_ENCODER = 'orjson' and orjson installed, documents are encoded by orjson,
+several times faster than the stdlib on feed pages. The output is the same
+compact UTF-8 JSON DRF writes: values orjson doesn't know natively (dates,
+decimals, lazy strings...) go through DRF's JSONEncoder, and U+2028/U+2029 are
+escaped. Without orjson, with JSON_ENCODER = 'stdlib', for indented output
+(the browsable API, ``; indent=`` in Accept) and for anything orjson refuses
+(e.g. integers wider than 64 bits), the stdlib encoder is used.
+"""
+import json
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_encoder = JSONEncoder()
+
+
+def orjson_available():
+    return orjson is not None and settings.JSON_ENCODER == 'orjson'
+
+
+def dumps(data):
+    """``data`` as compact UTF-8 JSON bytes."""
+    if orjson_available():
+        try:
+            return orjson_dumps(data)
+        except orjson.JSONEncodeError:
+            pass
+    return stdlib_dumps(data)
+
+
+def orjson_dumps(data):
+    return escape_separators(orjson.dumps(
+        data,
+        default=_encoder.default,
+        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+    ))
+
+
+def stdlib_dumps(data):
+    return escape_separators(json.dumps(
+        data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':'),
+    ).encode())
+
+
+def escape_separators(content):
+    # Like DRF: keep the output a valid JavaScript literal.
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
@@ -0,0 +1,259 @@
+"""
+Cache access that degrades instead of failing.
+
+ResilientCache wraps a Django cache alias with:
+
+- a circuit breaker shared by everything using that alias: after
+  CACHE_BREAKER_FAILURES consecutive errors it opens, and calls skip Redis
+  entirely for CACHE_BREAKER_RESET seconds before a single probe is let
+  through (half-open);
+- an in-process LRU holding the values most recently read or written,
+  served for at most CACHE_LOCAL_TIMEOUT seconds while the shared cache is
+  unavailable;
+- hit/miss/error counters, exposed by ``metrics()`` and /api/metrics/cache/.
+
+A cache outage then costs latency (the database answers instead) rather
+than availability. Counters and LRU entries are per worker process.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import redis
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+
+CACHE_ERRORS = (redis.exceptions.RedisError, InvalidCacheBackendError)
+
+
+class CacheUnavailable(Exception):
+    """Neither the shared cache nor the local fallback can answer."""
+
+
+CACHE_FAILURES = CACHE_ERRORS + (CacheUnavailable,)
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+
+    def allow(self):
+        """Whether a call may go to the backend now."""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            # Let one probe through; the next one waits another reset_timeout.
+            self.state = self.HALF_OPEN
+            self.opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state == self.CLOSED:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        return {'state': self.state, 'failures': self.failures, 'times_opened': self.times_opened}
+
+
+class LocalLRU:
+    """Bounded, thread-safe in-process cache with per-entry expiry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def refresh(self, mapping, timeout):
+        """Update the keys of ``mapping`` that are already held, ignore the rest."""
+        expires_at = time.monotonic() + timeout
+        with self.lock:
+            for key, value in mapping.items():
+                if key in self.entries:
+                    self.entries[key] = (value, expires_at)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+_breakers = {}
+_registry = {}
+
+
+def breaker_for(alias='default'):
+    breaker = _breakers.get(alias)
+    if breaker is None:
+        breaker = _breakers.setdefault(
+            alias, CircuitBreaker(settings.CACHE_BREAKER_FAILURES, settings.CACHE_BREAKER_RESET)
+        )
+    return breaker
+
+
+class ResilientCache:
+    def __init__(self, name, alias='default'):
+        self.name = name
+        self.alias = alias
+        self.local = LocalLRU(settings.CACHE_LOCAL_MAX_ENTRIES)
+        self.stats = Counter()
+        _registry[name] = self
+
+    @property
+    def breaker(self):
+        return breaker_for(self.alias)
+
+    def _call(self, method, *args, **kwargs):
+        """Run a cache method through the breaker; raises CacheUnavailable on failure."""
+        if not self.breaker.allow():
+            self.stats['short_circuits'] += 1
+            raise CacheUnavailable(self.alias)
+        try:
+            result = getattr(caches[self.alias], method)(*args, **kwargs)
+        except CACHE_ERRORS as exc:
+            self.breaker.record_failure()
+            self.stats['errors'] += 1
+            raise CacheUnavailable(self.alias) from exc
+        self.breaker.record_success()
+        return result
+
+    def lookup(self, key):
+        """
+        Value for ``key``, or None on a miss. Raises CacheUnavailable when
+        the shared cache is down and there is no local copy either.
+        """
+        try:
+            value = self._call('get', key)
+        except CacheUnavailable:
+            value = self.local.get(key)
+            if value is None:
+                self.stats['fallback_misses'] += 1
+                raise
+            self.stats['fallback_hits'] += 1
+            return value
+
+        if value is None:
+            self.stats['misses'] += 1
+        else:
+            self.stats['hits'] += 1
+            self.local.set(key, value, settings.CACHE_LOCAL_TIMEOUT)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            value = self.lookup(key)
+        except CacheUnavailable:
+            return default
+        return default if value is None else value
+
+    def peek(self, key):
+        """
+        Shared value for ``key``, bypassing the counters and the local copy.
+        Raises CacheUnavailable when the shared cache is down.
+        """
+        return self._call('get', key)
+
+    def set(self, key, value, timeout):
+        self.local.set(key, value, settings.CACHE_LOCAL_TIMEOUT)
+        try:
+            self._call('set', key, value, timeout=timeout)
+        except CacheUnavailable:
+            pass
+
+    def add(self, key, value, timeout):
+        """Store ``value`` if ``key`` is missing; False if it exists or the cache is down."""
+        try:
+            added = self._call('add', key, value, timeout=timeout)
+        except CacheUnavailable:
+            return False
+        if added:
+            self.local.set(key, value, settings.CACHE_LOCAL_TIMEOUT)
+        return added
+
+    def delete(self, key):
+        self.local.delete(key)
+        try:
+            self._call('delete', key)
+        except CacheUnavailable:
+            pass
+
+    def set_many(self, mapping, timeout):
+        # Large batches (feed invalidation) must not flush the LRU, so only
+        # the copies already held are updated.
+        self.local.refresh(mapping, settings.CACHE_LOCAL_TIMEOUT)
+        try:
+            self._call('set_many', mapping, timeout=timeout)
+        except CacheUnavailable:
+            pass
+
+    def snapshot(self):
+        stats = dict(self.stats)
+        served = stats.get('hits', 0) + stats.get('fallback_hits', 0)
+        requests = served + stats.get('misses', 0) + stats.get('fallback_misses', 0)
+        stats['hit_ratio'] = round(served / requests, 4) if requests else None
+        stats['local_entries'] = len(self.local)
+        return stats
+
+
+def metrics():
+    return {
+        'breakers': {alias: breaker.snapshot() for alias, breaker in _breakers.items()},
+        'caches': {name: resilient.snapshot() for name, resilient in _registry.items()},
+    }
+
+
+def reset():
+    """Close every breaker and drop local copies and counters."""
+    for breaker in _breakers.values():
+        breaker.record_success()
+    for resilient in _registry.values():
+        resilient.local.clear()
+        resilient.stats.clear()
@@ -16,6 +16,7 @@ from datetime import timedelta
 BASE_DIR = Path(__file__).resolve().parent.parent
 from dotenv import load_dotenv
 import os
+from django.core.exceptions import ImproperlyConfigured
 load_dotenv()
 
 
@@ -52,11 +53,30 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+    'DEFAULT_RENDERER_CLASSES': [
+        'mini_twitter.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Token buckets per user, per client IP and, on views with a
+    # throttle_scope, per client and endpoint (mini_twitter/throttling.py).
+    # Rates are "<requests>/<sec|min|hour|day>"; an empty value turns a
+    # bucket off.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'mini_twitter.throttling.UserThrottle',
+        'mini_twitter.throttling.IPThrottle',
+        'mini_twitter.throttling.EndpointThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'user': os.getenv('THROTTLE_USER_RATE', '600/min') or None,
+        'ip': os.getenv('THROTTLE_IP_RATE', '1200/min') or None,
+        'post_list': os.getenv('THROTTLE_POST_LIST_RATE', '120/min') or None,
+        'post_search': os.getenv('THROTTLE_POST_SEARCH_RATE', '60/min') or None,
+    },
 }
 
 SPECTACULAR_SETTINGS = {
@@ -74,16 +94,27 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Tokens carry a hash of the password, so changing it revokes them.
+    'CHECK_REVOKE_TOKEN': True,
 }
 
+# How long the authentication state of a user (users/authentication.py) may
+# be served from the cache when it changes without going through the model,
+# which bounds how late such a revocation takes effect.
+
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', '60'))
+
 
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'mini_twitter.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'mini_twitter.db_router.ReplicaStickinessMiddleware',
+    'mini_twitter.throttling.RateLimitHeadersMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -109,18 +140,97 @@ TEMPLATES = [
 WSGI_APPLICATION = 'mini_twitter.wsgi.application'
 
 
+# JSON encoding of API responses (mini_twitter/renderers.py): 'orjson' when
+# it is installed, 'stdlib' otherwise. Responses of at least
+# COMPRESSION_MIN_SIZE bytes are compressed with Brotli or gzip, whichever the
+# client accepts (mini_twitter/compression.py).
+
+JSON_ENCODER = os.getenv('JSON_ENCODER', 'orjson')
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '4'))
+
 # Database
 
+# Redis calls fail fast so an outage costs milliseconds, not seconds; see
+# mini_twitter/resilient_cache.py for what happens next.
+
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '0.25'))
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
         'LOCATION': os.getenv('REDIS_URL'),
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "SOCKET_CONNECT_TIMEOUT": REDIS_SOCKET_TIMEOUT,
+            "SOCKET_TIMEOUT": REDIS_SOCKET_TIMEOUT,
         }
     }
 }
 
+# Circuit breaker and in-process fallback in front of the cache
+# (mini_twitter/resilient_cache.py).
+
+CACHE_BREAKER_FAILURES = int(os.getenv('CACHE_BREAKER_FAILURES', '5'))
+CACHE_BREAKER_RESET = float(os.getenv('CACHE_BREAKER_RESET', '10'))
+CACHE_LOCAL_MAX_ENTRIES = int(os.getenv('CACHE_LOCAL_MAX_ENTRIES', '1000'))
+CACHE_LOCAL_TIMEOUT = int(os.getenv('CACHE_LOCAL_TIMEOUT', '30'))
+
+# Post details and profiles (mini_twitter/object_cache.py): shared entries are
+# invalidated explicitly, local copies are evicted through Redis pub/sub and
+# kept for at most OBJECT_CACHE_LOCAL_TIMEOUT seconds.
+
+OBJECT_CACHE_TIMEOUT = int(os.getenv('OBJECT_CACHE_TIMEOUT', str(60 * 60)))
+OBJECT_CACHE_LOCAL_MAX_ENTRIES = int(os.getenv('OBJECT_CACHE_LOCAL_MAX_ENTRIES', '5000'))
+OBJECT_CACHE_LOCAL_TIMEOUT = int(os.getenv('OBJECT_CACHE_LOCAL_TIMEOUT', '10'))
+
+# Cached feed pages are invalidated through per-user generation keys
+# (posts/feed_cache.py), so they can live much longer than a minute.
+
+FEED_CACHE_TIMEOUT = int(os.getenv('FEED_CACHE_TIMEOUT', str(60 * 60 * 6)))
+
+# Stampede protection for cached pages (mini_twitter/stampede.py): lease of
+# the lock held while one request rebuilds a missing page, how often the
+# others check for its result, and how eagerly hot pages refresh early.
+
+STAMPEDE_LOCK_TIMEOUT = float(os.getenv('STAMPEDE_LOCK_TIMEOUT', '5'))
+STAMPEDE_POLL_INTERVAL = float(os.getenv('STAMPEDE_POLL_INTERVAL', '0.05'))
+STAMPEDE_XFETCH_BETA = float(os.getenv('STAMPEDE_XFETCH_BETA', '1.0'))
+
+# Rows fetched per round trip by the streaming post export (?export=ndjson).
+
+POST_EXPORT_CHUNK_SIZE = int(os.getenv('POST_EXPORT_CHUNK_SIZE', '2000'))
+
+# Write-behind likes (posts/likes.py): buffer like toggles in Redis and let
+# `manage.py flush_likes` write them to the database in batches.
+
+LIKES_WRITE_BEHIND = os.getenv('LIKES_WRITE_BEHIND', 'False') == 'True'
+LIKES_FLUSH_INTERVAL = float(os.getenv('LIKES_FLUSH_INTERVAL', '1.0'))
+LIKES_FLUSH_BATCH_SIZE = int(os.getenv('LIKES_FLUSH_BATCH_SIZE', '500'))
+
+# Background jobs (mini_twitter/jobs.py): with JOBS_ASYNC on, post/like side
+# effects are queued in Redis and processed by `manage.py run_workers`.
+# A worker whose heartbeat is older than JOBS_HEARTBEAT_TIMEOUT seconds is
+# considered dead and its unfinished batch is requeued.
+
+JOBS_ASYNC = os.getenv('JOBS_ASYNC', 'False') == 'True'
+JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', '4'))
+JOBS_BATCH_SIZE = int(os.getenv('JOBS_BATCH_SIZE', '100'))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', '5'))
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', '0.5'))
+JOBS_HEARTBEAT_TIMEOUT = int(os.getenv('JOBS_HEARTBEAT_TIMEOUT', '30'))
+
+# Serve the feed, post and user detail reads from the async views
+# (posts/async_views.py). mini_twitter.asgi turns this on by default.
+
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+
+# Feed timelines (fan-out-on-write, see posts/timeline.py)
+
+TIMELINE_MAX_LENGTH = int(os.getenv('TIMELINE_MAX_LENGTH', '800'))
+TIMELINE_CELEBRITY_THRESHOLD = int(os.getenv('TIMELINE_CELEBRITY_THRESHOLD', '10000'))
+TIMELINE_TTL = int(os.getenv('TIMELINE_TTL', str(60 * 60 * 24 * 7)))
+
 
 DATABASES = {
     'default': {
@@ -133,6 +243,23 @@ DATABASES = {
     }
 }
 
+# Read replicas (mini_twitter/db_router.py): every host in DB_REPLICA_HOSTS
+# becomes a `replica_N` alias with the primary's credentials. Reads are spread
+# over them, except for users who wrote in the last DB_REPLICA_STICKY_SECONDS
+# and for the reads that fill a cache.
+
+DB_REPLICA_HOSTS = [host for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host]
+for index, host in enumerate(DB_REPLICA_HOSTS):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['mini_twitter.db_router.PrimaryReplicaRouter']
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', '5'))
+
 
 
 # Password validation
@@ -154,6 +281,46 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing (users/hashers.py). PASSWORD_HASHER picks the algorithm
+# for new and rehashed passwords: argon2 (argon2-cffi), bcrypt (bcrypt) or
+# pbkdf2. The Argon2 defaults are the OWASP minimum (19 MiB, 2 passes, 1
+# lane) rather than Django's 100 MiB / 8 lanes, which is what makes a login
+# burst affordable; raise them if the servers have the headroom. Existing
+# PBKDF2 hashes are rehashed at the next login, which with CHECK_REVOKE_TOKEN
+# revokes the user's other sessions: keep PASSWORD_HASHER=pbkdf2 on an
+# existing deployment until that cutover is planned.
+
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'argon2')
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', '2'))
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', '19456'))  # KiB
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', '1'))
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+PBKDF2_ITERATIONS = int(os.getenv('PBKDF2_ITERATIONS', '1000000'))
+
+PASSWORD_HASHER_CLASSES = {
+    'argon2': 'users.hashers.TunedArgon2PasswordHasher',
+    'bcrypt': 'users.hashers.TunedBCryptSHA256PasswordHasher',
+    'pbkdf2': 'users.hashers.TunedPBKDF2PasswordHasher',
+}
+if PASSWORD_HASHER not in PASSWORD_HASHER_CLASSES:
+    raise ImproperlyConfigured(f"PASSWORD_HASHER must be one of {', '.join(PASSWORD_HASHER_CLASSES)}")
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CLASSES[PASSWORD_HASHER],
+    *(path for name, path in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Login attempts (users/login_limiter.py): sliding windows of
+# LOGIN_ATTEMPT_WINDOW seconds per email address and, for failed attempts,
+# per client IP, checked before the user is looked up or any password is
+# hashed.
+
+LOGIN_ATTEMPT_WINDOW = int(os.getenv('LOGIN_ATTEMPT_WINDOW', '300'))
+LOGIN_MAX_ATTEMPTS_PER_EMAIL = int(os.getenv('LOGIN_MAX_ATTEMPTS_PER_EMAIL', '5'))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv('LOGIN_MAX_ATTEMPTS_PER_IP', '50'))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
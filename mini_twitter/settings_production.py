@@ -0,0 +1,76 @@
+"""
+Production settings for mini_twitter.
+
+Builds on mini_twitter.settings and only changes what matters when serving
+real traffic: no debug, persistent (or pooled) database connections and a
+sized Redis connection pool. gunicorn.conf.py selects this module unless
+DJANGO_SETTINGS_MODULE says otherwise.
+"""
+import importlib.util
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES, DATABASES, REDIS_SOCKET_TIMEOUT
+
+
+DEBUG = False
+
+ALLOWED_HOSTS = [host for host in os.getenv('DJANGO_ALLOWED_HOSTS', 'localhost').split(',') if host]
+
+# Database connections
+#
+# Under WSGI every worker keeps its connection open for DB_CONN_MAX_AGE
+# seconds and checks it is still alive before reusing it. Under ASGI (the
+# default uvicorn workers, mini_twitter.asgi sets SERVING_ASGI) sync ORM calls
+# run in per-request threads, so persistent connections are never reused and
+# only pile up until they time out: there DB_CONN_MAX_AGE defaults to 0.
+# Setting DB_POOL_MAX_SIZE switches to Django's psycopg 3 connection pool,
+# which reuses connections under both.
+
+SERVING_ASGI = os.getenv('SERVING_ASGI', 'False') == 'True'
+
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '0' if SERVING_ASGI else '600'))
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '0'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+
+if DB_POOL_MAX_SIZE and importlib.util.find_spec('psycopg_pool') is None:
+    raise ImproperlyConfigured('DB_POOL_MAX_SIZE requires psycopg 3 with its pool: pip install "psycopg[binary,pool]"')
+
+# The primary and every read replica get the same connection handling.
+DATABASES = {alias: {**database} for alias, database in DATABASES.items()}
+for database in DATABASES.values():
+    if DB_POOL_MAX_SIZE:
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS'] = {
+            'pool': {
+                'min_size': DB_POOL_MIN_SIZE,
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': DB_POOL_TIMEOUT,
+            },
+        }
+    else:
+        database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+        database['CONN_HEALTH_CHECKS'] = True
+
+# Redis connection pool (django_redis and mini_twitter.async_cache). When all
+# REDIS_MAX_CONNECTIONS are busy a caller waits up to REDIS_POOL_TIMEOUT
+# seconds for one to be released instead of failing straight away.
+
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', '2'))
+
+CACHES = {**CACHES, 'default': {**CACHES['default']}}
+CACHES['default']['OPTIONS'] = {
+    **CACHES['default'].get('OPTIONS', {}),
+    'CONNECTION_POOL_CLASS': 'redis.BlockingConnectionPool',
+    'CONNECTION_POOL_KWARGS': {
+        'max_connections': REDIS_MAX_CONNECTIONS,
+        'timeout': REDIS_POOL_TIMEOUT,
+        'socket_connect_timeout': REDIS_SOCKET_TIMEOUT,
+        'socket_timeout': REDIS_SOCKET_TIMEOUT,
+        'health_check_interval': 30,
+    },
+}
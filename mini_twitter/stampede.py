@@ -0,0 +1,173 @@
+"""
+Cache stampede protection for expensive cached values (feed and list pages).
+
+``get_or_compute()`` wraps the usual "get, compute on a miss, set" sequence
+of a ResilientCache with two safeguards:
+
+- single flight: on a miss only the request that takes a short lease lock
+  (``<key>_lock``, STAMPEDE_LOCK_TIMEOUT seconds) computes the value; the
+  others poll the cache for its result instead of running the same query,
+  and compute it themselves only if the lease runs out first;
+- probabilistic early expiration (XFetch): entries remember how long they
+  took to compute, and every read refreshes the entry early with a
+  probability that rises as its expiry gets closer (and the slower it is to
+  rebuild). Hot keys are then refreshed by one request while the others
+  keep reading the current value, instead of all missing at once.
+
+Values are stored as ``(value, compute_seconds, expires_at)`` tuples, so
+keys cached through this module must only be read through it.
+``aget_or_compute()`` is the counterpart for the async views.
+"""
+import asyncio
+import math
+import random
+import time
+
+from django.conf import settings
+
+from mini_twitter import async_cache
+from mini_twitter.db_router import primary_reads
+from mini_twitter.resilient_cache import CACHE_FAILURES, CacheUnavailable
+
+
+def lock_key(key):
+    return f'{key}_lock'
+
+
+def pack(value, delta, timeout):
+    return (value, delta, time.time() + timeout)
+
+
+def unpack(entry):
+    """(value, compute_seconds, expires_at), or None for anything else."""
+    if isinstance(entry, tuple) and len(entry) == 3:
+        return entry
+    return None
+
+
+def expires_early(entry):
+    _, delta, expires_at = entry
+    # -log(u) for u in (0, 1] is exponentially distributed: usually small,
+    # occasionally large enough to move the expiry forward.
+    gap = -delta * settings.STAMPEDE_XFETCH_BETA * math.log(1.0 - random.random())
+    return time.time() + gap >= expires_at
+
+
+def _compute(compute, timeout):
+    started = time.monotonic()
+    # What gets cached must not come from a lagging replica.
+    with primary_reads():
+        value = compute()
+    return value, pack(value, time.monotonic() - started, timeout)
+
+
+def get_or_compute(store, key, compute, timeout):
+    """Cached value of ``key`` in ``store``, computed by ``compute()`` at most once at a time."""
+    try:
+        entry = unpack(store.lookup(key))
+    except CacheUnavailable:
+        return compute()
+    if entry is not None and not expires_early(entry):
+        return entry[0]
+
+    if store.add(lock_key(key), 1, timeout=settings.STAMPEDE_LOCK_TIMEOUT):
+        if entry is not None:
+            store.stats['early_refreshes'] += 1
+        try:
+            value, entry = _compute(compute, timeout)
+            store.set(key, entry, timeout=timeout)
+        finally:
+            store.delete(lock_key(key))
+        return value
+
+    if entry is not None:
+        # Another request is refreshing it already.
+        return entry[0]
+
+    deadline = time.monotonic() + settings.STAMPEDE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(settings.STAMPEDE_POLL_INTERVAL)
+        try:
+            entry = unpack(store.peek(key))
+        except CacheUnavailable:
+            break
+        if entry is not None:
+            store.stats['coalesced'] += 1
+            return entry[0]
+
+    store.stats['lock_waits_abandoned'] += 1
+    value, entry = _compute(compute, timeout)
+    store.set(key, entry, timeout=timeout)
+    return value
+
+
+def recompute(store, key, compute, timeout):
+    """Compute ``key`` again and store it, for a value known to be stale."""
+    value, entry = _compute(compute, timeout)
+    store.set(key, entry, timeout=timeout)
+    return value
+
+
+async def aget_or_compute(store, key, compute, timeout):
+    """
+    get_or_compute() for async views: cache calls go through
+    mini_twitter.async_cache, ``compute`` is a coroutine function and
+    ``store`` only keeps the counters.
+    """
+    try:
+        entry = unpack(await async_cache.get(key))
+    except CACHE_FAILURES:
+        return await compute()
+    if entry is not None and not expires_early(entry):
+        return entry[0]
+
+    try:
+        locked = await async_cache.add(lock_key(key), 1, timeout=settings.STAMPEDE_LOCK_TIMEOUT)
+    except CACHE_FAILURES:
+        locked = None
+    if locked is None:
+        return entry[0] if entry is not None else await compute()
+
+    if locked:
+        if entry is not None:
+            store.stats['early_refreshes'] += 1
+        try:
+            return await _acompute_and_store(key, compute, timeout)
+        finally:
+            try:
+                await async_cache.delete(lock_key(key))
+            except CACHE_FAILURES:
+                pass
+
+    if entry is not None:
+        return entry[0]
+
+    deadline = time.monotonic() + settings.STAMPEDE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(settings.STAMPEDE_POLL_INTERVAL)
+        try:
+            entry = unpack(await async_cache.get(key))
+        except CACHE_FAILURES:
+            break
+        if entry is not None:
+            store.stats['coalesced'] += 1
+            return entry[0]
+
+    store.stats['lock_waits_abandoned'] += 1
+    return await _acompute_and_store(key, compute, timeout)
+
+
+async def arecompute(key, compute, timeout):
+    """recompute() for async views."""
+    return await _acompute_and_store(key, compute, timeout)
+
+
+async def _acompute_and_store(key, compute, timeout):
+    started = time.monotonic()
+    with primary_reads():
+        value = await compute()
+    try:
+        await async_cache.set(key, pack(value, time.monotonic() - started, timeout), timeout=timeout)
+    except CACHE_FAILURES:
+        pass
+    return value
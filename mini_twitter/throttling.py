@@ -0,0 +1,250 @@
+"""
+Token-bucket request throttling.
+
+Every request draws one token from up to three buckets, each refilled at its
+rate from DEFAULT_THROTTLE_RATES and holding at most one rate's worth of
+tokens, so a client can burst up to its budget and then continues at the
+sustained rate instead of waiting for a fixed window to roll over:
+
+- ``user``: per authenticated user (UserThrottle);
+- ``ip``: per client address, authenticated or not (IPThrottle);
+- ``<throttle_scope>``: per client on views that set ``throttle_scope``,
+  e.g. the post list, so one scraper paging it can't saturate the database
+  while staying inside its overall budget (EndpointThrottle).
+
+With Redis the buckets are hashes updated by one Lua script, so the check is
+atomic and shared by every worker. Without Redis, or while the cache circuit
+breaker is open, each worker keeps its own buckets in memory (LocalBuckets)
+and the budgets apply per process.
+
+The most restrictive bucket a request drew from is reported in its response
+by RateLimitHeadersMiddleware: X-RateLimit-Limit (bucket size),
+X-RateLimit-Remaining (tokens left) and X-RateLimit-Reset (seconds until the
+bucket is full again). Refused requests get a 429 with Retry-After.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from mini_twitter.async_cache import get_async_redis
+from mini_twitter.redis_client import get_redis
+from mini_twitter.resilient_cache import CACHE_ERRORS, breaker_for
+
+
+logger = logging.getLogger(__name__)
+
+# Buckets kept by the in-memory fallback; the least recently used go first.
+LOCAL_MAX_BUCKETS = 10000
+
+TOKEN_BUCKET_SCRIPT = """
+local capacity, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens, ts = tonumber(bucket[1]), tonumber(bucket[2])
+if tokens == nil then
+    tokens, ts = capacity, now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed, retry = 0, 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry = math.ceil((1 - tokens) / rate)
+end
+local full = math.ceil((capacity - tokens) / rate)
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], full + 1000)
+return {allowed, math.floor(tokens), retry, full}
+"""
+
+
+class LocalBuckets:
+    """In-process token buckets, used when Redis is not available."""
+
+    def __init__(self, max_buckets):
+        self.max_buckets = max_buckets
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        with self.lock:
+            tokens, ts = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0, now - ts) * rate)
+            allowed, retry = tokens >= 1, 0
+            if allowed:
+                tokens -= 1
+            else:
+                retry = math.ceil((1 - tokens) / rate)
+            self.buckets[key] = (tokens, now)
+            self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
+            return allowed, math.floor(tokens), retry, math.ceil((capacity - tokens) / rate)
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+local_buckets = LocalBuckets(LOCAL_MAX_BUCKETS)
+
+
+def take(key, capacity, rate):
+    """
+    Draw a token from bucket ``key`` (``rate`` tokens per millisecond).
+    Returns (allowed, tokens left, ms until the next token, ms until full).
+    """
+    now = time.time_ns() // 1_000_000
+    conn = get_redis()
+    breaker = breaker_for()
+    if conn is not None and breaker.allow():
+        try:
+            script = conn.register_script(TOKEN_BUCKET_SCRIPT)
+            allowed, remaining, retry, full = script(keys=[key], args=[capacity, rate, now])
+        except CACHE_ERRORS:
+            breaker.record_failure()
+            logger.warning('Throttling falling back to in-process buckets')
+        else:
+            breaker.record_success()
+            return bool(allowed), remaining, retry, full
+    return local_buckets.take(key, capacity, rate, now)
+
+
+async def atake(key, capacity, rate):
+    """take() for async views, through the asyncio Redis client."""
+    now = time.time_ns() // 1_000_000
+    conn = get_async_redis()
+    breaker = breaker_for()
+    if conn is not None and breaker.allow():
+        try:
+            script = conn.register_script(TOKEN_BUCKET_SCRIPT)
+            allowed, remaining, retry, full = await script(keys=[key], args=[capacity, rate, now])
+        except CACHE_ERRORS:
+            breaker.record_failure()
+            logger.warning('Throttling falling back to in-process buckets')
+        else:
+            breaker.record_success()
+            return bool(allowed), remaining, retry, full
+    return local_buckets.take(key, capacity, rate, now)
+
+
+def reset():
+    local_buckets.clear()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """SimpleRateThrottle with a token bucket in place of the request history."""
+
+    def allow_request(self, request, view):
+        key = self.bucket_key(request, view)
+        if key is None:
+            return True
+        return self.record(request, take(key, *self.bucket()))
+
+    async def aallow_request(self, request, view):
+        key = self.bucket_key(request, view)
+        if key is None:
+            return True
+        return self.record(request, await atake(key, *self.bucket()))
+
+    def bucket_key(self, request, view):
+        if self.rate is None:
+            return None
+        return self.get_cache_key(request, view)
+
+    def bucket(self):
+        """Size of the bucket and its refill rate in tokens per millisecond."""
+        return self.num_requests, self.num_requests / (self.duration * 1000)
+
+    def record(self, request, result):
+        allowed, remaining, retry, full = result
+        self.retry_after = retry / 1000
+        # Keep the most restrictive bucket for RateLimitHeadersMiddleware.
+        request = getattr(request, '_request', request)
+        current = getattr(request, 'rate_limit', None)
+        if current is None or remaining < current[1]:
+            request.rate_limit = (self.num_requests, remaining, math.ceil(full / 1000))
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class UserThrottle(TokenBucketThrottle):
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
+
+
+class IPThrottle(TokenBucketThrottle):
+    scope = 'ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class EndpointThrottle(TokenBucketThrottle):
+    """Per-client budget on views with a ``throttle_scope``, like ScopedRateThrottle."""
+
+    def __init__(self):
+        # The rate depends on the view, see bucket_key().
+        pass
+
+    def bucket_key(self, request, view):
+        self.scope = getattr(view, 'throttle_scope', None)
+        if not self.scope:
+            return None
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return None
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        if request.user and request.user.is_authenticated:
+            ident = f'user_{request.user.pk}'
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+async def acheck_throttles(request, view):
+    """APIView.check_throttles() for the async views; ``view`` is their DRF class."""
+    throttle_classes = getattr(view, 'throttle_classes', api_settings.DEFAULT_THROTTLE_CLASSES)
+    durations = []
+    for throttle in (throttle_class() for throttle_class in throttle_classes):
+        if not await throttle.aallow_request(request, view):
+            durations.append(throttle.wait())
+    if durations:
+        raise exceptions.Throttled(wait=max(durations))
+
+
+@sync_and_async_middleware
+def RateLimitHeadersMiddleware(get_response):
+    """Add the X-RateLimit-* headers recorded by the throttles to the response."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            return add_headers(request, await get_response(request))
+    else:
+        def middleware(request):
+            return add_headers(request, get_response(request))
+    return middleware
+
+
+def add_headers(request, response):
+    rate_limit = getattr(request, 'rate_limit', None)
+    if rate_limit is not None:
+        limit, remaining, reset_after = rate_limit
+        response['X-RateLimit-Limit'] = str(limit)
+        response['X-RateLimit-Remaining'] = str(remaining)
+        response['X-RateLimit-Reset'] = str(reset_after)
+    return response
@@ -1,6 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
 from posts.views import FeedView
+from posts import async_views
+from mini_twitter.async_api import read_view
+from mini_twitter.views import CacheMetricsView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 
@@ -8,7 +11,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/users/', include('users.urls')),
     path('api/posts/', include('posts.urls')),
-    path('api/feed/', FeedView.as_view(), name='feed'),
+    path('api/feed/', read_view(FeedView.as_view(), async_views.feed), name='feed'),
+    path('api/metrics/cache/', CacheMetricsView.as_view(), name='cache-metrics'),
     
     
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
@@ -0,0 +1,15 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_spectacular.utils import extend_schema, OpenApiTypes
+
+from mini_twitter import resilient_cache
+
+
+@extend_schema(tags=['Metrics'], responses=OpenApiTypes.OBJECT)
+class CacheMetricsView(APIView):
+    """Circuit breaker states and hit/miss counters of this worker process."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(resilient_cache.metrics())
@@ -0,0 +1,125 @@
+"""
+Async (ASGI) versions of the post and feed read endpoints.
+
+They replace FeedView, PostListView and PostDetailView in the URLconf when
+ASYNC_READ_VIEWS is on, which mini_twitter.asgi does by default. Queries go
+through the async ORM and cached pages through redis.asyncio, so a request
+waiting on the database, Redis or a slow client does not hold a worker
+thread. Serialization still goes through the DRF serializers, in a thread,
+because they read the like buffer and may query the database. Post details
+come from the two-tier object cache (mini_twitter/object_cache.py), and
+numbered feed pages from the Redis timelines (posts/timeline.py).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.pagination import PageNumberPagination
+
+from mini_twitter import conditional, object_cache, stampede
+from mini_twitter.async_api import async_api_view, json_response
+from mini_twitter.resilient_cache import CACHE_FAILURES
+from . import feed_cache
+from .feed_cache import apost_list_cache_key, feed_cache_key
+from .models import Post
+from .pagination import AsyncPageNumberPagination, KeysetPagination
+from .serializers import CompactPostSerializer
+from .timeline import feed_queryset
+from .views import FeedView, ndjson_line, post_detail_data, serialize_posts, shaped_posts
+
+
+async def cached_page(cache_key, build):
+    """Page cached under ``cache_key`` (None: not cacheable), built once by ``build()``."""
+    if cache_key is None:
+        return await build()
+    return await stampede.aget_or_compute(feed_cache.pages, cache_key, build, settings.FEED_CACHE_TIMEOUT)
+
+
+async def paginated_posts(paginator, queryset, request, fields):
+    page = await paginator.apaginate_queryset(queryset, request)
+    data = await sync_to_async(serialize_posts)(page, request, fields)
+    return paginator.get_paginated_response(data).data
+
+
+async def feed_page(request, keyset, fields):
+    # Keyset pages are a single indexed range scan on the async ORM. Numbered
+    # pages are read from the user's Redis timeline as FeedView does, in a
+    # thread: the timeline, its fallback and the serializers are synchronous.
+    if keyset:
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(feed_queryset(request.user, shaped_posts(fields)), request)
+        data = await sync_to_async(serialize_posts)(page, request, fields)
+        return page, paginator.get_paginated_response(data).data
+    return await sync_to_async(FeedView().page_posts)(request, PageNumberPagination(), fields)
+
+
+@async_api_view
+async def feed(request):
+    keyset = KeysetPagination.requested(request)
+    if keyset:
+        position = KeysetPagination.position(request)
+    else:
+        position = request.query_params.get('page', '1')
+    fields = CompactPostSerializer.requested_fields(request)
+    if fields:
+        position = f"{position}_fields_{'.'.join(fields)}"
+
+    try:
+        generation = await feed_cache.afeed_generation(request.user.id)
+    except CACHE_FAILURES:
+        return (await feed_page(request, keyset, fields))[1]
+
+    cache_key = feed_cache_key(request.user.id, position, generation)
+    entry = await feed_cache.acached_feed_page(cache_key, lambda: feed_page(request, keyset, fields))
+
+    async def build():
+        return json_response(entry['page'])
+    return await conditional.arespond(
+        request, conditional.validators(entry['built_at'], request.user.id, request.get_full_path()), build
+    )
+
+
+@async_api_view
+async def post_list(request):
+    if request.query_params.get('export') == 'ndjson':
+        return StreamingHttpResponse(export_ndjson(), content_type='application/x-ndjson')
+    fields = CompactPostSerializer.requested_fields(request)
+
+    if not KeysetPagination.requested(request):
+        posts = shaped_posts(fields).order_by('-created_at', '-id')
+        return await paginated_posts(AsyncPageNumberPagination(), posts, request, fields)
+
+    # Shared cache entries only hold the full representation: compact
+    # rows carry the per-reader liked_by_me flag.
+    cache_key = None
+    if not fields:
+        try:
+            cache_key = await apost_list_cache_key(KeysetPagination.position(request))
+        except CACHE_FAILURES:
+            pass
+    return await cached_page(
+        cache_key, lambda: paginated_posts(KeysetPagination(), shaped_posts(fields), request, fields)
+    )
+
+
+async def export_ndjson():
+    posts = Post.objects.with_engagement().order_by('-created_at', '-id')
+    chunk_size = settings.POST_EXPORT_CHUNK_SIZE
+
+    def lines(chunk):
+        return b''.join(ndjson_line(post) for post in chunk)
+
+    chunk = []
+    async for post in posts.aiterator(chunk_size=chunk_size):
+        chunk.append(post)
+        if len(chunk) >= chunk_size:
+            yield await sync_to_async(lines)(chunk)
+            chunk = []
+    if chunk:
+        yield await sync_to_async(lines)(chunk)
+
+
+@async_api_view
+async def post_detail(request, pk):
+    version, data = await object_cache.post_details.afetch_stamped(pk, lambda: post_detail_data(pk))
+    return conditional.respond(request, conditional.validators(version, 'post', pk),
+                               lambda: json_response(data))
@@ -0,0 +1,47 @@
+"""
+Side effects of post writes, run through mini_twitter.jobs: inline by
+default, or batched by the run_workers command when JOBS_ASYNC is on.
+"""
+from mini_twitter.jobs import job
+from mini_twitter.resilient_cache import CACHE_ERRORS
+from .models import Post
+from . import feed_cache, timeline
+
+
+def refresh_feeds(author_ids):
+    try:
+        feed_cache.bump_follower_feeds(list(author_ids))
+        feed_cache.bump_post_list_generation()
+    except CACHE_ERRORS:
+        pass
+
+
+@job('post_created')
+def post_created(payloads):
+    posts = Post.objects.select_related('author').in_bulk([payload['post_id'] for payload in payloads])
+    for post in posts.values():
+        timeline.fan_out_post(post)
+    refresh_feeds({post.author_id for post in posts.values()})
+
+
+@job('post_deleted')
+def post_deleted(payloads):
+    for payload in payloads:
+        timeline.remove_post(payload['post_id'], payload['author_id'])
+    refresh_feeds({payload['author_id'] for payload in payloads})
+
+
+@job('feeds_changed')
+def feeds_changed(payloads):
+    refresh_feeds({author_id for payload in payloads for author_id in payload['author_ids']})
+
+
+@job('likes_changed')
+def likes_changed(payloads):
+    # Feed pages holding the posts notice the new post_details versions by
+    # themselves (feed_cache.stale_versions); only the shared post list
+    # pages are keyed by a generation.
+    try:
+        feed_cache.bump_post_list_generation()
+    except CACHE_ERRORS:
+        pass
@@ -0,0 +1,202 @@
+"""
+Versioned feed cache keys.
+
+Each user has a feed generation token stored in the cache. Cached feed pages
+embed the token in their key, so bumping it for a user makes every page cached
+under the previous generation unreachable (they simply age out). Writes that
+change what a user sees in their feed bump the generation of the affected
+users, which lets FEED_CACHE_TIMEOUT be measured in hours instead of seconds.
+
+Likes are the exception: bumping every follower of the author on each like
+would cost one write per follower. A cached feed page instead records when
+it was built and which posts it holds, and is rebuilt once one of them has
+a post_details version (moved forward by every like) newer than the page:
+one read of those versions per request instead of a write per follower.
+
+Generations and pages go through ResilientCache: when Redis is down the
+last known values are served from the worker's memory for a short while,
+and when even those are missing feed_cache_key() raises CacheUnavailable so
+the caller serves the page straight from the database.
+"""
+import time
+
+from django.conf import settings
+
+from mini_twitter import async_cache, object_cache, stampede
+from mini_twitter.resilient_cache import CACHE_FAILURES, CacheUnavailable, ResilientCache
+from users.models import User
+
+
+BUMP_BATCH_SIZE = 1000
+# Versions are time_ns stamps taken by whichever server handled the like;
+# one this close to the build of a page may not be reflected in it.
+CLOCK_SKEW_NS = 1_000_000_000
+POST_LIST_GENERATION_KEY = 'post_list_generation'
+
+generations = ResilientCache('feed_generations')
+pages = ResilientCache('feed_pages')
+
+
+def feed_generation_key(user_id):
+    return f'feed_generation_user_{user_id}'
+
+
+def _new_generation():
+    return time.time_ns()
+
+
+def _generation(key):
+    generation = generations.lookup(key)
+    if generation is None:
+        generation = _new_generation()
+        if not generations.add(key, generation, timeout=None):
+            generation = generations.get(key, generation)
+    return generation
+
+
+async def _ageneration(key):
+    generation = await async_cache.get(key)
+    if generation is None:
+        generation = _new_generation()
+        if not await async_cache.add(key, generation, timeout=None):
+            generation = await async_cache.get(key, generation)
+    return generation
+
+
+def feed_generation(user_id):
+    return _generation(feed_generation_key(user_id))
+
+
+async def afeed_generation(user_id):
+    return await _ageneration(feed_generation_key(user_id))
+
+
+def feed_cache_key(user_id, page, generation=None):
+    if generation is None:
+        generation = feed_generation(user_id)
+    return f'feed_user_{user_id}_gen_{generation}_page_{page}'
+
+
+async def afeed_cache_key(user_id, page):
+    return feed_cache_key(user_id, page, await afeed_generation(user_id))
+
+
+def post_list_cache_key(position):
+    """Post list pages are the same for every reader, so their keys are shared."""
+    return f'post_list_gen_{_generation(POST_LIST_GENERATION_KEY)}_{position}'
+
+
+async def apost_list_cache_key(position):
+    return f'post_list_gen_{await _ageneration(POST_LIST_GENERATION_KEY)}_{position}'
+
+
+def bump_post_list_generation():
+    generations.set(POST_LIST_GENERATION_KEY, _new_generation(), timeout=None)
+
+
+def bump_feed_generations(user_ids):
+    generation = _new_generation()
+    batch = {}
+    for user_id in user_ids:
+        batch[feed_generation_key(user_id)] = generation
+        if len(batch) >= BUMP_BATCH_SIZE:
+            generations.set_many(batch, timeout=None)
+            batch = {}
+    if batch:
+        generations.set_many(batch, timeout=None)
+
+
+def bump_follower_feeds(author_ids):
+    follower_ids = (
+        User.objects.filter(following__in=author_ids)
+        .values_list('id', flat=True)
+        .distinct()
+    )
+    bump_feed_generations(follower_ids.iterator())
+
+
+def feed_entry(build, seen=None):
+    """
+    Cache entry for the feed page ``build()`` returns as ``(posts, data)``.
+    ``seen`` maps post ids to the versions read just before the build, which
+    the page is known to reflect.
+    """
+    built_at = time.time_ns()
+    entry = page_entry(built_at, *build(), seen)
+    if seen is None:
+        try:
+            entry['seen'] = settled_versions(entry, object_cache.post_details.versions(entry['post_ids']))
+        except CacheUnavailable:
+            pass
+    return entry
+
+
+async def afeed_entry(build, seen=None):
+    built_at = time.time_ns()
+    entry = page_entry(built_at, *await build(), seen)
+    if seen is None:
+        try:
+            entry['seen'] = settled_versions(entry, await object_cache.post_details.aversions(entry['post_ids']))
+        except CACHE_FAILURES:
+            pass
+    return entry
+
+
+def page_entry(built_at, posts, data, seen):
+    return {'built_at': built_at, 'post_ids': [post.pk for post in posts], 'seen': seen or {}, 'page': data}
+
+
+def settled_versions(entry, versions):
+    # A first build has no earlier snapshot: versions stamped before it
+    # started belong to writes it saw, so a like just before the page was
+    # built does not make it stale at once.
+    return {
+        pk: version for pk, version in zip(entry['post_ids'], versions)
+        if version is not None and version < entry['built_at']
+    }
+
+
+def is_current(entry, versions):
+    """False once a post of the page was liked, unliked or edited after it was built."""
+    limit = entry['built_at'] - CLOCK_SKEW_NS
+    return all(
+        version is None or version < limit or entry['seen'].get(pk) == version
+        for pk, version in zip(entry['post_ids'], versions)
+    )
+
+
+def stale_versions(entry):
+    """Versions of the posts of a stale ``entry``, or None if it is current."""
+    try:
+        versions = object_cache.post_details.versions(entry['post_ids'])
+    except CacheUnavailable:
+        return None
+    return None if is_current(entry, versions) else dict(zip(entry['post_ids'], versions))
+
+
+async def astale_versions(entry):
+    try:
+        versions = await object_cache.post_details.aversions(entry['post_ids'])
+    except CACHE_FAILURES:
+        return None
+    return None if is_current(entry, versions) else dict(zip(entry['post_ids'], versions))
+
+
+def cached_feed_page(cache_key, build):
+    """Feed page entry cached under ``cache_key``, see feed_entry()."""
+    entry = stampede.get_or_compute(pages, cache_key, lambda: feed_entry(build), settings.FEED_CACHE_TIMEOUT)
+    seen = stale_versions(entry)
+    if seen is not None:
+        entry = stampede.recompute(pages, cache_key, lambda: feed_entry(build, seen), settings.FEED_CACHE_TIMEOUT)
+    return entry
+
+
+async def acached_feed_page(cache_key, build):
+    """cached_feed_page() for async views; ``build`` is a coroutine function."""
+    entry = await stampede.aget_or_compute(
+        pages, cache_key, lambda: afeed_entry(build), settings.FEED_CACHE_TIMEOUT
+    )
+    seen = await astale_versions(entry)
+    if seen is not None:
+        entry = await stampede.arecompute(cache_key, lambda: afeed_entry(build, seen), settings.FEED_CACHE_TIMEOUT)
+    return entry
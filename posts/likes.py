@@ -0,0 +1,244 @@
+"""
+Write-behind like buffer.
+
+When LIKES_WRITE_BEHIND is enabled and the cache is Redis, PostLikeView
+and PostBulkLikeView record likes in Redis and return immediately. Each post keeps two sets of
+pending likers (added / removed since the last flush) and an integer delta
+for its like count; the ids of posts with pending changes are tracked in a
+set. The flush_likes management command drains that set and applies the
+changes to the likes through-table in batches.
+
+Readers merge the pending changes on top of the flushed rows, see
+PostSerializer.
+"""
+import logging
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from mini_twitter import object_cache
+from mini_twitter.redis_client import get_redis
+from .models import Post
+from . import feed_cache
+
+
+logger = logging.getLogger(__name__)
+
+Like = Post.likes.through
+
+DIRTY_POSTS_KEY = 'likes_dirty_posts'
+
+TOGGLE_SCRIPT = """
+local added, removed, delta, dirty = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local user_id, liked_in_db, post_id = ARGV[1], ARGV[2], ARGV[3]
+redis.call('SADD', dirty, post_id)
+if redis.call('SREM', added, user_id) == 1 then
+    redis.call('DECR', delta)
+    return 0
+end
+if redis.call('SREM', removed, user_id) == 1 then
+    redis.call('INCR', delta)
+    return 1
+end
+if liked_in_db == '1' then
+    redis.call('SADD', removed, user_id)
+    redis.call('DECR', delta)
+    return 0
+end
+redis.call('SADD', added, user_id)
+redis.call('INCR', delta)
+return 1
+"""
+
+# Bulk likes and unlikes set the state instead of toggling it: ARGV[4] is 1
+# to like, 0 to unlike. Returns 1 if the like state changed.
+SET_SCRIPT = """
+local added, removed, delta, dirty = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local user_id, liked_in_db, post_id, like = ARGV[1], ARGV[2], ARGV[3], ARGV[4]
+local undo, pending, step = removed, added, 1
+if like == '0' then
+    undo, pending, step = added, removed, -1
+end
+if redis.call('SREM', undo, user_id) == 1 then
+    redis.call('INCRBY', delta, step)
+    redis.call('SADD', dirty, post_id)
+    return 1
+end
+if redis.call('SISMEMBER', pending, user_id) == 1 or liked_in_db == like then
+    return 0
+end
+redis.call('SADD', pending, user_id)
+redis.call('INCRBY', delta, step)
+redis.call('SADD', dirty, post_id)
+return 1
+"""
+
+DRAIN_SCRIPT = """
+local added = redis.call('SMEMBERS', KEYS[1])
+local removed = redis.call('SMEMBERS', KEYS[2])
+redis.call('DEL', KEYS[1], KEYS[2], KEYS[3])
+return {added, removed}
+"""
+
+
+def added_key(post_id):
+    return f'post_{post_id}_likes_added'
+
+
+def removed_key(post_id):
+    return f'post_{post_id}_likes_removed'
+
+
+def delta_key(post_id):
+    return f'post_{post_id}_likes_delta'
+
+
+def _post_keys(post_id):
+    return [added_key(post_id), removed_key(post_id), delta_key(post_id)]
+
+
+def get_buffer():
+    """Redis client for the like buffer, or None when write-behind is off."""
+    if not settings.LIKES_WRITE_BEHIND:
+        return None
+    return get_redis()
+
+
+def toggle_like(conn, post, user):
+    """Record a like toggle in Redis. Returns True if the post is now liked."""
+    liked_in_db = Like.objects.filter(post_id=post.pk, user_id=user.pk).exists()
+    script = conn.register_script(TOGGLE_SCRIPT)
+    liked = script(
+        keys=_post_keys(post.pk) + [DIRTY_POSTS_KEY],
+        args=[user.pk, int(liked_in_db), post.pk],
+    )
+    return bool(liked)
+
+
+def set_likes(conn, post_ids, user, like):
+    """
+    Record in Redis that ``user`` likes (or, with ``like=False``, no longer
+    likes) ``post_ids``. Returns the ids whose like state changed.
+    """
+    liked_in_db = set(
+        Like.objects.filter(post_id__in=post_ids, user_id=user.pk).values_list('post_id', flat=True)
+    )
+    script = conn.register_script(SET_SCRIPT)
+    pipe = conn.pipeline()
+    for post_id in post_ids:
+        script(
+            keys=_post_keys(post_id) + [DIRTY_POSTS_KEY],
+            args=[user.pk, int(post_id in liked_in_db), post_id, int(like)],
+            client=pipe,
+        )
+    return {post_id for post_id, changed in zip(post_ids, pipe.execute()) if changed}
+
+
+def pending_for(post_ids):
+    """
+    Pending changes for ``post_ids`` as ``{post_id: (delta, added, removed)}``.
+    Empty when write-behind is off or Redis is unreachable.
+    """
+    conn = get_buffer()
+    if conn is None or not post_ids:
+        return {}
+
+    try:
+        pipe = conn.pipeline(transaction=False)
+        for post_id in post_ids:
+            pipe.get(delta_key(post_id))
+            pipe.smembers(added_key(post_id))
+            pipe.smembers(removed_key(post_id))
+        results = pipe.execute()
+    except redis.exceptions.RedisError:
+        return {}
+
+    pending = {}
+    for i, post_id in enumerate(post_ids):
+        delta, added, removed = results[i * 3:i * 3 + 3]
+        if delta or added or removed:
+            pending[post_id] = (
+                int(delta or 0),
+                {int(user_id) for user_id in added},
+                {int(user_id) for user_id in removed},
+            )
+    return pending
+
+
+def apply_pending(post_id, added, removed):
+    """
+    Write one post's drained changes to the database. Returns the net change
+    of its like count, computed from the rows actually inserted or deleted.
+    """
+    with transaction.atomic():
+        if not Post.objects.select_for_update().filter(pk=post_id).exists():
+            return 0
+
+        already_liked = set(
+            Like.objects.filter(post_id=post_id, user_id__in=added).values_list('user_id', flat=True)
+        )
+        new_likes = [Like(post_id=post_id, user_id=user_id) for user_id in added - already_liked]
+        Like.objects.bulk_create(new_likes, ignore_conflicts=True)
+
+        deleted = 0
+        if removed:
+            deleted, _ = Like.objects.filter(post_id=post_id, user_id__in=removed).delete()
+
+        change = len(new_likes) - deleted
+        if change:
+            Post.objects.filter(pk=post_id).update(like_count=F('like_count') + change)
+    return change
+
+
+def restore(conn, post_id, added, removed):
+    """Put drained changes back so the next flush retries them."""
+    pipe = conn.pipeline()
+    if added:
+        pipe.sadd(added_key(post_id), *added)
+    if removed:
+        pipe.sadd(removed_key(post_id), *removed)
+    pipe.incrby(delta_key(post_id), len(added) - len(removed))
+    pipe.sadd(DIRTY_POSTS_KEY, post_id)
+    pipe.execute()
+
+
+def flush(conn, batch_size):
+    """
+    Drain up to ``batch_size`` dirty posts into the database. Returns the
+    number of posts written; the ones that failed stay dirty for the next
+    flush.
+    """
+    post_ids = [int(post_id) for post_id in conn.spop(DIRTY_POSTS_KEY, batch_size) or []]
+    if not post_ids:
+        return 0
+
+    drain = conn.register_script(DRAIN_SCRIPT)
+    flushed = []
+    pending = list(post_ids)
+    try:
+        while pending:
+            post_id = pending[0]
+            added, removed = drain(keys=_post_keys(post_id))
+            pending.pop(0)
+            try:
+                apply_pending(post_id,
+                              {int(user_id) for user_id in added},
+                              {int(user_id) for user_id in removed})
+            except Exception:
+                logger.exception('Could not flush likes of post %d', post_id)
+                restore(conn, post_id, added, removed)
+                continue
+            flushed.append(post_id)
+    finally:
+        # Posts not drained yet (Redis failed mid-batch) keep their marker.
+        if pending:
+            conn.sadd(DIRTY_POSTS_KEY, *pending)
+
+    if flushed:
+        # The new post_details versions also make the feed pages holding
+        # these posts rebuild (feed_cache.stale_versions).
+        object_cache.post_details.invalidate(*flushed)
+        feed_cache.bump_post_list_generation()
+    return len(flushed)
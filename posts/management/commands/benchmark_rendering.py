@@ -0,0 +1,70 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils.text import compress_string
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from mini_twitter import compression, renderers
+from posts.views import FeedView, PostListView
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Time JSON rendering and compression of a feed page and a post '
+            'list page built from the current database, and report their size.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username whose feed is rendered (default: the one following the most accounts).')
+        parser.add_argument('--runs', type=int, default=50)
+
+    def handle(self, *args, **options):
+        user = self.feed_owner(options['user'])
+        payloads = {
+            'feed page': FeedView().build_page(self.request(user, '/api/feed/'), PageNumberPagination(), None),
+            'post list page': PostListView().build_cursor_page(self.request(user, '/api/posts/list/'), None),
+        }
+
+        encoders = {'stdlib': renderers.stdlib_dumps}
+        if renderers.orjson is not None:
+            encoders['orjson'] = renderers.orjson_dumps
+        codecs = {'gzip': compress_string}
+        if compression.brotli is not None:
+            codecs['br'] = lambda content: compression.brotli.compress(content, quality=settings.BROTLI_QUALITY)
+
+        for name, data in payloads.items():
+            self.stdout.write(f"{name} ({len(data['results'])} posts):")
+            for encoder, dumps in encoders.items():
+                content, median = self.time(dumps, data, options['runs'])
+                self.stdout.write(f'  {encoder} render: median {median:.3f} ms, {len(content)} bytes')
+            for codec, compress in codecs.items():
+                compressed, median = self.time(compress, content, options['runs'])
+                ratio = len(compressed) / len(content)
+                self.stdout.write(f'  {codec}: median {median:.3f} ms, {len(compressed)} bytes ({ratio:.0%})')
+
+    def feed_owner(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.annotate(followed=Count('following')).order_by('-followed').first()
+        if user is None:
+            raise CommandError('No such user' if username else 'There are no users to render a feed for')
+        return user
+
+    def request(self, user, path):
+        hosts = [host for host in settings.ALLOWED_HOSTS if '*' not in host and not host.startswith('.')]
+        request = Request(APIRequestFactory().get(path, HTTP_HOST=hosts[0] if hosts else 'localhost'))
+        request.user = user
+        return request
+
+    def time(self, function, argument, runs):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            result = function(argument)
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, statistics.median(timings)
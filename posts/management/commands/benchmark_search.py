@@ -0,0 +1,48 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.search import search_posts, substring_matches
+from posts.management.commands.explain_feed import explain, uses_index
+
+
+class Command(BaseCommand):
+    help = ('Time the first page of the full-text post search against the '
+            'equivalent icontains scan on the current database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('query', help='Search terms, as sent in ?q=')
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--explain', action='store_true', help='Also print the query plans.')
+
+    def handle(self, *args, **options):
+        terms = options['query']
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        queries = {
+            'full-text search': search_posts(Post.objects.all(), terms).order_by('-rank', '-id')[:page_size],
+            'icontains scan': substring_matches(Post.objects.all(), terms).order_by('-created_at', '-id')[:page_size],
+        }
+
+        medians = {}
+        for name, queryset in queries.items():
+            timings = []
+            for _ in range(options['runs']):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            medians[name] = statistics.median(timings)
+
+            plan = explain(queryset)
+            index = 'index' if uses_index(plan) else 'full table scan'
+            self.stdout.write(
+                f'{name}: median {medians[name]:.2f} ms, best {min(timings):.2f} ms '
+                f'over {len(timings)} runs ({index})'
+            )
+            if options['explain']:
+                self.stdout.write(f'{plan}\n')
+
+        speedup = medians['icontains scan'] / max(medians['full-text search'], 1e-6)
+        self.stdout.write(self.style.SUCCESS(f'Full-text search is {speedup:.1f}x faster than the icontains scan'))
@@ -0,0 +1,78 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from posts.models import Post
+from posts.timeline import feed_queryset
+from users.models import User
+
+
+# A plain table scan of posts_post: "Seq Scan on posts_post" on PostgreSQL,
+# "SCAN posts_post" (not "SCAN posts_post USING ... INDEX") on SQLite.
+FULL_SCAN = re.compile(r'Seq Scan on "?posts_post"?(?!_)|SCAN posts_post(?!_)(?! USING)')
+
+# Rows sorted after they are read: a (Incremental) Sort node on PostgreSQL,
+# a temporary B-tree on SQLite.
+SORT = re.compile(r'\bSort\b|USE TEMP B-TREE FOR ORDER BY')
+
+
+def explain(queryset):
+    """
+    EXPLAIN ``queryset``. On PostgreSQL sequential scans are disabled for the
+    statement so the plan shows whether a usable index exists, rather than
+    what the planner prefers on a tiny or unanalyzed table.
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+def uses_index(plan, name=None):
+    """True if ``plan`` doesn't scan posts_post, and uses the index ``name`` if given."""
+    if FULL_SCAN.search(plan):
+        return False
+    return name is None or name in plan
+
+
+def sorts(plan):
+    return bool(SORT.search(plan))
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN the feed and post list queries and fail if either one '
+            'does not use its index, or if the post list has to sort its rows.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='User whose feed is explained (defaults to any user).')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(pk=options['user']) if options['user'] else User.objects.all()
+        user = user.order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to explain the feed for')
+
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        # (queryset, index, whether the index alone must give the order). The
+        # feed merges one index range per followed author, which always ends
+        # in a sort of the matched rows; the post list is read in index order.
+        queries = {
+            'feed': (feed_queryset(user)[:page_size], 'post_author_created_idx', False),
+            'post list': (Post.objects.order_by('-created_at', '-id')[:page_size], 'post_created_idx', True),
+        }
+
+        problems = []
+        for name, (queryset, index, ordered) in queries.items():
+            plan = explain(queryset)
+            self.stdout.write(f'{name}:\n{plan}\n')
+            if not uses_index(plan, index):
+                problems.append(f'{name} does not use {index}')
+            elif ordered and sorts(plan):
+                problems.append(f'{name} sorts its rows instead of reading them from {index}')
+
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('All feed queries use an index'))
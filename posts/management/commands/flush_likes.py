@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import likes
+
+
+class Command(BaseCommand):
+    help = 'Flush likes buffered in Redis (LIKES_WRITE_BEHIND) to the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the buffer once and exit instead of looping.')
+        parser.add_argument('--batch-size', type=int, default=settings.LIKES_FLUSH_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=settings.LIKES_FLUSH_INTERVAL)
+
+    def handle(self, *args, **options):
+        conn = likes.get_buffer()
+        if conn is None:
+            raise CommandError('LIKES_WRITE_BEHIND is disabled or the cache backend is not Redis')
+
+        while True:
+            flushed = total = likes.flush(conn, options['batch_size'])
+            while flushed == options['batch_size']:
+                flushed = likes.flush(conn, options['batch_size'])
+                total += flushed
+
+            if total:
+                self.stdout.write(f'Flushed likes for {total} posts')
+            if options['once']:
+                return
+            time.sleep(options['interval'])
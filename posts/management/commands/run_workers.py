@@ -0,0 +1,32 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from mini_twitter import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of workers consuming queued post/like/follow side effects (JOBS_ASYNC).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOBS_WORKERS)
+        parser.add_argument('--poll-interval', type=float, default=settings.JOBS_POLL_INTERVAL)
+
+    def handle(self, *args, **options):
+        conn = jobs.get_queue()
+        if conn is None:
+            raise CommandError('JOBS_ASYNC is disabled or the cache backend is not Redis')
+
+        stop_event = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop_event.set())
+
+        threads = jobs.run_pool(conn, options['workers'], options['poll_interval'], stop_event)
+        self.stdout.write(f'Started {len(threads)} job workers')
+        for thread in threads:
+            thread.join()
+        if not stop_event.is_set():
+            raise CommandError('Job workers exited unexpectedly')
+        self.stdout.write('Job workers stopped')
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0002_initial'),
+    ]
+
+    operations = [
+        # The unique (post_id, user_id) constraint serves "who liked this
+        # post", and Django already indexes user_id on its own. This covering
+        # index answers "posts liked by a user" and "which of these posts
+        # has the user liked" with an index-only scan, already ordered by
+        # post_id, instead of a user_id lookup followed by heap fetches.
+        migrations.RunSQL(
+            'CREATE INDEX post_likes_user_post_idx ON posts_post_likes (user_id, post_id);',
+            reverse_sql='DROP INDEX post_likes_user_post_idx;',
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+# Adding a stored generated column rewrites posts_post under an exclusive
+# lock; run this migration in a maintenance window on large tables.
+ADD_SEARCH_VECTOR = """
+ALTER TABLE posts_post ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', title), 'A') ||
+    setweight(to_tsvector('english', content), 'B')
+) STORED;
+CREATE INDEX post_search_idx ON posts_post USING gin (search_vector);
+"""
+
+DROP_SEARCH_VECTOR = """
+DROP INDEX post_search_idx;
+ALTER TABLE posts_post DROP COLUMN search_vector;
+"""
+
+
+def add_search_vector(apps, schema_editor):
+    # SQLite has no tsvector; posts.search falls back to substring matches.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(ADD_SEARCH_VECTOR)
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_VECTOR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_like_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vector, drop_search_vector),
+    ]
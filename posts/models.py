@@ -1,13 +1,47 @@
 from django.db import models
+from django.db.models import Prefetch
 from users.models import User
 
+
+class PostQuerySet(models.QuerySet):
+    def with_engagement(self):
+        """
+        Shape the queryset for PostSerializer: the author is joined and only
+        the likers' usernames are prefetched, so a page of posts costs a fixed
+        number of queries.
+        """
+        likers = User.objects.only('id', 'username')
+        return (
+            self.select_related('author')
+            .prefetch_related(Prefetch('likes', queryset=likers, to_attr='likers'))
+        )
+
+    def compact(self):
+        """Shape the queryset for CompactPostSerializer: counts only, no likers."""
+        return self.select_related('author').only(
+            'id', 'title', 'content', 'created_at', 'like_count', 'author__username'
+        )
+
+
 class Post(models.Model):
     content = models.TextField()
     title = models.CharField(max_length=255)
-    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
+    # post_author_created_idx leads with author_id and serves every lookup
+    # by author, so the foreign key gets no index of its own.
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts', db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
     likes = models.ManyToManyField(User, related_name='liked_posts', blank=True)
-    
+    like_count = models.IntegerField(default=0)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # FeedView: posts of the followed authors, newest first.
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_created_idx'),
+            # PostListView and keyset pages over the whole table.
+            models.Index(fields=['-created_at', '-id'], name='post_created_idx'),
+        ]
 
     def __str__(self):
         return f"Post by {self.author.username} at {self.created_at}"
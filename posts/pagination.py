@@ -0,0 +1,148 @@
+import math
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over ``(created_at, id)``, newest first.
+
+    Each page is a single indexed range scan: there is no COUNT(*) and no
+    OFFSET, and posts inserted while a client scrolls never shift the pages
+    it has not fetched yet. Selected with ``?pagination=cursor``; the
+    ``next`` link carries an opaque ``cursor`` for the following page.
+    """
+    page_size = api_settings.PAGE_SIZE
+    ordering_field = 'created_at'
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    invalid_cursor_message = 'Invalid cursor'
+
+    @classmethod
+    def requested(cls, request):
+        return (request.query_params.get(cls.mode_query_param) == 'cursor'
+                or cls.cursor_query_param in request.query_params)
+
+    @classmethod
+    def position(cls, request):
+        """Cache-key friendly name of the page requested."""
+        return f"cursor_{request.query_params.get(cls.cursor_query_param) or 'head'}"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        rows = list(self.page_rows(queryset, request))
+        return self.set_page(rows)
+
+    async def apaginate_queryset(self, queryset, request):
+        rows = [row async for row in self.page_rows(queryset, request)]
+        return self.set_page(rows)
+
+    def page_rows(self, queryset, request):
+        self.request = request
+        cursor = self.decode_cursor(request)
+        field = self.ordering_field
+        if cursor is not None:
+            value, pk = cursor
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+            )
+        return queryset.order_by(f'-{field}', '-id')[:self.page_size + 1]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            value, pk = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii').split('|')
+            value = self.parse_position(value)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def parse_position(self, value):
+        return parse_datetime(value)
+
+    def format_position(self, post):
+        return post.created_at.isoformat()
+
+    def encode_cursor(self, post):
+        token = f'{self.format_position(post)}|{post.id}'
+        return urlsafe_b64encode(token.encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.mode_query_param, 'cursor')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+
+class SearchKeysetPagination(KeysetPagination):
+    """KeysetPagination over ``(rank, id)`` for search results, best match first."""
+    ordering_field = 'rank'
+
+    def parse_position(self, value):
+        rank = float(value)
+        return rank if math.isfinite(rank) else None
+
+    def format_position(self, post):
+        return repr(post.rank)
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """PageNumberPagination whose COUNT(*) and page query use the async ORM."""
+
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        paginator.count = await queryset.acount()
+
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+
+        bottom = (number - 1) * paginator.per_page
+        rows = [row async for row in queryset[bottom:bottom + paginator.per_page]]
+        self.page = paginator._get_page(rows, number, paginator)
+        return rows
@@ -0,0 +1,55 @@
+"""
+Full-text search over posts (/api/posts/search/?q=...).
+
+On PostgreSQL posts_post has a stored generated ``search_vector`` tsvector
+column, the title weighted above the content, with a GIN index (migration
+0004). It is deliberately not a model field, so ordinary post queries never
+load it. Matches are ranked with ts_rank and paged by SearchKeysetPagination
+over ``(rank, id)``.
+
+SQLite has no full-text types. There (the test database) the search falls
+back to case-insensitive substring matches of every term, ranked by how
+many of the terms appear in the title.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connections
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+from django.db.models.expressions import RawSQL
+
+
+# Must match the configuration of the generated column.
+SEARCH_CONFIG = 'english'
+
+
+def search_document():
+    return RawSQL('"posts_post"."search_vector"', [], output_field=SearchVectorField())
+
+
+def search_posts(queryset, terms):
+    """Posts of ``queryset`` matching ``terms``, annotated with their ``rank``."""
+    if connections[queryset.db].vendor != 'postgresql':
+        return ranked_substring_matches(queryset, terms)
+
+    query = SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+    return (
+        queryset.alias(document=search_document())
+        .filter(document=query)
+        # ts_rank returns a real; as a double precision the rank written to
+        # the cursor compares equal to the stored one when it comes back.
+        .annotate(rank=Cast(SearchRank(search_document(), query), FloatField()))
+    )
+
+
+def substring_matches(queryset, terms):
+    """The icontains scan: posts containing every term in the title or the content."""
+    for term in terms.split():
+        queryset = queryset.filter(Q(title__icontains=term) | Q(content__icontains=term))
+    return queryset
+
+
+def ranked_substring_matches(queryset, terms):
+    rank = Value(0.0)
+    for term in terms.split():
+        rank = rank + Case(When(title__icontains=term, then=Value(1.0)), default=Value(0.1))
+    return substring_matches(queryset, terms).annotate(rank=rank)
@@ -1,6 +1,9 @@
 from rest_framework import serializers
+from django.utils import timezone
 from .models import Post
+from users.models import User
 from drf_spectacular.utils import extend_schema_field
+from . import likes as like_buffer
 
 
 
@@ -9,6 +12,15 @@ class PostLikeSerializer(serializers.ModelSerializer):
         model = Post
         fields = ['likes']
 
+class PostListSerializer(serializers.ListSerializer):
+    """Looks up buffered likes for the whole page in one round trip."""
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        self.child.set_pending_likes(items)
+        return super().to_representation(items)
+
+
 class PostSerializer(serializers.ModelSerializer):
     title = serializers.CharField(max_length=255)
     content = serializers.CharField()
@@ -27,11 +39,33 @@ class PostSerializer(serializers.ModelSerializer):
     
     @extend_schema_field(serializers.IntegerField())
     def get_likes(self, obj):
-        return obj.likes.count()
+        delta, _, _ = self.pending_likes(obj)
+        return obj.like_count + delta
     
     @extend_schema_field(serializers.ListField(child=serializers.CharField()))
     def get_liked_by(self, obj):
-        return [user.username for user in obj.likes.all()]
+        likers = getattr(obj, 'likers', None)
+        if likers is None:
+            likers = obj.likes.all()
+        _, added, removed = self.pending_likes(obj)
+        usernames = [user.username for user in likers if user.id not in removed]
+        if added:
+            pending_usernames = self.context.get('pending_usernames', {})
+            usernames += [pending_usernames[user_id] for user_id in added if user_id in pending_usernames]
+        return usernames
+
+    def set_pending_likes(self, posts):
+        pending = like_buffer.pending_for([post.pk for post in posts])
+        added = set().union(*(post_added for _, post_added, _ in pending.values()))
+        self.context['pending_likes'] = pending
+        self.context['pending_usernames'] = dict(
+            User.objects.filter(id__in=added).values_list('id', 'username')
+        ) if added else {}
+
+    def pending_likes(self, obj):
+        if 'pending_likes' not in self.context:
+            self.set_pending_likes([obj])
+        return self.context['pending_likes'].get(obj.pk, (0, set(), set()))
     
     @extend_schema_field(serializers.CharField())
     def get_author(self, obj):
@@ -43,4 +77,75 @@ class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = ['id', 'title', 'content', 'author', 'created_at', 'likes', 'liked_by']
+        list_serializer_class = PostListSerializer
         read_only_fields = ['id','author', 'likes', 'created_at', 'liked_by']
+
+
+class PostSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200, help_text='Words to look for in the title and content.')
+
+
+class CompactPostSerializer:
+    """
+    Plain-dict serializer for feed and list pages. It skips the DRF field
+    machinery, reports likes as a count plus ``liked_by_me`` (one query for
+    the whole page) and can be narrowed with ``?fields=``.
+    """
+    FIELDS = ('id', 'title', 'content', 'author', 'created_at', 'likes', 'liked_by_me')
+    DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+    def __init__(self, posts, user, fields=None):
+        self.posts = list(posts)
+        self.user = user
+        self.fields = fields or self.FIELDS
+
+    @classmethod
+    def requested_fields(cls, request):
+        """
+        Fields asked for with ``?fields=a,b`` (or all of them with
+        ``?compact=true``); None when the full representation is wanted.
+        """
+        fields = request.query_params.get('fields')
+        if fields is None:
+            return cls.FIELDS if request.query_params.get('compact') == 'true' else None
+
+        fields = tuple(field for field in fields.split(',') if field)
+        unknown = sorted(set(fields) - set(cls.FIELDS))
+        if unknown or not fields:
+            raise serializers.ValidationError(
+                {'fields': [f'Unknown field(s): {", ".join(unknown)}. Choose from: {", ".join(cls.FIELDS)}']}
+            )
+        return fields
+
+    @property
+    def data(self):
+        ids = [post.pk for post in self.posts]
+        pending = {}
+        if 'likes' in self.fields or 'liked_by_me' in self.fields:
+            pending = like_buffer.pending_for(ids)
+
+        liked = set()
+        if 'liked_by_me' in self.fields and ids:
+            liked = set(
+                Post.likes.through.objects.filter(user_id=self.user.pk, post_id__in=ids)
+                .values_list('post_id', flat=True)
+            )
+
+        return [self.to_representation(post, pending.get(post.pk), liked) for post in self.posts]
+
+    def to_representation(self, post, pending, liked):
+        delta, added, removed = pending or (0, (), ())
+        row = {}
+        for field in self.fields:
+            if field == 'author':
+                row['author'] = post.author.username
+            elif field == 'created_at':
+                row['created_at'] = timezone.localtime(post.created_at).strftime(self.DATETIME_FORMAT)
+            elif field == 'likes':
+                row['likes'] = post.like_count + delta
+            elif field == 'liked_by_me':
+                user_id = self.user.pk
+                row['liked_by_me'] = user_id in added or (post.pk in liked and user_id not in removed)
+            else:
+                row[field] = getattr(post, field)
+        return row
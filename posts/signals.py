@@ -0,0 +1,107 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from mini_twitter import jobs, object_cache
+from mini_twitter.resilient_cache import CACHE_ERRORS
+from users.models import User
+from .models import Post
+from . import feed_cache, events, timeline  # noqa: F401 (registers the job handlers)
+
+Like = Post.likes.through
+
+
+def existing_like_ids(instance, reverse, pk_set):
+    """Like rows about to be removed, locked against concurrent unlikes."""
+    if reverse:
+        rows = Like.objects.filter(user_id=instance.pk)
+        column = 'post_id'
+    else:
+        rows = Like.objects.filter(post_id=instance.pk)
+        column = 'user_id'
+    if pk_set is not None:
+        rows = rows.filter(**{f'{column}__in': pk_set})
+    return list(rows.select_for_update().values_list(column, flat=True))
+
+
+def adjust_like_counts(instance, reverse, other_ids, delta):
+    if not other_ids:
+        return
+    if reverse:
+        Post.objects.filter(pk__in=other_ids).update(like_count=F('like_count') + delta)
+    else:
+        Post.objects.filter(pk=instance.pk).update(like_count=F('like_count') + delta * len(other_ids))
+
+
+@receiver(m2m_changed, sender=Like)
+def maintain_like_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('pre_remove', 'pre_clear'):
+        instance._removed_like_ids = existing_like_ids(
+            instance, reverse, pk_set if action == 'pre_remove' else None
+        )
+    elif action == 'post_add':
+        adjust_like_counts(instance, reverse, pk_set, 1)
+    elif action in ('post_remove', 'post_clear'):
+        adjust_like_counts(instance, reverse, instance.__dict__.pop('_removed_like_ids', pk_set), -1)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    # Also on creation: a reused id must not find the representation of a
+    # deleted post.
+    object_cache.post_details.invalidate(instance.pk)
+    if created:
+        jobs.dispatch('post_created', post_id=instance.pk)
+    else:
+        jobs.dispatch('feeds_changed', author_ids=[instance.author_id])
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    object_cache.post_details.invalidate(instance.pk)
+    jobs.dispatch('post_deleted', post_id=instance.pk, author_id=instance.author_id)
+
+
+@receiver(m2m_changed, sender=Like)
+def invalidate_feeds_on_like(sender, instance, action, reverse, pk_set, **kwargs):
+    # Not a feed bump for every follower of the authors: feed pages check
+    # the versions invalidate_post_details_on_like moves forward.
+    if action in ('post_add', 'post_remove', 'pre_clear'):
+        jobs.dispatch('likes_changed')
+
+
+@receiver(m2m_changed, sender=Like)
+def invalidate_post_details_on_like(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if not reverse:
+        post_ids = [instance.pk]
+    elif action == 'pre_clear':
+        post_ids = list(instance.liked_posts.values_list('id', flat=True))
+    else:
+        post_ids = pk_set
+
+    object_cache.post_details.invalidate(*post_ids)
+
+
+@receiver(m2m_changed, sender=User.followers.through)
+def invalidate_feeds_on_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    # user.following.add(...) is the reverse side: the instance is the follower.
+    if reverse:
+        follower_ids = [instance.pk]
+    elif action == 'pre_clear':
+        follower_ids = list(instance.followers.values_list('id', flat=True))
+    else:
+        follower_ids = pk_set
+
+    # Follows made outside the API (admin, shell, ORM) must not leave a stale
+    # timeline behind either.
+    timeline.invalidate_timelines(list(follower_ids))
+    try:
+        feed_cache.bump_feed_generations(follower_ids)
+    except CACHE_ERRORS:
+        pass
@@ -0,0 +1,114 @@
+import json
+from urllib.parse import parse_qs, urlparse
+
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncRequestFactory
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from posts.models import Post
+from posts import async_views
+from users import async_views as user_async_views
+
+
+User = get_user_model()
+
+
+class AsyncReadTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+        self.user1 = User.objects.create_user(username='user1',
+                                              email='user1@example.com',
+                                              password='pass')
+        self.user2 = User.objects.create_user(username='user2',
+                                              email='user2@example.com',
+                                              password='pass2')
+        self.user1.following.add(self.user2)
+        self.token = str(AccessToken.for_user(self.user1))
+
+    def tearDown(self):
+        cache.clear()
+
+    def get(self, path, **params):
+        return self.factory.get(path, params, headers={'authorization': f'Bearer {self.token}'})
+
+    async def test_01_requires_a_valid_token(self):
+        response = await async_views.feed(self.factory.get('/api/feed/'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+        request = self.factory.get('/api/feed/', headers={'authorization': 'Bearer not-a-token'})
+        response = await async_views.feed(request)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_02_feed_matches_the_sync_view(self):
+        await Post.objects.acreate(author=self.user2, content='Followed post')
+        await Post.objects.acreate(author=self.user1, content='Own post')
+
+        response = await async_views.feed(self.get('/api/feed/'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(response.content)
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['content'], 'Followed post')
+
+        cached = await async_views.feed(self.get('/api/feed/'))
+        self.assertEqual(json.loads(cached.content), data)
+
+    async def test_03_feed_keyset_pages(self):
+        for i in range(12):
+            await Post.objects.acreate(author=self.user2, content=f'Post {i}')
+
+        response = await async_views.feed(self.get('/api/feed/', pagination='cursor', compact='true'))
+        first = json.loads(response.content)
+        self.assertEqual(len(first['results']), 10)
+        self.assertIn('liked_by_me', first['results'][0])
+
+        cursor = parse_qs(urlparse(first['next']).query)['cursor'][0]
+        response = await async_views.feed(self.get('/api/feed/', cursor=cursor, compact='true'))
+        second = json.loads(response.content)
+        self.assertEqual([post['content'] for post in second['results']], ['Post 1', 'Post 0'])
+        self.assertIsNone(second['next'])
+
+    async def test_04_post_list_and_detail(self):
+        post = await Post.objects.acreate(author=self.user2, content='Detail post')
+
+        response = await async_views.post_list(self.get('/api/posts/list/', page=2))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = await async_views.post_list(self.get('/api/posts/list/', fields='id,author'))
+        self.assertEqual(json.loads(response.content)['results'], [{'id': post.id, 'author': 'user2'}])
+
+        response = await async_views.post_list(self.get('/api/posts/list/', fields='nope'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await async_views.post_detail(self.get(f'/api/posts/list/{post.id}/'), pk=post.id)
+        self.assertEqual(json.loads(response.content)['content'], 'Detail post')
+
+        response = await async_views.post_detail(self.get('/api/posts/list/0/'), pk=0)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_05_post_export_streams_ndjson(self):
+        for i in range(3):
+            await Post.objects.acreate(author=self.user2, content=f'Post {i}')
+
+        response = await async_views.post_list(self.get('/api/posts/list/', export='ndjson'))
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([row['content'] for row in rows], ['Post 2', 'Post 1', 'Post 0'])
+
+    async def test_06_user_detail(self):
+        response = await user_async_views.user_detail(
+            self.get(f'/api/users/detail/{self.user1.id}/', expand='following'), pk=self.user1.id
+        )
+        data = json.loads(response.content)
+        self.assertEqual(data['username'], 'user1')
+        self.assertEqual(data['following_count'], 1)
+        self.assertEqual([user['username'] for user in data['following']], ['user2'])
+
+    async def test_07_only_get_is_allowed(self):
+        request = self.factory.post('/api/feed/', headers={'authorization': f'Bearer {self.token}'})
+        response = await async_views.feed(request)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -0,0 +1,119 @@
+from unittest import mock
+
+import redis
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import override_settings
+from rest_framework import status
+
+from mini_twitter import resilient_cache
+from mini_twitter.resilient_cache import CircuitBreaker
+from posts import feed_cache
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+class BrokenCache(LocMemCache):
+    """A cache backend whose server is unreachable."""
+    calls = 0
+
+    def _fail(self, *args, **kwargs):
+        BrokenCache.calls += 1
+        raise redis.exceptions.ConnectionError('Connection refused')
+
+    get = set = add = delete = get_many = set_many = delete_many = _fail
+
+
+BROKEN_CACHES = {'default': {'BACKEND': 'posts.tests.tests_cache_resilience.BrokenCache'}}
+
+
+@override_settings(CACHE_BREAKER_FAILURES=3)
+class CacheResilienceTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        resilient_cache.reset()
+        resilient_cache._breakers.clear()
+        BrokenCache.calls = 0
+        self.user1 = User.objects.create_user(username='user1',
+                                              email='user1@example.com',
+                                              password='pass')
+        self.user2 = User.objects.create_user(username='user2',
+                                              email='user2@example.com',
+                                              password='pass2')
+        self.user1.following.add(self.user2)
+        self.client.force_authenticate(user=self.user1)
+
+    def tearDown(self):
+        resilient_cache.reset()
+        resilient_cache._breakers.clear()
+        cache.clear()
+
+    def test_01_feed_is_served_from_the_database_when_redis_is_down(self):
+        Post.objects.create(author=self.user2, content='Followed post')
+
+        with override_settings(CACHES=BROKEN_CACHES):
+            response = self.client.get('/api/feed/')
+            cursor_response = self.client.get('/api/feed/?pagination=cursor')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['content'], 'Followed post')
+        self.assertEqual(cursor_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(cursor_response.data['results']), 1)
+
+    def test_02_breaker_stops_calling_redis(self):
+        with override_settings(CACHES=BROKEN_CACHES):
+            for _ in range(5):
+                self.assertEqual(self.client.get('/api/feed/').status_code, status.HTTP_200_OK)
+
+        self.assertEqual(BrokenCache.calls, 3)
+        snapshot = resilient_cache.metrics()
+        self.assertEqual(snapshot['breakers']['default']['state'], CircuitBreaker.OPEN)
+        self.assertGreater(snapshot['caches']['feed_generations']['short_circuits'], 0)
+
+    def test_03_local_copies_are_served_during_an_outage(self):
+        Post.objects.create(author=self.user2, content='Before the outage')
+        first = self.client.get('/api/feed/')
+
+        with override_settings(CACHES=BROKEN_CACHES):
+            with self.assertNumQueries(0):
+                response = self.client.get('/api/feed/')
+            self.assertEqual(response.data, first.data)
+            self.assertEqual(feed_cache.pages.stats['fallback_hits'], 1)
+
+            # Writes made by this worker still invalidate its local copies.
+            Post.objects.create(author=self.user2, content='During the outage')
+            response = self.client.get('/api/feed/')
+            self.assertEqual(response.data['results'][0]['content'], 'During the outage')
+
+    def test_04_breaker_half_opens_after_the_reset_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        with mock.patch('mini_twitter.resilient_cache.time.monotonic', return_value=100):
+            breaker.record_failure()
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+            self.assertFalse(breaker.allow())
+
+        with mock.patch('mini_twitter.resilient_cache.time.monotonic', return_value=111):
+            self.assertTrue(breaker.allow())
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            self.assertFalse(breaker.allow())
+            breaker.record_success()
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_05_metrics_require_staff(self):
+        self.client.get('/api/feed/')
+        self.client.get('/api/feed/')
+
+        self.assertEqual(self.client.get('/api/metrics/cache/').status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user1.is_staff = True
+        self.user1.save()
+        response = self.client.get('/api/metrics/cache/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        pages = response.data['caches']['feed_pages']
+        self.assertEqual((pages['hits'], pages['misses'], pages['hit_ratio']), (1, 1, 0.5))
+        self.assertEqual(response.data['breakers']['default']['state'], CircuitBreaker.CLOSED)
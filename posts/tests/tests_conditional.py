@@ -0,0 +1,110 @@
+import json
+from unittest import mock
+
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncRequestFactory
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from mini_twitter import resilient_cache, throttling
+from posts import async_views
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+class ConditionalRequestTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        resilient_cache.reset()
+        throttling.reset()
+        self.user1 = User.objects.create_user(username='user1',
+                                              email='user1@example.com',
+                                              password='pass')
+        self.user2 = User.objects.create_user(username='user2',
+                                              email='user2@example.com',
+                                              password='pass2')
+        self.user1.following.add(self.user2)
+        self.post = Post.objects.create(author=self.user2, title='Title', content='Content')
+        self.client.force_authenticate(user=self.user1)
+
+    def tearDown(self):
+        throttling.reset()
+        resilient_cache.reset()
+        cache.clear()
+
+    def test_01_unchanged_post_is_not_resent(self):
+        url = f'/api/posts/list/{self.post.id}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with mock.patch('posts.views.post_detail_data') as load, self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        load.assert_not_called()
+
+    def test_02_changes_produce_a_new_etag(self):
+        url = f'/api/posts/list/{self.post.id}/'
+        etag = self.client.get(url)['ETag']
+
+        self.post.likes.add(self.user1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['likes'], 1)
+
+    def test_03_profiles(self):
+        url = f'/api/users/detail/{self.user2.id}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(f'/api/users/unfollow/{self.user2.id}/')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_04_feed_polls(self):
+        response = self.client.get('/api/feed/')
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/feed/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Each page has its own validator.
+        self.assertNotEqual(self.client.get('/api/feed/?fields=id')['ETag'], etag)
+
+        Post.objects.create(author=self.user2, title='New', content='New post')
+        response = self.client.get('/api/feed/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_05_if_modified_since(self):
+        url = f'/api/posts/list/{self.post.id}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_06_async_views(self):
+        factory = AsyncRequestFactory()
+        headers = {'authorization': f'Bearer {AccessToken.for_user(self.user1)}'}
+
+        response = await async_views.feed(factory.get('/api/feed/', headers=headers))
+        self.assertEqual(json.loads(response.content)['count'], 1)
+        headers['if-none-match'] = response['ETag']
+        response = await async_views.feed(factory.get('/api/feed/', headers=headers))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        url = f'/api/posts/list/{self.post.id}/'
+        del headers['if-none-match']
+        response = await async_views.post_detail(factory.get(url, headers=headers), self.post.id)
+        headers['if-none-match'] = response['ETag']
+        response = await async_views.post_detail(factory.get(url, headers=headers), self.post.id)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
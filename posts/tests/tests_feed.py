@@ -1,13 +1,18 @@
 from rest_framework.test import APITestCase
 from posts.models import Post
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from rest_framework import status
 
+from mini_twitter import jobs
+from posts import feed_cache
+
 
 User = get_user_model()
 
 class FeedTests(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user1 = User.objects.create_user(username='user1',
                                               email='user1@example.com',
                                               password='pass')
@@ -137,10 +142,88 @@ class FeedTests(APITestCase):
         self.assertEqual(len(response.data['results']), 2)
         self.assertIn('User9 Post', [post['content'] for post in response.data['results']])
         self.assertIn('User10 Post', [post['content'] for post in response.data['results']])
-        
-        
 
 
-        
-        
-    
\ No newline at end of file
+    def test_07_feed_cache_invalidated_on_new_post(self):
+        Post.objects.create(author=self.user2, content='First post')
+        response = self.client.get('/api/feed/')
+        self.assertEqual(len(response.data['results']), 1)
+
+        Post.objects.create(author=self.user2, content='Second post')
+        response = self.client.get('/api/feed/')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['results'][0]['content'], 'Second post')
+
+
+    def test_08_feed_cache_invalidated_on_edit_and_like(self):
+        post = Post.objects.create(author=self.user2, content='Original')
+        self.client.get('/api/feed/')
+
+        self.client.force_authenticate(user=self.user2)
+        self.client.patch(f'/api/posts/edit/{post.id}/', {'content': 'Edited'}, format='json')
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get('/api/feed/')
+        self.assertEqual(response.data['results'][0]['content'], 'Edited')
+
+        self.client.post(f'/api/posts/like/{post.id}/')
+        response = self.client.get('/api/feed/')
+        self.assertEqual(response.data['results'][0]['likes'], 1)
+
+
+    def test_09_feed_cache_invalidated_on_unfollow(self):
+        Post.objects.create(author=self.user2, content='Followed user post')
+        response = self.client.get('/api/feed/')
+        self.assertEqual(len(response.data['results']), 1)
+
+        self.client.post(f'/api/users/unfollow/{self.user2.id}/')
+        response = self.client.get('/api/feed/')
+        self.assertEqual(len(response.data['results']), 0)
+
+
+    def test_10_feed_cursor_pagination(self):
+        for i in range(15):
+            Post.objects.create(author=self.user2, content=f'Post {i}')
+
+        response = self.client.get('/api/feed/?pagination=cursor')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(response.data['results'][0]['content'], 'Post 14')
+
+        Post.objects.create(author=self.user2, content='Inserted while scrolling')
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([post['content'] for post in response.data['results']],
+                         [f'Post {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(response.data['next'])
+
+
+    def test_11_feed_invalid_cursor(self):
+        response = self.client.get('/api/feed/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+    def test_12_like_refreshes_feed_page_without_bumping_followers(self):
+        post = Post.objects.create(author=self.user2, content='Liked later')
+        response = self.client.get('/api/feed/')
+        etag = response['ETag']
+        generation = feed_cache.feed_generation(self.user1.id)
+
+        self.client.force_authenticate(user=self.user2)
+        self.client.post(f'/api/posts/like/{post.id}/')
+        self.client.force_authenticate(user=self.user1)
+
+        self.assertEqual(feed_cache.feed_generation(self.user1.id), generation)
+        response = self.client.get('/api/feed/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['likes'], 1)
+
+
+    def test_13_inline_jobs_run_again_after_commit(self):
+        handled = []
+        jobs.job('record_inline')(handled.extend)
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.dispatch('record_inline', value=1)
+            self.assertEqual(handled, [{'value': 1}])
+        self.assertEqual(handled, [{'value': 1}, {'value': 1}])
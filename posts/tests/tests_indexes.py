@@ -0,0 +1,57 @@
+from io import StringIO
+from unittest import mock
+
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from posts.models import Post
+from posts.management.commands.explain_feed import sorts, uses_index
+
+
+User = get_user_model()
+
+
+class FeedIndexTests(APITestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader',
+                                               email='reader@example.com',
+                                               password='pass')
+        for i in range(3):
+            author = User.objects.create_user(username=f'author{i}',
+                                              email=f'author{i}@example.com',
+                                              password='pass')
+            self.reader.following.add(author)
+            for j in range(5):
+                Post.objects.create(author=author, content=f'Post {i}-{j}')
+
+    def test_01_feed_queries_use_an_index(self):
+        out = StringIO()
+        call_command('explain_feed', user=self.reader.id, stdout=out)
+        self.assertIn('All feed queries use an index', out.getvalue())
+        self.assertIn('post_author_created_idx', out.getvalue())
+
+    def test_02_full_scan_detection(self):
+        self.assertFalse(uses_index('Limit\n  ->  Sort\n        ->  Seq Scan on posts_post'))
+        self.assertFalse(uses_index('3 0 0 SCAN posts_post'))
+        self.assertTrue(uses_index('Index Scan using post_created_idx on posts_post'))
+        self.assertTrue(uses_index('3 0 0 SCAN posts_post USING INDEX post_created_idx'))
+        self.assertTrue(uses_index('5 0 0 SCAN posts_post_likes'))
+        self.assertTrue(uses_index('Index Scan using post_created_idx on posts_post', 'post_created_idx'))
+        self.assertFalse(uses_index('SEARCH posts_post USING INDEX posts_post_author_id (author_id=?)',
+                                    'post_author_created_idx'))
+
+    def test_03_sort_detection(self):
+        self.assertTrue(sorts('Limit\n  ->  Sort\n        Sort Key: created_at DESC'))
+        self.assertTrue(sorts('Limit\n  ->  Incremental Sort'))
+        self.assertTrue(sorts('44 0 0 USE TEMP B-TREE FOR ORDER BY'))
+        self.assertFalse(sorts('Limit\n  ->  Index Scan using post_created_idx on posts_post'))
+
+    def test_04_plan_problems_are_reported(self):
+        plan = '3 0 0 SCAN posts_post USING INDEX post_created_idx\n44 0 0 USE TEMP B-TREE FOR ORDER BY'
+        with mock.patch('posts.management.commands.explain_feed.explain', return_value=plan), \
+                self.assertRaisesMessage(CommandError, 'feed does not use post_author_created_idx; '
+                                                       'post list sorts its rows instead of reading '
+                                                       'them from post_created_idx'):
+            call_command('explain_feed', user=self.reader.id, stdout=StringIO())
@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+from unittest import mock, skipIf
+
+import redis
+
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+
+from mini_twitter import jobs
+from mini_twitter.redis_client import get_redis
+from posts.models import Post
+from posts import feed_cache
+
+
+User = get_user_model()
+
+
+@skipIf(get_redis() is None, 'The job queue requires the django_redis cache backend')
+@override_settings(JOBS_ASYNC=True, JOBS_MAX_ATTEMPTS=2)
+class JobQueueTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.conn = get_redis()
+        self.reader = User.objects.create_user(username='reader',
+                                               email='reader@example.com',
+                                               password='pass')
+        self.author = User.objects.create_user(username='author',
+                                               email='author@example.com',
+                                               password='pass')
+        self.reader.following.add(self.author)
+
+    def tearDown(self):
+        jobs.HANDLERS.pop('always_fails', None)
+        jobs.HANDLERS.pop('record', None)
+        cache.clear()
+
+    def test_01_post_side_effects_are_queued(self):
+        generation = feed_cache.feed_generation(self.reader.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.author, content='Queued post')
+
+        self.assertEqual(self.conn.llen(jobs.QUEUE_KEY), 1)
+        self.assertEqual(feed_cache.feed_generation(self.reader.id), generation)
+
+        worker = jobs.Worker(self.conn, 'test')
+        self.assertEqual(worker.run_once(), 1)
+        self.assertEqual(self.conn.llen(jobs.QUEUE_KEY), 0)
+        self.assertFalse(self.conn.exists(jobs.processing_key('test')))
+        self.assertNotEqual(feed_cache.feed_generation(self.reader.id), generation)
+
+    def test_02_failed_jobs_are_retried_then_dead_lettered(self):
+        jobs.job('always_fails')(lambda payloads: 1 / 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.dispatch('always_fails', value=1)
+
+        worker = jobs.Worker(self.conn, 'test')
+        worker.run_once()
+        self.assertEqual(self.conn.llen(jobs.QUEUE_KEY), 1)
+        worker.run_once()
+        self.assertEqual(self.conn.llen(jobs.QUEUE_KEY), 0)
+
+        dead = json.loads(self.conn.lindex(jobs.DEAD_LETTER_KEY, 0))
+        self.assertEqual(dead['name'], 'always_fails')
+        self.assertEqual(dead['attempts'], 2)
+
+    def test_03_worker_recovers_unfinished_batch_of_dead_worker(self):
+        self.conn.rpush(jobs.processing_key('test'),
+                        json.dumps({'name': 'feeds_changed',
+                                    'payload': {'author_ids': [self.author.id]},
+                                    'attempts': 0}))
+
+        worker = jobs.Worker(self.conn, 'test')
+        worker.recover()
+        self.assertEqual(self.conn.llen(jobs.QUEUE_KEY), 1)
+        self.assertEqual(worker.run_once(), 1)
+
+    def test_04_batches_of_live_workers_are_left_alone(self):
+        message = json.dumps({'name': 'feeds_changed',
+                              'payload': {'author_ids': [self.author.id]},
+                              'attempts': 0})
+        alive = jobs.Worker(self.conn, jobs.worker_name(0))
+        alive.beat()
+        self.conn.rpush(jobs.processing_key(alive.name), message)
+        self.conn.rpush(jobs.processing_key('crashed'), message)
+
+        worker = jobs.Worker(self.conn, jobs.worker_name(1))
+        self.assertNotEqual(worker.name, alive.name)
+        worker.recover()
+        self.assertEqual(self.conn.llen(jobs.QUEUE_KEY), 1)
+        self.assertEqual(self.conn.llen(jobs.processing_key(alive.name)), 1)
+        self.assertFalse(self.conn.exists(jobs.processing_key('crashed')))
+
+    def test_05_worker_survives_redis_errors(self):
+        handled = []
+        jobs.job('record')(handled.extend)
+        self.conn.rpush(jobs.QUEUE_KEY, json.dumps({'name': 'record', 'payload': {'value': 1}, 'attempts': 0}))
+
+        worker = jobs.Worker(self.conn, jobs.worker_name(0))
+        run_once = worker.run_once
+        calls = []
+
+        def flaky_run_once():
+            calls.append(1)
+            if len(calls) == 1:
+                raise redis.exceptions.ConnectionError('connection reset')
+            return run_once()
+
+        stop_event = threading.Event()
+        with mock.patch.object(worker, 'run_once', side_effect=flaky_run_once), \
+                mock.patch.object(jobs, 'close_old_connections'), \
+                self.assertLogs('mini_twitter.jobs', 'ERROR'):
+            thread = threading.Thread(target=worker.run_forever, args=(0.01, stop_event))
+            thread.start()
+            deadline = time.monotonic() + 5
+            while not handled and time.monotonic() < deadline:
+                time.sleep(0.01)
+            stop_event.set()
+            thread.join()
+
+        self.assertEqual(handled, [{'value': 1}])
+        self.assertFalse(self.conn.exists(jobs.heartbeat_key(worker.name)))
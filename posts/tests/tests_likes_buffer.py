@@ -0,0 +1,154 @@
+from unittest import mock, skipIf
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import override_settings
+
+from mini_twitter.redis_client import get_redis
+from posts.models import Post
+from posts import likes
+
+
+User = get_user_model()
+
+
+class ApplyPendingLikesTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author',
+                                               email='author@example.com',
+                                               password='pass')
+        self.fans = [
+            User.objects.create_user(username=f'fan{i}',
+                                     email=f'fan{i}@example.com',
+                                     password='pass')
+            for i in range(3)
+        ]
+        self.post = Post.objects.create(author=self.author, content='Viral post')
+        self.post.likes.add(self.fans[0])
+
+    def test_01_apply_pending_inserts_and_deletes(self):
+        change = likes.apply_pending(self.post.id,
+                                     added={self.fans[1].id, self.fans[2].id},
+                                     removed={self.fans[0].id})
+        self.assertEqual(change, 1)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 2)
+        self.assertEqual(set(self.post.likes.values_list('id', flat=True)),
+                         {self.fans[1].id, self.fans[2].id})
+
+    def test_02_apply_pending_is_idempotent(self):
+        likes.apply_pending(self.post.id, added={self.fans[0].id}, removed=set())
+        change = likes.apply_pending(self.post.id, added=set(), removed={self.fans[2].id})
+        self.assertEqual(change, 0)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+
+@skipIf(get_redis() is None, 'The like buffer requires the django_redis cache backend')
+@override_settings(LIKES_WRITE_BEHIND=True)
+class LikeBufferTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author',
+                                               email='author@example.com',
+                                               password='pass')
+        self.fan = User.objects.create_user(username='fan',
+                                            email='fan@example.com',
+                                            password='pass')
+        self.post = Post.objects.create(author=self.author, content='Viral post')
+        self.client.force_authenticate(user=self.fan)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_01_like_is_buffered_then_flushed(self):
+        response = self.client.post(f'/api/posts/like/{self.post.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(self.post.likes.exists())
+
+        response = self.client.get(f'/api/posts/list/{self.post.id}/')
+        self.assertEqual(response.data['likes'], 1)
+        self.assertEqual(response.data['liked_by'], ['fan'])
+
+        likes.flush(get_redis(), batch_size=100)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertTrue(self.post.likes.filter(id=self.fan.id).exists())
+
+        response = self.client.get(f'/api/posts/list/{self.post.id}/')
+        self.assertEqual(response.data['likes'], 1)
+        self.assertEqual(response.data['liked_by'], ['fan'])
+
+    def test_02_unlike_of_flushed_like(self):
+        self.post.likes.add(self.fan)
+
+        self.client.post(f'/api/posts/like/{self.post.id}/')
+        response = self.client.get('/api/posts/list/')
+        self.assertEqual(response.data['results'][0]['likes'], 0)
+        self.assertEqual(response.data['results'][0]['liked_by'], [])
+
+        likes.flush(get_redis(), batch_size=100)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertFalse(self.post.likes.exists())
+
+    def test_03_double_toggle_cancels_out(self):
+        self.client.post(f'/api/posts/like/{self.post.id}/')
+        self.client.post(f'/api/posts/like/{self.post.id}/')
+
+        likes.flush(get_redis(), batch_size=100)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertFalse(self.post.likes.exists())
+
+    def test_04_failed_post_does_not_lose_the_rest_of_the_batch(self):
+        other = Post.objects.create(author=self.author, content='Other post')
+        self.client.post(f'/api/posts/like/{self.post.id}/')
+        self.client.post(f'/api/posts/like/{other.id}/')
+
+        apply_pending = likes.apply_pending
+
+        def fail_for_post(post_id, added, removed):
+            if post_id == self.post.id:
+                raise DatabaseError('deadlock detected')
+            return apply_pending(post_id, added, removed)
+
+        conn = get_redis()
+        with mock.patch.object(likes, 'apply_pending', side_effect=fail_for_post), \
+                self.assertLogs('posts.likes', 'ERROR'):
+            self.assertEqual(likes.flush(conn, batch_size=100), 1)
+        self.assertTrue(other.likes.filter(id=self.fan.id).exists())
+        self.assertFalse(self.post.likes.exists())
+        self.assertEqual(conn.smembers(likes.DIRTY_POSTS_KEY), {str(self.post.id).encode()})
+
+        response = self.client.get(f'/api/posts/list/{self.post.id}/')
+        self.assertEqual(response.data['likes'], 1)
+
+        self.assertEqual(likes.flush(conn, batch_size=100), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+    def test_05_bulk_likes_go_through_the_buffer(self):
+        other = Post.objects.create(author=self.author, content='Other post')
+        self.client.post(f'/api/posts/like/{self.post.id}/')
+
+        response = self.client.post('/api/posts/like/bulk/', {'ids': [self.post.id, other.id]}, format='json')
+        self.assertEqual(response.data['results'], [
+            {'id': self.post.id, 'result': 'already_liked'},
+            {'id': other.id, 'result': 'liked'},
+        ])
+        self.assertFalse(other.likes.exists())
+
+        response = self.client.post('/api/posts/unlike/bulk/', {'ids': [self.post.id]}, format='json')
+        self.assertEqual(response.data['results'], [{'id': self.post.id, 'result': 'unliked'}])
+
+        likes.flush(get_redis(), batch_size=100)
+        self.assertFalse(self.post.likes.exists())
+        self.assertTrue(other.likes.filter(id=self.fan.id).exists())
+        other.refresh_from_db()
+        self.assertEqual(other.like_count, 1)
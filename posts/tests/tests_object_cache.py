@@ -0,0 +1,117 @@
+import time
+from unittest import skipIf
+
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework import status
+
+from mini_twitter import object_cache, resilient_cache
+from mini_twitter.redis_client import get_redis
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+class ObjectCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        resilient_cache.reset()
+        self.user1 = User.objects.create_user(username='user1',
+                                              email='user1@example.com',
+                                              password='pass')
+        self.user2 = User.objects.create_user(username='user2',
+                                              email='user2@example.com',
+                                              password='pass2')
+        self.post = Post.objects.create(author=self.user1, title='Title', content='Content')
+        self.client.force_authenticate(user=self.user1)
+
+    def tearDown(self):
+        resilient_cache.reset()
+        cache.clear()
+
+    def test_01_post_detail_is_served_from_the_cache(self):
+        url = f'/api/posts/list/{self.post.id}/'
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+
+    def test_02_post_detail_is_invalidated_on_update_and_like(self):
+        url = f'/api/posts/list/{self.post.id}/'
+        self.client.get(url)
+
+        self.client.patch(f'/api/posts/edit/{self.post.id}/', {'title': 'Edited'})
+        response = self.client.get(url)
+        self.assertEqual(response.data['title'], 'Edited')
+
+        self.client.post(f'/api/posts/like/{self.post.id}/')
+        response = self.client.get(url)
+        self.assertEqual(response.data['likes'], 1)
+        self.assertEqual(response.data['liked_by'], ['user1'])
+
+    def test_03_deleted_post_is_not_served(self):
+        url = f'/api/posts/list/{self.post.id}/'
+        self.client.get(url)
+
+        self.client.delete(f'/api/posts/delete/{self.post.id}/')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_04_profiles_are_invalidated_on_follow(self):
+        url = f'/api/users/detail/{self.user2.id}/'
+        response = self.client.get(url)
+        self.assertEqual(response.data['followers_count'], 0)
+
+        self.client.post(f'/api/users/follow/{self.user2.id}/')
+        response = self.client.get(url)
+        self.assertEqual(response.data['followers_count'], 1)
+        response = self.client.get(f'/api/users/detail/{self.user1.id}/')
+        self.assertEqual(response.data['following_count'], 1)
+
+        # Expanded profiles are never cached.
+        response = self.client.get(f'{url}?expand=followers')
+        self.assertEqual(response.data['followers'], [{'id': self.user1.id, 'username': 'user1'}])
+
+    def test_05_stale_load_is_not_cached(self):
+        def load_during_write():
+            data = {'title': 'Old'}
+            object_cache.post_details.invalidate(self.post.id)
+            return data
+
+        object_cache.post_details.fetch(self.post.id, load_during_write)
+        data = object_cache.post_details.fetch(self.post.id, lambda: {'title': 'New'})
+        self.assertEqual(data, {'title': 'New'})
+
+    def test_06_hit_ratio(self):
+        url = f'/api/posts/list/{self.post.id}/'
+        for _ in range(4):
+            self.client.get(url)
+
+        stats = resilient_cache.metrics()['caches']['post_detail']
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats.get('local_hits', 0) + stats.get('shared_hits', 0), 3)
+        self.assertEqual(stats['hit_ratio'], 0.75)
+
+
+@skipIf(get_redis() is None, 'Eviction notifications require the django_redis cache backend')
+class ObjectCacheEvictionTests(APITestCase):
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail('timed out')
+            time.sleep(0.01)
+
+    def test_01_other_workers_drop_their_local_copy(self):
+        profiles = object_cache.profiles
+        self.wait_for(object_cache.local_copies_enabled)
+        profiles.local.set(42, {'username': 'stale'}, 60)
+
+        # What another worker's invalidate() sends.
+        object_cache.publish(profiles.name, [42])
+
+        self.wait_for(lambda: profiles.local.get(42) is None)
@@ -1,7 +1,11 @@
+import json
+
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from posts.models import Post
+from mini_twitter.relations import add_relation, remove_relation
 from users.models import User
 
 User = get_user_model()
@@ -9,6 +13,7 @@ User = get_user_model()
 class PostTests(APITestCase):
 
     def setUp(self):
+        cache.clear()
         self.user = get_user_model().objects.create_user(email='test@example.com',
                                                          password='passwordtest',
                                                          username='testuser')
@@ -48,9 +53,10 @@ class PostTests(APITestCase):
         response = self.client.get(url, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 2)
         
-        sorted_posts = sorted(response.data, key=lambda post: post['content'])
+        sorted_posts = sorted(response.data['results'], key=lambda post: post['content'])
         self.assertEqual(sorted_posts[0]['content'], 'Post 1')
         self.assertEqual(sorted_posts[1]['content'], 'Post 2')
         
@@ -146,3 +152,83 @@ class PostTests(APITestCase):
         self.assertIn(self.user, post.likes.all())
         self.assertIn(user2, post.likes.all())
         self.assertEqual(post.likes.count(), 2)
+
+
+    def test_12_list_posts_cursor_pagination(self):
+        for i in range(12):
+            Post.objects.create(content=f'Post {i}', author=self.user)
+
+        response = self.client.get('/api/posts/list/?pagination=cursor')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 10)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([post['content'] for post in response.data['results']],
+                         ['Post 1', 'Post 0'])
+
+
+    def test_13_list_posts_pagination(self):
+        for i in range(15):
+            Post.objects.create(content=f'Post {i}', author=self.user)
+
+        response = self.client.get('/api/posts/list/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual(len(response.data['results']), 10)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+
+
+    def test_14_export_posts_ndjson(self):
+        for i in range(3):
+            Post.objects.create(content=f'Post {i}', author=self.user)
+
+        response = self.client.get('/api/posts/list/?export=ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['content'] for row in rows], ['Post 2', 'Post 1', 'Post 0'])
+        self.assertEqual(rows[0]['author'], 'testuser')
+
+
+    def test_15_duplicate_like_is_a_no_op(self):
+        post = Post.objects.create(content='Post to like', author=self.user)
+
+        self.assertTrue(add_relation(post.likes, self.user))
+        self.assertFalse(add_relation(post.likes, self.user))
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+        self.assertEqual(post.likes.count(), 1)
+
+        self.assertTrue(remove_relation(post.likes, self.user))
+        self.assertFalse(remove_relation(post.likes, self.user))
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 0)
+
+
+    def test_16_bulk_like_and_unlike(self):
+        posts = [Post.objects.create(content=f'Post {i}', author=self.user) for i in range(3)]
+        posts[0].likes.add(self.user)
+        ids = [post.id for post in posts] + [7777777]
+
+        response = self.client.post('/api/posts/like/bulk/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['result'] for item in response.data['results']],
+                         ['already_liked', 'liked', 'liked', 'not_found'])
+        for post in posts:
+            post.refresh_from_db()
+            self.assertEqual(post.like_count, 1)
+            self.assertIn(self.user, post.likes.all())
+
+        response = self.client.post('/api/posts/unlike/bulk/', {'ids': ids[:2]}, format='json')
+        self.assertEqual([item['result'] for item in response.data['results']],
+                         ['unliked', 'unliked'])
+        self.assertEqual(self.user.liked_posts.count(), 1)
+        posts[0].refresh_from_db()
+        self.assertEqual(posts[0].like_count, 0)
+
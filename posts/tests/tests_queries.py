@@ -0,0 +1,87 @@
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from posts.models import Post
+from posts.serializers import CompactPostSerializer
+from posts import timeline
+
+
+User = get_user_model()
+
+
+class QueryCountTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader',
+                                               email='reader@example.com',
+                                               password='pass')
+        self.likers = [
+            User.objects.create_user(username=f'liker{i}',
+                                     email=f'liker{i}@example.com',
+                                     password='pass')
+            for i in range(3)
+        ]
+
+        for i in range(3):
+            author = User.objects.create_user(username=f'author{i}',
+                                              email=f'author{i}@example.com',
+                                              password='pass')
+            self.reader.following.add(author)
+            for j in range(4):
+                post = Post.objects.create(author=author, content=f'Post {i}-{j}')
+                post.likes.add(*self.likers[:j])
+
+        self.client.force_authenticate(user=self.reader)
+
+    def test_01_feed_page_query_count(self):
+        # Warm the Redis timeline (a no-op without Redis) so both read paths
+        # cost three queries: count or celebrity lookup, page, likers prefetch.
+        timeline.get_timeline(self.reader)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/feed/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_02_post_list_query_count(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/posts/list/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_03_post_detail_query_count(self):
+        post = Post.objects.filter(likes__isnull=False).first()
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/posts/list/{post.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['likes'], post.likes.count())
+        self.assertEqual(sorted(response.data['liked_by']),
+                         sorted(user.username for user in post.likes.all()))
+
+    def test_04_compact_feed_page(self):
+        post = Post.objects.filter(author__in=self.reader.following.all()).order_by('-created_at').first()
+        post.likes.add(self.reader)
+
+        timeline.get_timeline(self.reader)
+        # count or celebrity lookup, page, liked_by_me
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/feed/?compact=true')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        first = response.data['results'][0]
+        self.assertEqual(set(first), set(CompactPostSerializer.FIELDS))
+        self.assertNotIn('liked_by', first)
+        self.assertEqual(first['id'], post.id)
+        self.assertTrue(first['liked_by_me'])
+        self.assertEqual(first['likes'], post.likes.count())
+        self.assertFalse(response.data['results'][1]['liked_by_me'])
+
+    def test_05_sparse_fieldsets(self):
+        response = self.client.get('/api/posts/list/?fields=id,likes')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'likes'})
+
+        response = self.client.get('/api/posts/list/?fields=id,password')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.data)
@@ -0,0 +1,101 @@
+import gzip
+import json
+from io import StringIO
+from unittest import mock, skipIf
+
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from mini_twitter import compression, renderers, resilient_cache, throttling
+from mini_twitter.compression import negotiate
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+class RenderingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        resilient_cache.reset()
+        throttling.reset()
+        self.user1 = User.objects.create_user(username='user1',
+                                              email='user1@example.com',
+                                              password='pass')
+        self.user2 = User.objects.create_user(username='user2',
+                                              email='user2@example.com',
+                                              password='pass2')
+        self.user1.following.add(self.user2)
+        for i in range(12):
+            post = Post.objects.create(author=self.user2, title=f'Post {i}',
+                                       content=f'Olá, {i}   ' + 'lorem ipsum ' * 20)
+            post.likes.add(self.user1)
+        self.client.force_authenticate(user=self.user1)
+
+    def tearDown(self):
+        throttling.reset()
+        resilient_cache.reset()
+        cache.clear()
+
+    def test_01_output_matches_drf(self):
+        data = self.client.get('/api/feed/').data
+        expected = JSONRenderer().render(data)
+        self.assertEqual(renderers.dumps(data), expected)
+        self.assertEqual(renderers.FastJSONRenderer().render(data), expected)
+
+        with override_settings(JSON_ENCODER='stdlib'):
+            self.assertEqual(renderers.dumps(data), expected)
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.dumps(data), expected)
+
+    def test_02_large_responses_are_gzipped(self):
+        plain = self.client.get('/api/feed/')
+        self.assertNotIn('Content-Encoding', plain)
+
+        response = self.client.get('/api/feed/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content)), json.loads(plain.content))
+
+        # A compressed body only has a weak validator, which still revalidates.
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        response = self.client.get('/api/feed/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_03_small_responses_are_not_compressed(self):
+        response = self.client.get('/api/feed/?fields=id,title', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertLess(len(response.content), 1024)
+        self.assertNotIn('Content-Encoding', response)
+
+        with override_settings(COMPRESSION_MIN_SIZE=256):
+            response = self.client.get('/api/feed/?fields=id,title', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    @skipIf(compression.brotli is None, 'Brotli compression requires the brotli package')
+    def test_04_brotli_is_preferred(self):
+        plain = self.client.get('/api/posts/list/')
+        response = self.client.get('/api/posts/list/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.content), plain.content)
+
+    def test_05_accept_encoding_negotiation(self):
+        self.assertEqual(negotiate('gzip, deflate, br', ('br', 'gzip')), 'br')
+        self.assertEqual(negotiate('gzip;q=1.0, br;q=0.5', ('br', 'gzip')), 'gzip')
+        self.assertEqual(negotiate('br;q=0, gzip', ('br', 'gzip')), 'gzip')
+        self.assertEqual(negotiate('*', ('br', 'gzip')), 'br')
+        self.assertIsNone(negotiate('gzip;q=0, identity', ('gzip',)))
+        self.assertIsNone(negotiate('', ('br', 'gzip')))
+
+    def test_06_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_rendering', runs=2, stdout=out)
+        self.assertIn('feed page (10 posts):', out.getvalue())
+        self.assertIn('post list page (10 posts):', out.getvalue())
+        self.assertIn('stdlib render: median', out.getvalue())
+        self.assertIn('gzip: median', out.getvalue())
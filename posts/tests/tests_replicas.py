@@ -0,0 +1,97 @@
+import asyncio
+
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from mini_twitter import object_cache, resilient_cache, stampede
+from mini_twitter.db_router import PrimaryReplicaRouter, ReplicaStickinessMiddleware, pin_key
+from posts.feed_cache import pages
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username='user1',
+                                             email='user1@example.com',
+                                             password='pass')
+
+    def tearDown(self):
+        resilient_cache.reset()
+        cache.clear()
+
+    def run_request(self, user, write=False):
+        """Run a request through the middleware; returns the aliases it read from."""
+        reads = []
+
+        def view(request):
+            request.user = user
+            reads.append(self.router.db_for_read(Post))
+            if write:
+                self.router.db_for_write(Post)
+                reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        ReplicaStickinessMiddleware(view)(self.factory.get('/'))
+        return reads
+
+    def test_01_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_02_request_reads_go_to_replicas(self):
+        self.assertEqual(self.run_request(self.user), ['replica'])
+        self.assertIsNone(cache.get(pin_key(self.user.id)))
+
+    def test_03_writers_read_their_own_writes(self):
+        self.assertEqual(self.run_request(self.user, write=True), ['replica', 'default'])
+        self.assertEqual(self.run_request(self.user), ['default'])
+
+        other = User.objects.create_user(username='user2',
+                                         email='user2@example.com',
+                                         password='pass')
+        self.assertEqual(self.run_request(other), ['replica'])
+
+    def test_04_pin_expires(self):
+        self.run_request(self.user, write=True)
+        cache.delete(pin_key(self.user.id))
+        self.assertEqual(self.run_request(self.user), ['replica'])
+
+    def test_05_anonymous_writes_are_not_pinned(self):
+        self.assertEqual(self.run_request(AnonymousUser(), write=True), ['replica', 'default'])
+        self.assertEqual(self.run_request(AnonymousUser()), ['replica'])
+
+    def test_06_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+    def test_07_cached_copies_are_built_from_the_primary(self):
+        resilient_cache.reset()
+        reads = []
+
+        def view(request):
+            request.user = self.user
+            load = lambda: self.router.db_for_read(Post)  # noqa: E731
+
+            async def aload():
+                return load()
+
+            reads.append(load())
+            reads.append(stampede.get_or_compute(pages, 'replica_page', load, 60))
+            reads.append(object_cache.post_details.fetch(7777777, load))
+            reads.append(asyncio.run(stampede.aget_or_compute(pages, 'replica_async_page', aload, 60)))
+            reads.append(load())
+            return HttpResponse()
+
+        ReplicaStickinessMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(reads, ['replica', 'default', 'default', 'default', 'replica'])
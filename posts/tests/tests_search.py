@@ -0,0 +1,85 @@
+from io import StringIO
+from urllib.parse import parse_qs, urlparse
+
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework import status
+
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+class PostSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user1',
+                                             email='user1@example.com',
+                                             password='pass')
+        self.client.force_authenticate(user=self.user)
+        self.in_content = Post.objects.create(author=self.user, title='Weekend',
+                                              content='Trying a new Django release')
+        self.in_title = Post.objects.create(author=self.user, title='Django tips',
+                                            content='Use select_related')
+        Post.objects.create(author=self.user, title='Lunch', content='Pizza again')
+
+    def test_01_search_ranks_title_matches_first(self):
+        response = self.client.get('/api/posts/search/?q=django')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [post['id'] for post in response.data['results']]
+        self.assertEqual(ids, [self.in_title.id, self.in_content.id])
+        self.assertIsNone(response.data['next'])
+
+    def test_02_every_term_must_match(self):
+        response = self.client.get('/api/posts/search/?q=django release')
+        ids = [post['id'] for post in response.data['results']]
+        self.assertEqual(ids, [self.in_content.id])
+
+    def test_03_search_requires_a_query(self):
+        response = self.client.get('/api/posts/search/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('q', response.data)
+
+    def test_04_keyset_pages(self):
+        for i in range(12):
+            Post.objects.create(author=self.user, title=f'Post {i}', content='about django')
+
+        response = self.client.get('/api/posts/search/?q=django')
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(response.data['results'][0]['id'], self.in_title.id)
+        cursor = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+
+        second = self.client.get('/api/posts/search/', {'q': 'django', 'cursor': cursor})
+        first_ids = {post['id'] for post in response.data['results']}
+        second_ids = {post['id'] for post in second.data['results']}
+        self.assertEqual(len(second_ids), 4)
+        self.assertFalse(first_ids & second_ids)
+        self.assertIsNone(second.data['next'])
+
+        invalid = self.client.get('/api/posts/search/', {'q': 'django', 'cursor': 'nan'})
+        self.assertEqual(invalid.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_05_compact_fields(self):
+        response = self.client.get('/api/posts/search/?q=django&fields=id,title')
+        self.assertEqual(response.data['results'][0], {'id': self.in_title.id, 'title': 'Django tips'})
+
+    def test_06_keyset_pages_over_tied_ranks(self):
+        tied = [Post.objects.create(author=self.user, title='Django news', content='Weekly').id
+                for _ in range(25)]
+
+        ids, params = [], {'q': 'news'}
+        while True:
+            response = self.client.get('/api/posts/search/', params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [post['id'] for post in response.data['results']]
+            if response.data['next'] is None:
+                break
+            params['cursor'] = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+        self.assertEqual(ids, sorted(tied, reverse=True))
+
+    def test_07_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_search', 'django', runs=2, stdout=out)
+        self.assertIn('full-text search: median', out.getvalue())
+        self.assertIn('icontains scan: median', out.getvalue())
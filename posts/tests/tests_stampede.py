@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+
+from rest_framework.test import APITestCase
+from django.core.cache import cache
+from django.test import override_settings
+
+from mini_twitter import resilient_cache, stampede
+from posts.feed_cache import pages
+
+
+@override_settings(STAMPEDE_POLL_INTERVAL=0.01)
+class StampedeTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        resilient_cache.reset()
+        self.calls = 0
+
+    def tearDown(self):
+        resilient_cache.reset()
+        cache.clear()
+
+    def slow_compute(self):
+        self.calls += 1
+        time.sleep(0.2)
+        return {'page': self.calls}
+
+    def test_01_concurrent_misses_compute_once(self):
+        results = []
+
+        def read():
+            results.append(stampede.get_or_compute(pages, 'stampede_page', self.slow_compute, 60))
+
+        threads = [threading.Thread(target=read) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'page': 1}] * 5)
+        self.assertEqual(pages.stats['coalesced'], 4)
+        self.assertIsNone(cache.get(stampede.lock_key('stampede_page')))
+
+    def test_02_entries_close_to_expiry_are_refreshed_early(self):
+        cache.set('stampede_page', stampede.pack({'page': 0}, 1.0, 0), 60)
+
+        value = stampede.get_or_compute(pages, 'stampede_page', self.slow_compute, 60)
+        self.assertEqual(value, {'page': 1})
+        self.assertEqual(pages.stats['early_refreshes'], 1)
+
+        # A fresh entry computed in 0.2s is nowhere near its expiry.
+        value = stampede.get_or_compute(pages, 'stampede_page', self.slow_compute, 60)
+        self.assertEqual((value, self.calls), ({'page': 1}, 1))
+
+    def test_03_current_value_is_served_while_another_request_refreshes(self):
+        cache.set('stampede_page', stampede.pack({'page': 0}, 1.0, 0), 60)
+        cache.add(stampede.lock_key('stampede_page'), 1, 60)
+
+        value = stampede.get_or_compute(pages, 'stampede_page', self.slow_compute, 60)
+        self.assertEqual((value, self.calls), ({'page': 0}, 0))
+
+    def test_04_waiters_compute_themselves_when_the_lease_runs_out(self):
+        cache.add(stampede.lock_key('stampede_page'), 1, 60)
+
+        with self.settings(STAMPEDE_LOCK_TIMEOUT=0.05):
+            value = stampede.get_or_compute(pages, 'stampede_page', self.slow_compute, 60)
+        self.assertEqual((value, self.calls), ({'page': 1}, 1))
+        self.assertEqual(pages.stats['lock_waits_abandoned'], 1)
+
+    def test_05_async_concurrent_misses_compute_once(self):
+        async def compute():
+            self.calls += 1
+            await asyncio.sleep(0.2)
+            return {'page': self.calls}
+
+        async def read_all():
+            return await asyncio.gather(*(
+                stampede.aget_or_compute(pages, 'stampede_async_page', compute, 60) for _ in range(5)
+            ))
+
+        results = asyncio.run(read_all())
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'page': 1}] * 5)
@@ -0,0 +1,99 @@
+from unittest import mock, skipIf
+
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncRequestFactory
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from mini_twitter import resilient_cache, throttling
+from mini_twitter.redis_client import get_redis
+from posts import async_views
+from posts.models import Post
+
+
+User = get_user_model()
+
+RATES = {'user': '5/min', 'ip': '7/min', 'post_list': '3/min', 'post_search': None}
+
+
+@mock.patch.dict(throttling.TokenBucketThrottle.THROTTLE_RATES, RATES)
+class ThrottlingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        resilient_cache.reset()
+        throttling.reset()
+        self.user1 = User.objects.create_user(username='user1',
+                                              email='user1@example.com',
+                                              password='pass')
+        self.user2 = User.objects.create_user(username='user2',
+                                              email='user2@example.com',
+                                              password='pass2')
+        self.post = Post.objects.create(author=self.user1, title='Title', content='Content')
+        self.client.force_authenticate(user=self.user1)
+
+    def tearDown(self):
+        throttling.reset()
+        resilient_cache.reset()
+        cache.clear()
+
+    def test_01_responses_carry_the_rate_limit_headers(self):
+        response = self.client.get(f'/api/posts/list/{self.post.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The user bucket is the emptiest one: 5 tokens, one spent.
+        self.assertEqual(response['X-RateLimit-Limit'], '5')
+        self.assertEqual(response['X-RateLimit-Remaining'], '4')
+        self.assertEqual(response['X-RateLimit-Reset'], '12')
+
+    def test_02_endpoint_budget(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/posts/list/').status_code, status.HTTP_200_OK)
+
+        response = self.client.get('/api/posts/list/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '20')
+        self.assertEqual(response['X-RateLimit-Remaining'], '0')
+        # Other endpoints still have budget left.
+        self.assertEqual(self.client.get(f'/api/posts/list/{self.post.id}/').status_code, status.HTTP_200_OK)
+
+    def test_03_user_and_ip_budgets(self):
+        url = f'/api/posts/list/{self.post.id}/'
+        for _ in range(5):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # Another user behind the same address only has what is left of the IP bucket.
+        self.client.force_authenticate(user=self.user2)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.2').status_code, status.HTTP_200_OK)
+
+    def test_04_buckets_refill_at_the_rate(self):
+        buckets = throttling.LocalBuckets(10)
+        rate = 2 / 1000  # two tokens per second
+        self.assertEqual(buckets.take('key', 2, rate, now=0), (True, 1, 0, 500))
+        self.assertEqual(buckets.take('key', 2, rate, now=0), (True, 0, 0, 1000))
+        self.assertEqual(buckets.take('key', 2, rate, now=100), (False, 0, 400, 900))
+        self.assertEqual(buckets.take('key', 2, rate, now=500)[0], True)
+        # Tokens never pile up beyond the size of the bucket.
+        self.assertEqual(buckets.take('key', 2, rate, now=60000), (True, 1, 0, 500))
+
+    async def test_05_async_views_are_throttled(self):
+        factory = AsyncRequestFactory()
+        token = str(AccessToken.for_user(self.user1))
+        for expected in [status.HTTP_200_OK] * 5 + [status.HTTP_429_TOO_MANY_REQUESTS]:
+            request = factory.get('/api/posts/list/', headers={'authorization': f'Bearer {token}'})
+            response = await async_views.post_list(request)
+            self.assertEqual(response.status_code, expected)
+        self.assertEqual(response['Retry-After'], '12')
+
+    @skipIf(get_redis() is None, 'The Lua token bucket requires the django_redis cache backend')
+    def test_06_buckets_are_shared_through_redis(self):
+        for _ in range(5):
+            self.client.get(f'/api/posts/list/{self.post.id}/')
+        # Another worker, with empty local buckets, sees the same user bucket.
+        throttling.local_buckets.clear()
+        response = self.client.get(f'/api/posts/list/{self.post.id}/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertTrue(get_redis().exists(f'throttle_user_{self.user1.id}'))
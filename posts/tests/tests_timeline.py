@@ -0,0 +1,131 @@
+import json
+from unittest import mock, skipIf
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from mini_twitter.redis_client import get_redis
+from posts import async_views, timeline
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+@skipIf(get_redis() is None, 'Timelines require the django_redis cache backend')
+class TimelineTests(APITestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader',
+                                               email='reader@example.com',
+                                               password='pass')
+
+        self.author = User.objects.create_user(username='author',
+                                               email='author@example.com',
+                                               password='pass')
+        self.reader.following.add(self.author)
+        self.conn = get_redis()
+        timeline.invalidate_timeline(self.reader)
+
+    def tearDown(self):
+        timeline.invalidate_timeline(self.reader)
+        cache.clear()
+
+    def create_post(self, content):
+        self.client.force_authenticate(user=self.author)
+        response = self.client.post('/api/posts/create/',
+                                    {'title': 'Title', 'content': content},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def read_feed(self, page=1):
+        cache.clear()
+        self.client.force_authenticate(user=self.reader)
+        return self.client.get(f'/api/feed/?page={page}')
+
+    def test_01_cold_user_timeline_is_rebuilt(self):
+        self.create_post('Before warm up')
+        self.assertIsNone(timeline.get_timeline(self.reader))
+        self.assertIsNotNone(timeline.get_timeline(self.reader))
+        self.assertEqual(self.conn.zcard(timeline.timeline_key(self.reader.id)), 1)
+
+    def test_02_new_post_is_pushed_to_followers(self):
+        self.read_feed()
+        post_id = self.create_post('Pushed post')
+
+        stored = self.conn.zrevrange(timeline.timeline_key(self.reader.id), 0, -1)
+        self.assertEqual([int(i) for i in stored], [post_id])
+
+        response = self.read_feed()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['content'], 'Pushed post')
+
+    @override_settings(TIMELINE_MAX_LENGTH=3)
+    def test_03_timeline_is_trimmed_and_falls_back_to_database(self):
+        self.read_feed()
+        for i in range(5):
+            self.create_post(f'Post {i}')
+
+        self.assertEqual(self.conn.zcard(timeline.timeline_key(self.reader.id)), 3)
+
+        response = self.read_feed()
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(response.data['results'][0]['content'], 'Post 4')
+        self.assertEqual(response.data['results'][-1]['content'], 'Post 0')
+
+    @override_settings(TIMELINE_CELEBRITY_THRESHOLD=0)
+    def test_04_celebrity_posts_are_pulled_at_read_time(self):
+        self.read_feed()
+        self.create_post('Celebrity post')
+
+        self.assertEqual(self.conn.zcard(timeline.timeline_key(self.reader.id)), 0)
+
+        response = self.read_feed()
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['content'], 'Celebrity post')
+
+    def test_05_deleted_post_is_removed_from_timelines(self):
+        self.read_feed()
+        post_id = self.create_post('Short lived')
+
+        self.client.force_authenticate(user=self.author)
+        self.client.delete(f'/api/posts/delete/{post_id}/')
+
+        self.assertEqual(self.conn.zcard(timeline.timeline_key(self.reader.id)), 0)
+
+    def test_06_unfollow_invalidates_timeline(self):
+        self.read_feed()
+        self.client.force_authenticate(user=self.reader)
+        self.client.post(f'/api/users/unfollow/{self.author.id}/')
+
+        self.assertFalse(self.conn.exists(timeline.timeline_ready_key(self.reader.id)))
+
+    def test_07_follows_outside_the_api_invalidate_timeline(self):
+        other = User.objects.create_user(username='other',
+                                         email='other@example.com',
+                                         password='pass')
+        self.read_feed()
+        self.author.followers.add(other, self.reader)
+        self.assertTrue(self.conn.exists(timeline.timeline_ready_key(self.reader.id)))
+
+        other.followers.add(self.reader)
+        self.assertFalse(self.conn.exists(timeline.timeline_ready_key(self.reader.id)))
+
+        self.read_feed()
+        self.reader.following.clear()
+        self.assertFalse(self.conn.exists(timeline.timeline_ready_key(self.reader.id)))
+
+    async def test_08_async_feed_reads_timeline(self):
+        post = await Post.objects.acreate(author=self.author, title='Title', content='Async post')
+        factory = AsyncRequestFactory()
+        headers = {'authorization': f'Bearer {AccessToken.for_user(self.reader)}'}
+
+        with mock.patch.object(timeline, 'get_timeline', wraps=timeline.get_timeline) as get_timeline:
+            response = await async_views.feed(factory.get('/api/feed/', headers=headers))
+        get_timeline.assert_called_once()
+        self.assertEqual(json.loads(response.content)['results'][0]['id'], post.id)
+        self.assertTrue(self.conn.exists(timeline.timeline_ready_key(self.reader.id)))
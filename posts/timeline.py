@@ -0,0 +1,203 @@
+"""
+Fan-out-on-write feed timelines.
+
+Every follower of a regular author gets the id of each new post pushed into a
+Redis sorted set (scored by creation time) and trimmed to
+TIMELINE_MAX_LENGTH entries. Authors with more than
+TIMELINE_CELEBRITY_THRESHOLD followers are not fanned out; their posts are
+pulled at read time and merged into the precomputed timeline.
+"""
+from itertools import chain
+
+import redis
+from django.conf import settings
+
+from mini_twitter.db_router import primary_reads
+from mini_twitter.redis_client import get_redis
+from mini_twitter.resilient_cache import breaker_for
+from users.models import User
+from .models import Post
+
+
+def timeline_key(user_id):
+    return f'timeline_user_{user_id}'
+
+
+def timeline_ready_key(user_id):
+    return f'timeline_user_{user_id}_ready'
+
+
+def is_celebrity(author):
+    # Read the counter from the database: the in-memory author (usually
+    # request.user) predates any follows that happened since it was loaded.
+    followers_count = User.objects.filter(pk=author.pk).values_list('followers_count', flat=True).first()
+    return (followers_count or 0) > settings.TIMELINE_CELEBRITY_THRESHOLD
+
+
+def celebrity_ids(user):
+    return list(
+        user.following.filter(followers_count__gt=settings.TIMELINE_CELEBRITY_THRESHOLD)
+        .values_list('id', flat=True)
+    )
+
+
+def feed_queryset(user, queryset=None):
+    # Read the followed ids straight from the follow table (covered by
+    # user_followers_reverse_idx) instead of joining users_user.
+    following_ids = User.followers.through.objects.filter(to_user_id=user.id).values('from_user_id')
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.filter(author__in=following_ids).order_by('-created_at', '-id')
+
+
+def _score(post):
+    return post.created_at.timestamp()
+
+
+def fan_out_post(post):
+    conn = get_redis()
+    if conn is None or is_celebrity(post.author):
+        return
+
+    follower_ids = post.author.followers.values_list('id', flat=True)
+    try:
+        pipe = conn.pipeline(transaction=False)
+        for follower_id in follower_ids.iterator():
+            key = timeline_key(follower_id)
+            pipe.zadd(key, {post.id: _score(post)})
+            pipe.zremrangebyrank(key, 0, -settings.TIMELINE_MAX_LENGTH - 1)
+            pipe.expire(key, settings.TIMELINE_TTL)
+        pipe.execute()
+    except redis.exceptions.RedisError:
+        pass
+
+
+def remove_post(post_id, author_id):
+    conn = get_redis()
+    if conn is None:
+        return
+
+    follower_ids = User.objects.filter(following=author_id).values_list('id', flat=True)
+    try:
+        pipe = conn.pipeline(transaction=False)
+        for follower_id in follower_ids.iterator():
+            pipe.zrem(timeline_key(follower_id), post_id)
+        pipe.execute()
+    except redis.exceptions.RedisError:
+        pass
+
+
+def invalidate_timeline(user):
+    invalidate_timelines([user.id])
+
+
+def invalidate_timelines(user_ids):
+    conn = get_redis()
+    if conn is None or not user_ids:
+        return
+    keys = chain.from_iterable((timeline_key(user_id), timeline_ready_key(user_id)) for user_id in user_ids)
+    try:
+        conn.delete(*keys)
+    except redis.exceptions.RedisError:
+        pass
+
+
+def rebuild_timeline(user, conn):
+    with primary_reads():
+        posts = (
+            feed_queryset(user)
+            .exclude(author__in=celebrity_ids(user))
+            .values_list('id', 'created_at')[:settings.TIMELINE_MAX_LENGTH]
+        )
+        members = {post_id: created_at.timestamp() for post_id, created_at in posts}
+    key = timeline_key(user.id)
+    pipe = conn.pipeline()
+    pipe.delete(key)
+    if members:
+        pipe.zadd(key, members)
+        pipe.expire(key, settings.TIMELINE_TTL)
+    pipe.set(timeline_ready_key(user.id), 1, ex=settings.TIMELINE_TTL)
+    pipe.execute()
+
+
+class Timeline:
+    """
+    Lazy, sliceable view over a user's precomputed timeline, merged with the
+    posts of the celebrity authors they follow. Quacks like a sequence so it
+    can be handed straight to PageNumberPagination.
+    """
+
+    def __init__(self, user, conn, queryset):
+        self.user = user
+        self.conn = conn
+        self.queryset = queryset
+        self.key = timeline_key(user.id)
+        self.celebrities = celebrity_ids(user)
+        self._size = None
+
+    @property
+    def stored(self):
+        if self._size is None:
+            self._size = self.conn.zcard(self.key)
+        return self._size
+
+    @property
+    def truncated(self):
+        return self.stored >= settings.TIMELINE_MAX_LENGTH
+
+    def celebrity_posts(self):
+        return self.queryset.filter(author__in=self.celebrities).order_by('-created_at', '-id')
+
+    def __len__(self):
+        if self.truncated:
+            return feed_queryset(self.user).count()
+        if not self.celebrities:
+            return self.stored
+        return self.stored + self.celebrity_posts().count()
+
+    def __getitem__(self, index):
+        start, stop = index.start or 0, index.stop
+        if self.truncated and stop > self.stored:
+            return list(feed_queryset(self.user, self.queryset)[start:stop])
+
+        if not self.celebrities:
+            return self._fetch(start, stop)
+
+        pushed = self._fetch(0, stop)
+        pulled = self.celebrity_posts()[:stop]
+        merged = {post.id: post for post in chain(pushed, pulled)}
+        ordered = sorted(merged.values(), key=lambda p: (p.created_at, p.id), reverse=True)
+        return ordered[start:stop]
+
+    def _fetch(self, start, stop):
+        if stop <= start:
+            return []
+        ids = [int(post_id) for post_id in self.conn.zrevrange(self.key, start, stop - 1)]
+        posts = self.queryset.in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
+
+
+def get_timeline(user, queryset=None):
+    """
+    Return the precomputed Timeline for ``user``, with posts loaded through
+    ``queryset`` (PostSerializer's shape by default), or None when the caller
+    should fall back to querying the database (no Redis, or a cold user whose
+    timeline is rebuilt here for the next request).
+    """
+    conn = get_redis()
+    breaker = breaker_for()
+    if conn is None or not breaker.allow():
+        return None
+    try:
+        ready = conn.exists(timeline_ready_key(user.id))
+        if not ready:
+            rebuild_timeline(user, conn)
+    except redis.exceptions.RedisError:
+        breaker.record_failure()
+        return None
+    breaker.record_success()
+    if not ready:
+        return None
+    if queryset is None:
+        queryset = Post.objects.with_engagement()
+    return Timeline(user, conn, queryset)
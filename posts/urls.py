@@ -1,18 +1,25 @@
 from django.urls import path
+from mini_twitter.async_api import read_view
+from . import async_views
 from .views import (
     PostCreateView,
     PostListView,
     PostUpdateView,
     PostDeleteView,
     PostLikeView,
-    PostDetailView
+    PostDetailView,
+    PostBulkLikeView,
+    PostSearchView,
 )
 
 urlpatterns = [
     path('create/', PostCreateView.as_view(), name='post-create'),
-    path('list/', PostListView.as_view(), name='post-list'),
-    path('list/<int:pk>/', PostDetailView.as_view(), name='post-detail'),
+    path('list/', read_view(PostListView.as_view(), async_views.post_list), name='post-list'),
+    path('search/', PostSearchView.as_view(), name='post-search'),
+    path('list/<int:pk>/', read_view(PostDetailView.as_view(), async_views.post_detail), name='post-detail'),
     path('edit/<int:pk>/', PostUpdateView.as_view(), name='post-edit'),
     path('delete/<int:pk>/', PostDeleteView.as_view(), name='post-delete'),
     path('like/<int:pk>/', PostLikeView.as_view(), name='post-like'),
+    path('like/bulk/', PostBulkLikeView.as_view(), name='post-bulk-like'),
+    path('unlike/bulk/', PostBulkLikeView.as_view(unlike=True), name='post-bulk-unlike'),
 ]
@@ -3,14 +3,45 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
 from rest_framework.pagination import PageNumberPagination
-from django.core.cache import cache
+from django.conf import settings
 import redis
-from django.core.cache.backends.base import InvalidCacheBackendError
 from drf_spectacular.utils import extend_schema
 
+from mini_twitter import conditional, object_cache, renderers, stampede
+from mini_twitter.resilient_cache import CacheUnavailable, breaker_for
+from mini_twitter.relations import add_relation, remove_relation, add_relations, remove_relations
+from users.serializers import BulkIdsSerializer
+
 from .models import Post
-from .serializers import PostSerializer
+from .serializers import PostSerializer, CompactPostSerializer, PostSearchQuerySerializer
+from . import timeline
+from . import likes as like_buffer
+from . import feed_cache
+from .feed_cache import feed_cache_key, post_list_cache_key
+from .pagination import KeysetPagination, SearchKeysetPagination
+from .search import search_posts
+
+
+def serialize_posts(posts, request, fields):
+    """Full PostSerializer output, or the compact rows when ``fields`` is set."""
+    if fields:
+        return CompactPostSerializer(posts, request.user, fields).data
+    return PostSerializer(posts, many=True).data
+
+
+def shaped_posts(fields):
+    return Post.objects.compact() if fields else Post.objects.with_engagement()
+
+
+def ndjson_line(post):
+    return renderers.dumps(PostSerializer(post).data) + b'\n'
+
+
+def post_detail_data(pk):
+    post = get_object_or_404(Post.objects.with_engagement(), pk=pk)
+    return PostSerializer(post).data
 
 
 @extend_schema(tags=['Posts'])
@@ -29,13 +60,75 @@ class PostCreateView(APIView):
 class PostListView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = PostSerializer
+    throttle_scope = 'post_list'
     
     @extend_schema(operation_id="list_posts")
     def get(self, request):
-        posts = Post.objects.all().order_by('-created_at')
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data)
+        if request.query_params.get('export') == 'ndjson':
+            return self.export_ndjson()
+        fields = CompactPostSerializer.requested_fields(request)
+        if KeysetPagination.requested(request):
+            return self.get_cursor_page(request, fields)
+
+        posts = shaped_posts(fields).order_by('-created_at', '-id')
+        paginator = PageNumberPagination()
+        result_page = paginator.paginate_queryset(posts, request)
+        return paginator.get_paginated_response(serialize_posts(result_page, request, fields))
+
+    def export_ndjson(self):
+        """Stream every post as newline-delimited JSON without loading the table."""
+        posts = Post.objects.with_engagement().order_by('-created_at', '-id')
+
+        def rows():
+            for post in posts.iterator(chunk_size=settings.POST_EXPORT_CHUNK_SIZE):
+                yield ndjson_line(post)
+
+        return StreamingHttpResponse(rows(), content_type='application/x-ndjson')
+
+    def get_cursor_page(self, request, fields):
+        # Shared cache entries only hold the full representation: compact
+        # rows carry the per-reader liked_by_me flag.
+        cache_key = None
+        if not fields:
+            try:
+                cache_key = post_list_cache_key(KeysetPagination.position(request))
+            except CacheUnavailable:
+                pass
+        if cache_key is None:
+            return Response(self.build_cursor_page(request, fields))
+        # Every new post moves this page to a new key that all readers share,
+        # so concurrent misses wait for a single rebuild.
+        return Response(stampede.get_or_compute(
+            feed_cache.pages, cache_key,
+            lambda: self.build_cursor_page(request, fields),
+            settings.FEED_CACHE_TIMEOUT,
+        ))
+
+    def build_cursor_page(self, request, fields):
+        paginator = KeysetPagination()
+        result_page = paginator.paginate_queryset(shaped_posts(fields), request)
+        return paginator.get_paginated_response(serialize_posts(result_page, request, fields)).data
+
+
+
+@extend_schema(tags=['Posts'])
+class PostSearchView(APIView):
+    """Posts matching ``?q=``, best match first, in keyset pages."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = PostSerializer
+    throttle_scope = 'post_search'
+
+    @extend_schema(parameters=[PostSearchQuerySerializer])
+    def get(self, request):
+        query = PostSearchQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=400)
 
+        fields = CompactPostSerializer.requested_fields(request)
+        posts = search_posts(shaped_posts(fields), query.validated_data['q'])
+        paginator = SearchKeysetPagination()
+        result_page = paginator.paginate_queryset(posts, request)
+        return paginator.get_paginated_response(serialize_posts(result_page, request, fields))
 
 
 @extend_schema(tags=['Posts'])
@@ -44,9 +137,9 @@ class PostDetailView(APIView):
     serializer_class = PostSerializer
     
     def get(self, request, pk):
-        post = get_object_or_404(Post, pk=pk)
-        serializer = PostSerializer(post)
-        return Response(serializer.data)
+        version, data = object_cache.post_details.fetch_stamped(pk, lambda: post_detail_data(pk))
+        return conditional.respond(request, conditional.validators(version, 'post', pk),
+                                   lambda: Response(data))
 
 
 @extend_schema(tags=['Posts'])
@@ -85,13 +178,71 @@ class PostLikeView(APIView):
     def post(self, request, pk):
         post = get_object_or_404(Post, pk=pk)
         user = request.user
+
+        buffer = like_buffer.get_buffer()
+        if buffer is not None:
+            try:
+                liked = like_buffer.toggle_like(buffer, post, user)
+            except redis.exceptions.RedisError:
+                pass
+            else:
+                object_cache.post_details.invalidate(post.pk)
+                if liked:
+                    return Response({"message": f"Post liked by {user}!"})
+                return Response({"message": f"Like removed by {user}!"})
         
-        if user in post.likes.all():
-            post.likes.remove(user)
+        # Conditional delete first, then INSERT ... ON CONFLICT DO NOTHING:
+        # a duplicate concurrent like becomes a no-op instead of an error.
+        if remove_relation(post.likes, user):
             return Response({"message": f"Like removed by {user}!"})
+        add_relation(post.likes, user)
+        return Response({"message": f"Post liked by {user}!"})
+
+
+@extend_schema(tags=['Posts'])
+class PostBulkLikeView(APIView):
+    """Like (or, with ``unlike=True``, unlike) up to 100 posts at once."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = BulkIdsSerializer
+    unlike = False
+
+    def post(self, request):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+
+        posts = Post.objects.only('id', 'author_id').in_bulk(ids)
+        changed = self.set_likes(request.user, posts)
+        if self.unlike:
+            done, unchanged = 'unliked', 'not_liked'
         else:
-            post.likes.add(user)
-            return Response({"message": f"Post liked by {user}!"})
+            done, unchanged = 'liked', 'already_liked'
+
+        results = []
+        for post_id in ids:
+            if post_id not in posts:
+                result = 'not_found'
+            else:
+                result = done if post_id in changed else unchanged
+            results.append({'id': post_id, 'result': result})
+        return Response({'results': results})
+
+    def set_likes(self, user, posts):
+        # With write-behind on, the pending toggles of these posts live in
+        # Redis; writing the rows directly would be undone by the next flush.
+        buffer = like_buffer.get_buffer()
+        if buffer is not None and posts:
+            try:
+                changed = like_buffer.set_likes(buffer, list(posts), user, not self.unlike)
+            except redis.exceptions.RedisError:
+                pass
+            else:
+                object_cache.post_details.invalidate(*changed)
+                return changed
+
+        if self.unlike:
+            return remove_relations(user.liked_posts, posts.values())
+        return add_relations(user.liked_posts, posts.values())
 
 
 @extend_schema(tags=['Feed'])
@@ -100,35 +251,53 @@ class FeedView(APIView):
     serializer_class = PostSerializer
 
     def get(self, request):
-        user = request.user
-        page_number = request.query_params.get('page', '1')
-        cache_key = f'feed_user_{user.id}_page_{page_number}'
+        if KeysetPagination.requested(request):
+            paginator = KeysetPagination()
+            position = KeysetPagination.position(request)
+        else:
+            paginator = PageNumberPagination()
+            position = request.query_params.get('page', '1')
+        fields = CompactPostSerializer.requested_fields(request)
+        if fields:
+            position = f"{position}_fields_{'.'.join(fields)}"
 
+        # Without Redis (cache_key is None) the page is served straight from
+        # the database: slower, but the feed stays up.
         try:
-            cached_data = cache.get(cache_key)
-            if cached_data:
-                return Response(cached_data)
-        except (redis.exceptions.ConnectionError, InvalidCacheBackendError):
-            return Response({'detail': 'Internal server error: Redis is not available'}, status=503)
-        
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
+            generation = feed_cache.feed_generation(request.user.id)
+        except CacheUnavailable:
+            return Response(self.build_page(request, paginator, fields))
 
-        following_users = user.following.all()
-        posts = Post.objects.filter(author__in=following_users).order_by('-created_at')
+        # Polls of an unchanged feed are answered from the cached page alone.
+        cache_key = feed_cache_key(request.user.id, position, generation)
+        entry = feed_cache.cached_feed_page(cache_key, lambda: self.page_posts(request, paginator, fields))
+        return conditional.respond(
+            request, conditional.validators(entry['built_at'], request.user.id, request.get_full_path()),
+            lambda: Response(entry['page']),
+        )
 
-        paginator = PageNumberPagination()
-        result_page = paginator.paginate_queryset(posts, request)
-
-        serializer = PostSerializer(result_page, many=True)
-        response_data = paginator.get_paginated_response(serializer.data).data
+    def build_page(self, request, paginator, fields):
+        return self.page_posts(request, paginator, fields)[1]
 
-        try:
-            cache.set(cache_key, response_data, timeout=60)
-        except (redis.exceptions.ConnectionError, InvalidCacheBackendError):
-            pass
+    def page_posts(self, request, paginator, fields):
+        """The posts of the requested feed page and its response data."""
+        user = request.user
+        # Keyset pages are a single indexed range scan, so they always read
+        # straight from the database instead of the precomputed timeline.
+        user_timeline = None
+        if isinstance(paginator, PageNumberPagination):
+            user_timeline = timeline.get_timeline(user, shaped_posts(fields))
+        result_page = None
+        if user_timeline is not None:
+            try:
+                result_page = paginator.paginate_queryset(user_timeline, request)
+            except redis.exceptions.RedisError:
+                breaker_for().record_failure()
+                user_timeline = None
+        if user_timeline is None:
+            posts = timeline.feed_queryset(user, shaped_posts(fields))
+            result_page = paginator.paginate_queryset(posts, request)
 
-        return Response(response_data)
+        return result_page, paginator.get_paginated_response(serialize_posts(result_page, request, fields)).data
 
     
\ No newline at end of file
@@ -0,0 +1,23 @@
+"""Async (ASGI) version of the user detail endpoint, see posts.async_views."""
+from asgiref.sync import sync_to_async
+from django.shortcuts import get_object_or_404
+
+from mini_twitter import conditional, object_cache
+from mini_twitter.async_api import async_api_view, json_response
+
+from .models import User
+from .serializers import UserSerializer
+
+
+def user_detail_data(request, pk):
+    user = get_object_or_404(User, pk=pk)
+    return UserSerializer(user, context={'request': request}).data
+
+
+@async_api_view
+async def user_detail(request, pk):
+    if 'expand' in request.query_params:
+        return await sync_to_async(user_detail_data)(request, pk)
+    version, data = await object_cache.profiles.afetch_stamped(pk, lambda: user_detail_data(request, pk))
+    return conditional.respond(request, conditional.validators(version, 'user', pk),
+                               lambda: json_response(data))
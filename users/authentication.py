@@ -0,0 +1,84 @@
+"""
+JWT authentication without a users query per request.
+
+simplejwt's JWTAuthentication loads the whole user row for every call.
+CachedJWTAuthentication trusts the signed ``user_id`` claim and only needs
+the few columns that decide whether the token is still good (is_active and
+the password, hashed into the ``hash_password`` claim by CHECK_REVOKE_TOKEN).
+Those are read through the ``auth_user`` ObjectCache: the worker's own LRU,
+then Redis, then one narrow query.
+
+request.user is a real User with only id, username, is_active and is_staff
+loaded; any other field is fetched from the database on first access, so
+views that never touch them cost no query at all.
+
+Saving or deleting a user invalidates its cached state on every worker
+(users/signals.py), so deactivating an account or changing its password
+revokes its tokens at once. Changes that bypass the signals (queryset
+updates, raw SQL) take effect within AUTH_USER_CACHE_TIMEOUT seconds.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.crypto import constant_time_compare
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from mini_twitter.object_cache import ObjectCache
+from .models import User
+
+auth_states = ObjectCache('auth_user', timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+
+
+def load_state(user_id):
+    """What authentication needs to know about a user, or None if it is gone."""
+    row = User.objects.filter(pk=user_id).values('username', 'is_active', 'is_staff', 'password').first()
+    if row is None:
+        return None
+    row['hash_password'] = get_md5_hash_password(row.pop('password'))
+    return row
+
+
+def lazy_user(user_id, state):
+    """User with id, username, is_active and is_staff set; the rest loads on access."""
+    loaded = {'id': user_id, 'username': state['username'],
+              'is_active': state['is_active'], 'is_staff': state['is_staff']}
+    # from_db() expects the values in the model's field order.
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in loaded]
+    return User.from_db(DEFAULT_DB_ALIAS, names, [loaded[name] for name in names])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user_id(self, validated_token):
+        try:
+            return int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken('Token contained no recognizable user identification')
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        state = auth_states.fetch(user_id, lambda: load_state(user_id))
+        return self.user_from_state(user_id, state, validated_token)
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        state = await auth_states.afetch(user_id, lambda: load_state(user_id))
+        return self.user_from_state(user_id, state, validated_token)
+
+    def user_from_state(self, user_id, state, validated_token):
+        if state is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not state['is_active']:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and not constant_time_compare(
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM, ''), state['hash_password']
+        ):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        return lazy_user(user_id, state)
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Documents CachedJWTAuthentication as the usual bearer JWT scheme."""
+    target_class = CachedJWTAuthentication
@@ -0,0 +1,41 @@
+"""
+Password hashers whose cost comes from the settings.
+
+PASSWORD_HASHER picks which of them hashes new passwords (it goes first in
+PASSWORD_HASHERS); the others stay listed so existing hashes still verify.
+Django rehashes a password whose algorithm or cost differs from the first
+hasher the next time it is checked, so switching the profile or tuning a
+cost migrates each user transparently on their next login.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    BCryptSHA256PasswordHasher,
+    PBKDF2PasswordHasher,
+)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+class TunedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    @property
+    def rounds(self):
+        return settings.BCRYPT_ROUNDS
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PBKDF2_ITERATIONS
@@ -0,0 +1,186 @@
+"""
+Sliding-window limits on login attempts.
+
+Every attempt is recorded against the email address it targets, and every
+failed one against the IP it comes from (as DRF's throttles see it, so
+behind a proxy NUM_PROXIES applies); once either has
+LOGIN_MAX_ATTEMPTS_PER_EMAIL / LOGIN_MAX_ATTEMPTS_PER_IP attempts in the
+last LOGIN_ATTEMPT_WINDOW seconds further attempts are refused until the
+oldest one leaves the window. Users logging in successfully behind one NAT
+therefore do not use up each other's IP window. The
+check runs before the user is looked up, so a refused attempt costs neither a
+query nor a password hash, which is what keeps a credential-stuffing burst
+from eating the CPU the hasher needs for real logins.
+
+With Redis each window is a sorted set of attempt timestamps, checked and
+updated for both keys in one Lua script so workers share the counts. Without
+Redis, or while it is failing, each worker keeps its own windows in memory:
+the limits then apply per process instead of per deployment.
+
+A successful login clears the window of its email address so a user who
+mistyped their password a few times is not locked out afterwards.
+"""
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from mini_twitter.redis_client import get_redis
+from mini_twitter.resilient_cache import CACHE_ERRORS
+
+
+logger = logging.getLogger(__name__)
+
+# Windows kept by the in-memory fallback; the least recently used go first.
+LOCAL_MAX_KEYS = 10000
+
+ATTEMPT_SCRIPT = """
+local now, window, member = tonumber(ARGV[1]), tonumber(ARGV[2]), ARGV[3]
+local recorded = tonumber(ARGV[4])
+local retry = 0
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= tonumber(ARGV[4 + i]) then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        retry = math.max(retry, tonumber(oldest[2]) + window - now)
+    end
+end
+if retry > 0 then
+    return retry
+end
+for i = 1, recorded do
+    redis.call('ZADD', KEYS[i], now, member)
+    redis.call('PEXPIRE', KEYS[i], window)
+end
+return 0
+"""
+
+
+def email_key(email):
+    digest = hashlib.sha1(email.strip().lower().encode()).hexdigest()
+    return f'login_attempts_email_{digest}'
+
+
+def ip_key(request):
+    return f'login_attempts_ip_{BaseThrottle().get_ident(request)}'
+
+
+class LocalWindows:
+    """In-process sliding windows, used when Redis is not available."""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self.windows = OrderedDict()
+        self.lock = threading.Lock()
+
+    def attempt(self, limits, now, window, recorded):
+        """Check ``limits``, then record ``now`` in the first ``recorded`` windows."""
+        with self.lock:
+            retry = 0
+            for key, limit in limits.items():
+                attempts = self.windows.get(key)
+                if attempts is None:
+                    continue
+                while attempts and attempts[0] <= now - window:
+                    attempts.popleft()
+                if len(attempts) >= limit:
+                    retry = max(retry, attempts[0] + window - now)
+            if retry:
+                return retry
+
+            for key in list(limits)[:recorded]:
+                self.record(key, now)
+            return 0
+
+    def add(self, key, now):
+        with self.lock:
+            self.record(key, now)
+
+    def record(self, key, now):
+        self.windows.setdefault(key, deque()).append(now)
+        self.windows.move_to_end(key)
+        while len(self.windows) > self.max_keys:
+            self.windows.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.windows.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.windows.clear()
+
+
+local_windows = LocalWindows(LOCAL_MAX_KEYS)
+
+
+def attempt(request, email):
+    """
+    Record a login attempt for ``email`` from the client of ``request``.
+    Returns 0 when it may go ahead, otherwise the seconds until it may be retried.
+    The IP window is only checked here: failed() records against it.
+    """
+    # The email window comes first: it is the one recorded.
+    limits = {
+        email_key(email): settings.LOGIN_MAX_ATTEMPTS_PER_EMAIL,
+        ip_key(request): settings.LOGIN_MAX_ATTEMPTS_PER_IP,
+    }
+    now = time.time_ns() // 1_000_000
+    window = settings.LOGIN_ATTEMPT_WINDOW * 1000
+
+    conn = get_redis()
+    if conn is not None:
+        try:
+            script = conn.register_script(ATTEMPT_SCRIPT)
+            retry = script(keys=list(limits),
+                           args=[now, window, member(now), 1, *limits.values()])
+            return math.ceil(int(retry) / 1000)
+        except CACHE_ERRORS:
+            logger.warning('Login limiter falling back to in-process windows')
+    return math.ceil(local_windows.attempt(limits, now, window, 1) / 1000)
+
+
+def failed(request):
+    """Record a failed login from the client of ``request`` in its IP window."""
+    key = ip_key(request)
+    now = time.time_ns() // 1_000_000
+    window = settings.LOGIN_ATTEMPT_WINDOW * 1000
+
+    conn = get_redis()
+    if conn is not None:
+        try:
+            pipe = conn.pipeline()
+            pipe.zadd(key, {member(now): now})
+            pipe.pexpire(key, window)
+            pipe.execute()
+            return
+        except CACHE_ERRORS:
+            logger.warning('Login limiter falling back to in-process windows')
+    local_windows.add(key, now)
+
+
+def member(now):
+    return f'{now}-{os.urandom(4).hex()}'
+
+
+def succeeded(email):
+    """Forget the attempts against ``email`` after a successful login."""
+    key = email_key(email)
+    local_windows.delete(key)
+    conn = get_redis()
+    if conn is None:
+        return
+    try:
+        conn.delete(key)
+    except CACHE_ERRORS:
+        pass
+
+
+def reset():
+    local_windows.clear()
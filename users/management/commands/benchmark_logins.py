@@ -0,0 +1,55 @@
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, check_password
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils.module_loading import import_string
+
+from users import login_limiter
+
+
+class Command(BaseCommand):
+    help = ('Time password verification for each hasher profile and report '
+            'the logins per second one core can serve, next to the cost of a '
+            'login refused by the attempt limiter.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=10)
+
+    def handle(self, *args, **options):
+        runs = options['runs']
+        for name, path in settings.PASSWORD_HASHER_CLASSES.items():
+            hasher = import_string(path)()
+            try:
+                encoded = make_password('benchmark-password', hasher=hasher)
+            except ValueError as exc:
+                # The algorithm's library is not installed.
+                self.stdout.write(self.style.WARNING(f'{name}: skipped ({exc})'))
+                continue
+
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                check_password('benchmark-password', encoded, preferred=hasher)
+                timings.append(time.perf_counter() - started)
+            median = statistics.median(timings)
+            marker = ' (active)' if name == settings.PASSWORD_HASHER else ''
+            self.stdout.write(
+                f'{name}{marker}: median {median * 1000:.1f} ms per verify, '
+                f'{1 / median:.1f} logins/sec per core'
+            )
+
+        request = RequestFactory().post('/api/users/login/', REMOTE_ADDR='192.0.2.1')
+        email = f'benchmark-{os.urandom(4).hex()}@example.com'
+        refusals = max(runs * 100, settings.LOGIN_MAX_ATTEMPTS_PER_EMAIL + 1)
+        started = time.perf_counter()
+        for _ in range(refusals):
+            login_limiter.attempt(request, email)
+        elapsed = time.perf_counter() - started
+        login_limiter.succeeded(email)
+        self.stdout.write(self.style.SUCCESS(
+            f'limited attempts: {refusals / elapsed:.0f} refusals/sec per core'
+        ))
@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from mini_twitter import object_cache
+from posts.models import Post
+from users.models import User
+
+
+Follow = User.followers.through
+Like = Post.likes.through
+
+
+def batches(queryset, batch_size):
+    last_pk = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+def count_by(rows, column, ids):
+    return dict(
+        rows.filter(**{f'{column}__in': ids})
+        .values_list(column)
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+
+
+class Command(BaseCommand):
+    help = ('Recompute the denormalized followers_count, following_count and '
+            'like_count columns from the relation tables, in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        fixed_users = 0
+        for ids in batches(User.objects.all(), batch_size):
+            with transaction.atomic():
+                # Lock the rows before counting: follows and likes bump the
+                # counters of locked rows only once this transaction ends, so
+                # none of them can be overwritten by a stale total.
+                users = list(
+                    User.objects.filter(pk__in=ids).order_by('pk').select_for_update()
+                    .only('id', 'followers_count', 'following_count')
+                )
+                followers = count_by(Follow.objects.all(), 'from_user_id', ids)
+                following = count_by(Follow.objects.all(), 'to_user_id', ids)
+                drifted = []
+                for user in users:
+                    expected = (followers.get(user.pk, 0), following.get(user.pk, 0))
+                    if (user.followers_count, user.following_count) != expected:
+                        user.followers_count, user.following_count = expected
+                        drifted.append(user)
+                User.objects.bulk_update(drifted, ['followers_count', 'following_count'])
+                object_cache.profiles.invalidate(*(user.pk for user in drifted))
+            fixed_users += len(drifted)
+
+        fixed_posts = 0
+        for ids in batches(Post.objects.all(), batch_size):
+            with transaction.atomic():
+                posts = list(
+                    Post.objects.filter(pk__in=ids).order_by('pk').select_for_update()
+                    .only('id', 'like_count')
+                )
+                likes = count_by(Like.objects.all(), 'post_id', ids)
+                drifted = []
+                for post in posts:
+                    expected = likes.get(post.pk, 0)
+                    if post.like_count != expected:
+                        post.like_count = expected
+                        drifted.append(post)
+                Post.objects.bulk_update(drifted, ['like_count'])
+                object_cache.post_details.invalidate(*(post.pk for post in drifted))
+            fixed_posts += len(drifted)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled counters: {fixed_users} users and {fixed_posts} posts fixed'
+        ))
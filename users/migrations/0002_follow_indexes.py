@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        # users_user_followers rows are (followed, follower). The unique
+        # (from_user_id, to_user_id) constraint serves user.followers; this
+        # index serves the reverse direction, user.following, used by FeedView.
+        migrations.RunSQL(
+            'CREATE INDEX user_followers_reverse_idx ON users_user_followers (to_user_id, from_user_id);',
+            reverse_sql='DROP INDEX user_followers_reverse_idx;',
+        ),
+    ]
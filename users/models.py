@@ -4,6 +4,8 @@ from django.db import models
 class User(AbstractUser):
     email = models.EmailField(unique=True)
     followers = models.ManyToManyField('self', symmetrical=False, related_name='following', blank=True)
+    followers_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
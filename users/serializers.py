@@ -27,6 +27,15 @@ class UserSimpleSerializer(serializers.ModelSerializer):
 
 
 class UserSerializer(serializers.ModelSerializer):
+    """
+    Profiles carry follower/following counts only. The relation lists are
+    nested on request with ``?expand=followers,following`` and capped at
+    EXPAND_LIMIT users; the paginated followers/following endpoints return
+    the rest.
+    """
+    EXPANDABLE = ('followers', 'following')
+    EXPAND_LIMIT = 10
+
     followers = serializers.SerializerMethodField()
     following = serializers.SerializerMethodField()
     followers_count = serializers.SerializerMethodField()
@@ -35,21 +44,30 @@ class UserSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(UserSimpleSerializer(many=True))
     def get_followers(self, obj):
-        followers = obj.followers.all()
+        followers = obj.followers.only('id', 'username').order_by('-id')[:self.EXPAND_LIMIT]
         return UserSimpleSerializer(followers, many=True).data
 
     @extend_schema_field(UserSimpleSerializer(many=True))
     def get_following(self, obj):
-        following = obj.following.all()
+        following = obj.following.only('id', 'username').order_by('-id')[:self.EXPAND_LIMIT]
         return UserSimpleSerializer(following, many=True).data
     
     @extend_schema_field(serializers.IntegerField())
     def get_followers_count(self, obj):
-        return obj.followers.count()
+        return obj.followers_count
     
     @extend_schema_field(serializers.IntegerField())
     def get_following_count(self, obj):
-        return obj.following.count()
+        return obj.following_count
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        expand = request.query_params.get('expand', '').split(',') if request else []
+        for name in self.EXPANDABLE:
+            if name not in expand:
+                fields.pop(name)
+        return fields
         
     class Meta:
         model = User
@@ -62,3 +80,9 @@ class UserSerializer(serializers.ModelSerializer):
 class UserLoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1),
+                                allow_empty=False, max_length=100)
+
@@ -0,0 +1,79 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from mini_twitter import object_cache
+from .authentication import auth_states
+from .models import User
+
+
+Follow = User.followers.through
+
+
+def existing_follow_ids(instance, reverse, pk_set):
+    """
+    Ids on the other side of the relations that really exist (and are about
+    to be removed). The rows are locked so concurrent unfollows of the same
+    pair can't both decrement the counters.
+    """
+    if reverse:
+        rows = Follow.objects.filter(to_user_id=instance.pk)
+        column = 'from_user_id'
+    else:
+        rows = Follow.objects.filter(from_user_id=instance.pk)
+        column = 'to_user_id'
+    if pk_set is not None:
+        rows = rows.filter(**{f'{column}__in': pk_set})
+    return list(rows.select_for_update().values_list(column, flat=True))
+
+
+def adjust_follow_counts(instance, reverse, other_ids, delta):
+    if not other_ids:
+        return
+
+    # user.followers.add(x): instance is followed, x follows.
+    # user.following.add(x): instance follows, x is followed.
+    instance_field, other_field = 'followers_count', 'following_count'
+    if reverse:
+        instance_field, other_field = other_field, instance_field
+
+    User.objects.filter(pk=instance.pk).update(
+        **{instance_field: F(instance_field) + delta * len(other_ids)}
+    )
+    User.objects.filter(pk__in=other_ids).update(**{other_field: F(other_field) + delta})
+
+
+@receiver(m2m_changed, sender=Follow)
+def maintain_follow_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('pre_remove', 'pre_clear'):
+        instance._removed_follow_ids = existing_follow_ids(
+            instance, reverse, pk_set if action == 'pre_remove' else None
+        )
+    elif action == 'post_add':
+        adjust_follow_counts(instance, reverse, pk_set, 1)
+    elif action in ('post_remove', 'post_clear'):
+        adjust_follow_counts(instance, reverse, instance.__dict__.pop('_removed_follow_ids', pk_set), -1)
+
+
+@receiver(m2m_changed, sender=Follow)
+def invalidate_profiles_on_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    # Both sides of a follow show its counters.
+    if action in ('post_add', 'post_remove'):
+        other_ids = pk_set
+    elif action == 'pre_clear':
+        # Collected by maintain_follow_counts, which runs first.
+        other_ids = instance._removed_follow_ids
+    else:
+        return
+    object_cache.profiles.invalidate(instance.pk, *other_ids)
+
+
+@receiver(post_save, sender=User)
+def invalidate_profile_on_save(sender, instance, **kwargs):
+    object_cache.profiles.invalidate(instance.pk)
+    auth_states.invalidate(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_auth_state_on_delete(sender, instance, **kwargs):
+    auth_states.invalidate(instance.pk)
@@ -0,0 +1,98 @@
+from io import StringIO
+
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class CounterTests(APITestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1',
+                                              email='user1@example.com',
+                                              password='pass')
+
+        self.user2 = User.objects.create_user(username='user2',
+                                              email='user2@example.com',
+                                              password='pass')
+        self.client.force_authenticate(user=self.user1)
+
+
+    def test_01_follow_and_unfollow_update_counters(self):
+        self.client.post(f'/api/users/follow/{self.user2.id}/')
+        self.user1.refresh_from_db()
+        self.user2.refresh_from_db()
+        self.assertEqual(self.user1.following_count, 1)
+        self.assertEqual(self.user2.followers_count, 1)
+
+        self.client.post(f'/api/users/unfollow/{self.user2.id}/')
+        self.client.post(f'/api/users/unfollow/{self.user2.id}/')
+        self.user1.refresh_from_db()
+        self.user2.refresh_from_db()
+        self.assertEqual(self.user1.following_count, 0)
+        self.assertEqual(self.user2.followers_count, 0)
+
+
+    def test_02_like_toggle_updates_counter(self):
+        post = Post.objects.create(author=self.user2, content='Post')
+
+        self.client.post(f'/api/posts/like/{post.id}/')
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+
+        self.client.post(f'/api/posts/like/{post.id}/')
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 0)
+
+
+    def test_03_profile_reads_counters(self):
+        self.user1.following.add(self.user2)
+
+        response = self.client.get(f'/api/users/detail/{self.user2.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['followers_count'], 1)
+        self.assertEqual(response.data['following_count'], 0)
+
+
+    def test_04_reconcile_counters_fixes_drift(self):
+        post = Post.objects.create(author=self.user2, content='Post')
+        post.likes.add(self.user1)
+        self.user1.following.add(self.user2)
+
+        User.objects.update(followers_count=42, following_count=7)
+        Post.objects.update(like_count=0)
+
+        out = StringIO()
+        call_command('reconcile_counters', batch_size=1, stdout=out)
+        self.assertIn('2 users and 1 posts fixed', out.getvalue())
+
+        self.user1.refresh_from_db()
+        self.user2.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual((self.user1.followers_count, self.user1.following_count), (0, 1))
+        self.assertEqual((self.user2.followers_count, self.user2.following_count), (1, 0))
+        self.assertEqual(post.like_count, 1)
+
+
+    def test_05_reconcile_counters_locks_rows_before_counting(self):
+        post = Post.objects.create(author=self.user2, content='Post')
+        post.likes.add(self.user1)
+        self.user1.following.add(self.user2)
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command('reconcile_counters', stdout=StringIO())
+        sql = [query['sql'] for query in queries.captured_queries]
+
+        def first(*parts):
+            return next(i for i, query in enumerate(sql) if all(part in query for part in parts))
+
+        self.assertLess(first('"followers_count"', 'FROM "users_user" WHERE'),
+                        first('FROM "users_user_followers"'))
+        self.assertLess(first('"like_count"', 'FROM "posts_post" WHERE'),
+                        first('FROM "posts_post_likes"'))
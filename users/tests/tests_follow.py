@@ -2,6 +2,8 @@ from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
 from rest_framework import status
 
+from mini_twitter.relations import add_relations
+
 User = get_user_model()
 
 class FollowTests(APITestCase):
@@ -82,8 +84,8 @@ class FollowTests(APITestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
-        self.assertEqual(response.data, [])
+        self.assertEqual(len(response.data['results']), 0)
+        self.assertEqual(response.data['results'], [])
     
     
     def test_08_no_following(self):
@@ -93,8 +95,8 @@ class FollowTests(APITestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
-        self.assertEqual(response.data, [])
+        self.assertEqual(len(response.data['results']), 0)
+        self.assertEqual(response.data['results'], [])
         
     
     def test_09_authentication_required_followers(self):
@@ -105,4 +107,100 @@ class FollowTests(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
-        
+
+    def test_10_follow_twice(self):
+        self.client.force_authenticate(user=self.user1)
+
+        url = f'/api/users/follow/{self.user2.id}/'
+        self.client.post(url)
+        response = self.client.post(url)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], f'You are already following {self.user2.username}')
+        self.user2.refresh_from_db()
+        self.assertEqual(self.user2.followers_count, 1)
+        self.assertEqual(self.user2.followers.count(), 1)
+
+
+    def test_11_followers_cursor_pagination(self):
+        followers = [
+            User.objects.create_user(username=f'follower{i}',
+                                     email=f'follower{i}@example.com',
+                                     password='pass')
+            for i in range(12)
+        ]
+        self.user2.followers.add(*followers)
+        self.client.force_authenticate(user=self.user1)
+
+        response = self.client.get(f'/api/users/followers/{self.user2.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'username'})
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+
+    def test_12_followers_count_only(self):
+        self.user1.following.add(self.user2)
+        self.client.force_authenticate(user=self.user1)
+
+        response = self.client.get(f'/api/users/followers/{self.user2.id}/?count_only=true')
+        self.assertEqual(response.data, {'count': 1})
+
+        response = self.client.get(f'/api/users/following/{self.user1.id}/?count_only=true')
+        self.assertEqual(response.data, {'count': 1})
+
+
+    def test_13_bulk_follow_and_unfollow(self):
+        user3 = User.objects.create_user(username='user3',
+                                         email='user3@example.com',
+                                         password='pass')
+        self.user1.following.add(self.user2)
+        self.client.force_authenticate(user=self.user1)
+
+        ids = [self.user2.id, user3.id, self.user1.id, 7777777]
+        response = self.client.post('/api/users/follow/bulk/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['result'] for item in response.data['results']],
+                         ['already_following', 'followed', 'self', 'not_found'])
+        self.assertEqual(set(self.user1.following.all()), {self.user2, user3})
+
+        user3.refresh_from_db()
+        self.assertEqual(user3.followers_count, 1)
+
+        response = self.client.post('/api/users/unfollow/bulk/', {'ids': [user3.id, user3.id]}, format='json')
+        self.assertEqual([item['result'] for item in response.data['results']],
+                         ['unfollowed', 'unfollowed'])
+        self.assertEqual(list(self.user1.following.all()), [self.user2])
+
+        user3.refresh_from_db()
+        self.assertEqual(user3.followers_count, 0)
+
+
+    def test_14_bulk_follow_validation(self):
+        self.client.force_authenticate(user=self.user1)
+
+        response = self.client.post('/api/users/follow/bulk/', {'ids': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post('/api/users/follow/bulk/', {'ids': list(range(1, 102))}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    def test_15_bulk_follow_reports_only_inserted_rows(self):
+        user3 = User.objects.create_user(username='user3',
+                                         email='user3@example.com',
+                                         password='pass')
+        # A row written by a concurrent request, without any signal.
+        User.followers.through.objects.create(from_user=self.user2, to_user=self.user1)
+
+        added = add_relations(self.user1.following, [self.user2, user3])
+        self.assertEqual(added, {user3.id})
+        self.assertEqual(add_relations(self.user1.following, [self.user2, user3]), set())
+
+        self.user2.refresh_from_db()
+        user3.refresh_from_db()
+        self.assertEqual((self.user2.followers_count, user3.followers_count), (0, 1))
@@ -0,0 +1,89 @@
+from io import StringIO
+from unittest import mock
+
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.conf import settings
+from django.test import override_settings
+from rest_framework import status
+
+from users import login_limiter
+
+User = get_user_model()
+
+
+@override_settings(LOGIN_MAX_ATTEMPTS_PER_EMAIL=3, LOGIN_MAX_ATTEMPTS_PER_IP=5)
+class LoginLimitTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        login_limiter.reset()
+        self.user = User.objects.create_user(username='user1',
+                                             email='user1@example.com',
+                                             password='pass')
+
+    def tearDown(self):
+        login_limiter.reset()
+        cache.clear()
+
+    def login(self, email='user1@example.com', password='wrong', ip='127.0.0.1', **extra):
+        return self.client.post('/api/users/login/', {'email': email, 'password': password},
+                                REMOTE_ADDR=ip, **extra)
+
+    def test_01_email_is_locked_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with mock.patch.object(User, 'check_password') as check_password, self.assertNumQueries(0):
+            response = self.login(password='pass', ip='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        check_password.assert_not_called()
+
+    def test_02_ip_is_limited_across_emails(self):
+        for i in range(5):
+            self.assertEqual(self.login(email=f'user{i}@example.com').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.login(email='other@example.com').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.login(ip='10.0.0.2', password='pass').status_code, status.HTTP_200_OK)
+
+    def test_03_successful_login_clears_the_email_window(self):
+        self.login()
+        self.login()
+        self.assertEqual(self.login(password='pass').status_code, status.HTTP_200_OK)
+        for _ in range(3):
+            self.assertEqual(self.login(ip='10.0.0.2').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.login(ip='10.0.0.2').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(PASSWORD_HASHERS=['users.hashers.TunedPBKDF2PasswordHasher'], PBKDF2_ITERATIONS=1000)
+    def test_04_password_is_rehashed_when_the_cost_changes(self):
+        self.user.set_password('pass')
+        self.user.save()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+        with self.settings(PBKDF2_ITERATIONS=2000):
+            self.assertEqual(self.login(password='pass').status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+    @override_settings(PBKDF2_ITERATIONS=1000)
+    def test_05_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_logins', runs=1, stdout=out)
+        self.assertIn('logins/sec per core', out.getvalue())
+        self.assertIn('refusals/sec per core', out.getvalue())
+
+    def test_06_successful_logins_do_not_use_up_the_ip_window(self):
+        for _ in range(6):
+            self.assertEqual(self.login(password='pass').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.login(email='other@example.com').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1})
+    def test_07_ip_window_follows_the_client_behind_the_proxy(self):
+        for i in range(5):
+            response = self.login(email=f'user{i}@example.com', HTTP_X_FORWARDED_FOR='203.0.113.1')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.login(email='other@example.com', HTTP_X_FORWARDED_FOR='203.0.113.1')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.login(email='other@example.com', HTTP_X_FORWARDED_FOR='203.0.113.2')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,83 @@
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from mini_twitter import resilient_cache
+from users.authentication import CachedJWTAuthentication, auth_states
+
+User = get_user_model()
+
+
+class TokenAuthTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        resilient_cache.reset()
+        self.user = User.objects.create_user(username='user1',
+                                             email='user1@example.com',
+                                             password='pass')
+        self.authenticate(self.user)
+
+    def tearDown(self):
+        resilient_cache.reset()
+        cache.clear()
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def test_01_authenticated_requests_skip_the_user_query(self):
+        url = f'/api/users/detail/{self.user.id}/'
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_02_user_fields_are_loaded_on_demand(self):
+        token = AccessToken.for_user(self.user)
+        auth = CachedJWTAuthentication()
+        auth.get_user(token)
+
+        with self.assertNumQueries(0):
+            user = auth.get_user(token)
+            self.assertEqual((user.pk, user.username, user.is_staff), (self.user.pk, 'user1', False))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'user1@example.com')
+
+    def test_03_posts_can_be_written_with_the_lazy_user(self):
+        response = self.client.post('/api/posts/create/', {'title': 'Title', 'content': 'Content'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['author'], 'user1')
+
+    def test_04_password_change_revokes_tokens(self):
+        url = f'/api/users/detail/{self.user.id}/'
+        self.client.get(url)
+
+        self.user.set_password('new-pass')
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.authenticate(self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_05_deactivated_and_deleted_users_are_rejected(self):
+        url = f'/api/users/detail/{self.user.id}/'
+        self.client.get(url)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.user.delete()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_06_state_is_read_through_the_cache(self):
+        url = f'/api/users/detail/{self.user.id}/'
+        for _ in range(3):
+            self.client.get(url)
+
+        stats = auth_states.snapshot()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_ratio'], round(2 / 3, 4))
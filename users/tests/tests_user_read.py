@@ -20,7 +20,7 @@ class UserReadTests(APITestCase):
     def test_01_list_users(self):
         self.client.force_authenticate(user=self.user1)
         
-        url = '/api/users/list/'
+        url = '/api/users/list/?expand=followers,following'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
@@ -40,7 +40,7 @@ class UserReadTests(APITestCase):
     def test_02_user_detail(self):
         self.client.force_authenticate(user=self.user1)
         
-        url = f'/api/users/detail/{self.user2.id}/'
+        url = f'/api/users/detail/{self.user2.id}/?expand=followers,following'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
@@ -78,5 +78,15 @@ class UserReadTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('followers_count', response.data)
         self.assertEqual(response.data['followers_count'], 2)
-        
-        
+
+
+    def test_04_user_detail_without_expand(self):
+        self.client.force_authenticate(user=self.user1)
+
+        response = self.client.get(f'/api/users/detail/{self.user2.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('followers', response.data)
+        self.assertNotIn('following', response.data)
+        self.assertIn('followers_count', response.data)
+        self.assertIn('following_count', response.data)
+
@@ -1,4 +1,6 @@
 from django.urls import path
+from mini_twitter.async_api import read_view
+from users import async_views
 from users.views import UserViewSet, UserSignupView, LoginAPIView
 
 urlpatterns = [
@@ -6,8 +8,11 @@ urlpatterns = [
     path('login/', LoginAPIView.as_view(), name='login'),
 
     path('list/', UserViewSet.as_view({'get': 'list'}), name='user-list'),
-    path('detail/<int:pk>/', UserViewSet.as_view({'get': 'retrieve'}), name='user-detail'),
+    path('detail/<int:pk>/', read_view(UserViewSet.as_view({'get': 'retrieve'}), async_views.user_detail),
+         name='user-detail'),
 
+    path('follow/bulk/', UserViewSet.as_view({'post': 'bulk_follow'}), name='user-bulk-follow'),
+    path('unfollow/bulk/', UserViewSet.as_view({'post': 'bulk_unfollow'}), name='user-bulk-unfollow'),
     path('follow/<int:pk>/', UserViewSet.as_view({'post': 'follow'}), name='user-follow'),
     path('unfollow/<int:pk>/', UserViewSet.as_view({'post': 'unfollow'}), name='user-unfollow'),
     path('followers/<int:pk>/', UserViewSet.as_view({'get': 'followers'}), name='user-followers'),
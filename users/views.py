@@ -1,14 +1,29 @@
 from .models import User
 from rest_framework import generics
-from .serializers import UserSignupSerializer, UserSerializer, UserLoginSerializer
+from .serializers import (
+    UserSignupSerializer,
+    UserSerializer,
+    UserLoginSerializer,
+    UserSimpleSerializer,
+    BulkIdsSerializer,
+)
 from rest_framework import permissions
 from rest_framework import viewsets
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import Throttled
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from drf_spectacular.utils import extend_schema
+from mini_twitter import conditional, object_cache
+from . import login_limiter
+from mini_twitter.relations import add_relation, remove_relation, add_relations, remove_relations
+
+class RelationCursorPagination(CursorPagination):
+    """Followers/following pages: newest accounts first, no COUNT(*)."""
+    ordering = '-id'
+
 
 @extend_schema(tags=['Authentication'])
 class UserSignupView(generics.CreateAPIView):
@@ -26,9 +41,14 @@ class LoginAPIView(APIView):
         if not email or not password:
             return Response({'detail': 'Email and password are required'}, status=500)
 
+        wait = login_limiter.attempt(request, email)
+        if wait:
+            raise Throttled(wait=wait, detail='Too many login attempts.')
+
         user = User.objects.filter(email=email).first()
     
         if user and user.check_password(password):
+            login_limiter.succeeded(email)
             refresh = RefreshToken.for_user(user)
 
             return Response({
@@ -42,6 +62,7 @@ class LoginAPIView(APIView):
                 'refresh': str(refresh),
             })
 
+        login_limiter.failed(request)
         return Response({'detail': 'Invalid credentials'}, status=401)
 
 @extend_schema(tags=['Users'])
@@ -54,16 +75,26 @@ class UserViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return User.objects.all()
 
+    def retrieve(self, request, *args, **kwargs):
+        # Expanded profiles embed relation lists, only the plain one is cached.
+        if 'expand' in request.query_params:
+            return super().retrieve(request, *args, **kwargs)
+        pk = kwargs['pk']
+        version, data = object_cache.profiles.fetch_stamped(
+            pk, lambda: super(UserViewSet, self).retrieve(request, *args, **kwargs).data
+        )
+        return conditional.respond(request, conditional.validators(version, 'user', pk),
+                                   lambda: Response(data))
+
     @action(detail=True, methods=['post'])
     def follow(self, request, pk=None):
         user_to_follow = self.get_object()
         if user_to_follow == request.user:
             return Response({'detail': "You can't follow yourself"}, status=400)
         
-        if user_to_follow in request.user.following.all():
+        if not add_relation(request.user.following, user_to_follow):
             return Response({'detail': f'You are already following {user_to_follow.username}'}, status=400)
         
-        request.user.following.add(user_to_follow)
         return Response({'detail': f'You are now following {user_to_follow.username}'})
 
     @action(detail=True, methods=['post'])
@@ -72,22 +103,62 @@ class UserViewSet(viewsets.ModelViewSet):
         if user_to_unfollow == request.user:
             return Response({'detail': "You can't unfollow yourself"}, status=400)
         
-        request.user.following.remove(user_to_unfollow)
+        remove_relation(request.user.following, user_to_unfollow)
         return Response({'detail': f'You have unfollowed {user_to_unfollow.username}'})
 
+    @extend_schema(request=BulkIdsSerializer)
+    @action(detail=False, methods=['post'])
+    def bulk_follow(self, request):
+        return self.bulk_update_following(request, follow=True)
+
+    @extend_schema(request=BulkIdsSerializer)
+    @action(detail=False, methods=['post'])
+    def bulk_unfollow(self, request):
+        return self.bulk_update_following(request, follow=False)
+
+    def bulk_update_following(self, request, follow):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+
+        targets = User.objects.only('id').in_bulk(ids)
+        targets.pop(request.user.pk, None)
+        if follow:
+            changed = add_relations(request.user.following, targets.values())
+        else:
+            changed = remove_relations(request.user.following, targets.values())
+
+        done, unchanged = ('followed', 'already_following') if follow else ('unfollowed', 'not_following')
+        results = []
+        for user_id in ids:
+            if user_id == request.user.pk:
+                result = 'self'
+            elif user_id not in targets:
+                result = 'not_found'
+            else:
+                result = done if user_id in changed else unchanged
+            results.append({'id': user_id, 'result': result})
+        return Response({'results': results})
+
     @action(detail=True, methods=['get'])
     def followers(self, request, pk=None):
         user = self.get_object()
-        followers = user.followers.all()
-        serializer = UserSerializer(followers, many=True)
-        return Response(serializer.data)
+        if request.query_params.get('count_only') == 'true':
+            return Response({'count': user.followers_count})
+        return self.paginate_relation(user.followers.all())
 
     @action(detail=True, methods=['get'])
     def following(self, request, pk=None):
         user = self.get_object()
-        following = user.following.all()
-        serializer = UserSerializer(following, many=True)
-        return Response(serializer.data)
+        if request.query_params.get('count_only') == 'true':
+            return Response({'count': user.following_count})
+        return self.paginate_relation(user.following.all())
+
+    def paginate_relation(self, users):
+        paginator = RelationCursorPagination()
+        page = paginator.paginate_queryset(users.only('id', 'username'), self.request, view=self)
+        serializer = UserSimpleSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 